@@ -0,0 +1 @@
+"""This package contains micro-benchmarks for the training and inference code. Run them from the repository root, e.g. 'python -m benchmarks.bench_train_step'."""
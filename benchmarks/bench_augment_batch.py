@@ -0,0 +1,50 @@
+"""Benchmark <augment_batch> ('--batch_augment') against a single advanced-indexing gather of the whole batch.
+
+For each batch size, the script crops and flips a uint8 batch with the same random parameters both ways, checks
+that the results are identical and reports the time of each:
+    loop    -- <augment_batch>: a strided crop view per image, copied once into a preallocated float batch
+    gather  -- per-image row and column index grids (the columns reversed for flipped images) and one gather
+
+Example:
+    python -m benchmarks.bench_augment_batch --batch_sizes 1 4 16 32 --load_size 286 --crop_size 256
+"""
+import argparse
+import torch
+from data.base_dataset import augment_batch, get_batch_params
+from benchmarks.common import make_opt, timeit
+
+
+def gather_batch(opt, images, params):
+    """Crop and flip the whole batch with one advanced-indexing call, then convert and normalize it."""
+    n, c, h, w = images.shape
+    crop_h, crop_w = (opt.crop_size, opt.crop_size) if params['crop_pos'] is not None else (h, w)
+    rows = torch.arange(crop_h).expand(n, crop_h)
+    cols = torch.arange(crop_w).expand(n, crop_w)
+    if params['crop_pos'] is not None:
+        rows = rows + params['crop_pos'][:, 1:]
+        cols = cols + params['crop_pos'][:, :1]
+    cols = torch.where(params['flip'][:, None], cols.flip(1), cols)
+    batch = torch.arange(n)[:, None, None]
+    output = images[batch, :, rows[:, :, None], cols[:, None, :]]  # N x crop_h x crop_w x C
+    output = output.permute(0, 3, 1, 2).to(torch.float32, memory_format=torch.contiguous_format)
+    return output.div_(127.5).sub_(1.0)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('--batch_sizes', type=int, nargs='+', default=[1, 4, 16, 32])
+    parser.add_argument('--load_size', type=int, default=286)
+    parser.add_argument('--crop_size', type=int, default=256)
+    parser.add_argument('--n_iters', type=int, default=50)
+    args = parser.parse_args()
+
+    opt = make_opt(['--load_size', str(args.load_size), '--crop_size', str(args.crop_size), '--batch_augment'])
+    torch.manual_seed(0)
+    print('%-6s %10s %12s %9s' % ('batch', 'loop (ms)', 'gather (ms)', 'speedup'))
+    for batch_size in args.batch_sizes:
+        images = torch.randint(0, 256, (batch_size, 3, args.load_size, args.load_size), dtype=torch.uint8)
+        params = get_batch_params(opt, batch_size, (args.load_size, args.load_size))
+        assert torch.equal(augment_batch(opt, images, params)[0], gather_batch(opt, images, params)), 'the two paths differ'
+        t_loop = timeit(lambda: augment_batch(opt, images, params), args.n_iters)
+        t_gather = timeit(lambda: gather_batch(opt, images, params), args.n_iters)
+        print('%-6d %10.2f %12.2f %8.1fx' % (batch_size, t_loop * 1000, t_gather * 1000, t_gather / t_loop))
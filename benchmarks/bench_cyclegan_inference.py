@@ -0,0 +1,62 @@
+"""Benchmark CycleGAN inference with all four generator passes against the single-direction mode.
+
+The script saves random G_A / G_B checkpoints, then for '--model cycle_gan' at test time reports
+    - the setup time (building and loading the generators) and the number of generator parameters loaded
+    - the time of <BaseModel.test> for one batch
+once with all the visuals (G_A and G_B, four passes) and once with '--dataset_mode single' (G_A only, one pass).
+It also checks that fake_B is the same in both modes.
+
+Example:
+    python -m benchmarks.bench_cyclegan_inference --netG resnet_9blocks --crop_size 256
+"""
+import argparse
+import os
+import tempfile
+import time
+import torch
+from models import create_model, networks
+from benchmarks.common import make_opt, timeit
+
+
+def build_model(args, checkpoints_dir, extra):
+    opt = make_opt(['--model', 'cycle_gan', '--name', 'bench', '--checkpoints_dir', checkpoints_dir, '--netG', args.netG,
+                    '--crop_size', str(args.crop_size), '--load_size', str(args.crop_size)] + extra, is_train=False)
+    start = time.perf_counter()
+    model = create_model(opt)
+    model.setup(opt)
+    model.eval()
+    return model, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('--netG', type=str, default='resnet_9blocks')
+    parser.add_argument('--batch_size', type=int, default=1)
+    parser.add_argument('--crop_size', type=int, default=256)
+    parser.add_argument('--n_iters', type=int, default=3)
+    args = parser.parse_args()
+
+    torch.manual_seed(0)
+    data = {'A': torch.rand(args.batch_size, 3, args.crop_size, args.crop_size) * 2 - 1,
+            'B': torch.rand(args.batch_size, 3, args.crop_size, args.crop_size) * 2 - 1,
+            'A_paths': ['A'] * args.batch_size, 'B_paths': ['B'] * args.batch_size}
+    rows, fakes = [], []
+    with tempfile.TemporaryDirectory() as tmp:
+        os.makedirs(os.path.join(tmp, 'bench'))
+        for name in ('G_A', 'G_B'):
+            torch.save(networks.define_G(3, 3, 64, args.netG, 'instance').state_dict(), os.path.join(tmp, 'bench', 'latest_net_%s.pth' % name))
+        for mode, extra, batch in (('both directions', [], data),
+                                   ('single (G_A)', ['--dataset_mode', 'single'], {'A': data['A'], 'A_paths': data['A_paths']})):
+            model, t_setup = build_model(args, tmp, extra)
+            model.set_input(batch)
+            t_test = timeit(model.test, args.n_iters)
+            params = sum(p.numel() for name in model.model_names for p in getattr(model, 'net' + name).parameters())
+            fakes.append(model.fake_B)
+            rows.append((mode, ','.join(model.model_names), params, t_setup, t_test))
+
+    print('%d x 3 x %d x %d, netG %s' % (args.batch_size, args.crop_size, args.crop_size, args.netG))
+    print('%-16s %10s %12s %11s %10s' % ('mode', 'loaded', 'params (M)', 'setup (s)', 'test (ms)'))
+    for mode, names, params, t_setup, t_test in rows:
+        print('%-16s %10s %12.2f %11.2f %10.1f' % (mode, names, params / 1e6, t_setup, t_test * 1000))
+    print('test speedup %.2fx, setup speedup %.2fx, max |fake_B diff| %.2e'
+          % (rows[0][4] / rows[1][4], rows[0][3] / rows[1][3], (fakes[0] - fakes[1]).abs().max().item()))
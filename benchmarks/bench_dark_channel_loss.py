@@ -0,0 +1,72 @@
+"""Benchmark the torch <DCLoss> against the former OpenCV implementation, and check that they agree.
+
+The former loss copied one random image of the batch to the host and computed its dark channel with OpenCV;
+the torch loss computes it for the whole batch on the device of the images. The script checks
+    refine=False -- the torch loss of a batch equals the mean of the OpenCV loss over its images
+    refine=True  -- the torch guided filter refinement equals the OpenCV one (the former code computed it but discarded it)
+and reports the time per call.
+
+Example:
+    python -m benchmarks.bench_dark_channel_loss --batch_sizes 1 4 16 --size 256
+"""
+import argparse
+import cv2
+import numpy as np
+import torch
+import torch.nn.functional as F
+from models.dark_channel_loss import DCLoss
+from benchmarks.common import timeit
+
+
+def reference_dc(image, refine=False):
+    """The dark channel of one C x H x W image as computed by the former OpenCV code, optionally keeping the refinement."""
+    im = image.cpu().data.numpy()
+    min_dc = cv2.min(cv2.min(im[0], im[1]), im[2])
+    dark = cv2.erode(min_dc, cv2.getStructuringElement(cv2.MORPH_RECT, (15, 15)))
+    dc = min_dc
+    if refine:
+        r, eps = 15, 0.0001
+        mean_I = cv2.boxFilter(min_dc, cv2.CV_64F, (r, r))
+        mean_p = cv2.boxFilter(dark, cv2.CV_64F, (r, r))
+        cov_Ip = cv2.boxFilter(min_dc * dark, cv2.CV_64F, (r, r)) - mean_I * mean_p
+        var_I = cv2.boxFilter(min_dc * min_dc, cv2.CV_64F, (r, r)) - mean_I * mean_I
+        a = cov_Ip / (var_I + eps)
+        b = mean_p - a * mean_I
+        dc = cv2.boxFilter(a, cv2.CV_64F, (r, r)) * min_dc + cv2.boxFilter(b, cv2.CV_64F, (r, r))
+    dc = dc * 255
+    dc[dc < 0] = 0
+    dc[dc > 255] = 255
+    return np.uint8(dc)
+
+
+def reference_loss(images):
+    """The former DCLoss: the loss of one random image of the batch."""
+    index = np.random.randint(images.size(0))
+    return reference_dc(images[index]).mean() * 0.05
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('--batch_sizes', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--size', type=int, default=256)
+    parser.add_argument('--n_iters', type=int, default=10)
+    args = parser.parse_args()
+
+    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    # natural-looking images: smooth random fields, also outside [-1, 1] to test the clipping
+    images = F.interpolate(torch.rand(4, 3, args.size // 16, args.size // 16), size=(args.size, args.size), mode='bicubic') * 2.4 - 1.2
+    images = images.to(device)
+    for refine in (False, True):
+        expected = np.mean([reference_dc(image, refine).mean() * 0.05 for image in images])
+        result = DCLoss(refine=refine)(images).item()
+        print('refine=%-5s opencv %.6f torch %.6f |diff| %.2e' % (refine, expected, result, abs(expected - result)))
+        # the 8-bit quantization can flip a few pixels by one level where float32 and float64 round differently
+        assert abs(expected - result) < 1e-3, 'the torch loss does not match the OpenCV reference'
+
+    loss = DCLoss()
+    print('%-6s %14s %18s %12s' % ('batch', 'opencv (ms)', 'torch batch (ms)', 'ms / image'))
+    for batch_size in args.batch_sizes:
+        images = torch.rand(batch_size, 3, args.size, args.size, device=device) * 2 - 1
+        t_ref = timeit(lambda: reference_loss(images), args.n_iters)
+        t_torch = timeit(lambda: loss(images).item(), args.n_iters)  # .item() includes the wait for the device
+        print('%-6d %14.3f %18.3f %12.3f' % (batch_size, t_ref * 1000, t_torch * 1000, t_torch * 1000 / batch_size))
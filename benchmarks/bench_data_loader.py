@@ -0,0 +1,78 @@
+"""Benchmark the data loader throughput with and without the resized image cache ('--dataset_cache')
+and the batched augmentation ('--batch_augment').
+
+The script builds the caches of <dataroot>/trainA and <dataroot>/trainB in a temporary directory,
+checks that both paths give the same tensors, and reports the images per second of one pass over
+the unaligned dataset for each number of workers.
+
+Example:
+    python -m benchmarks.bench_data_loader --dataroot ./datasets/DesmokeData_0206 --load_size 286 --num_workers 0 4
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import torch
+from data import find_dataset_using_name
+from data.image_folder import make_dataset
+from data.image_cache import build_cache
+from data.base_dataset import augment_batch
+from benchmarks.common import make_opt
+
+
+def images_per_second(dataset, batch_size, num_workers, n_epochs):
+    loader = torch.utils.data.DataLoader(dataset, batch_size=batch_size, shuffle=True, num_workers=num_workers,
+                                         persistent_workers=num_workers > 0)
+    rates = []
+    for _ in range(n_epochs):
+        start = time.perf_counter()
+        n = 0
+        for data in loader:
+            if dataset.opt.batch_augment:
+                for key in ('A', 'B'):
+                    data[key], _ = augment_batch(dataset.opt, data[key])
+            n += data['A'].size(0)
+        rates.append(n / (time.perf_counter() - start))
+    return max(rates)  # the first epoch also pays the start-up of the workers and the page cache
+
+
+def sample(dataset, index):
+    random.seed(index)
+    torch.manual_seed(index)
+    return dataset[index]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('--dataroot', type=str, default='./datasets/DesmokeData_0206')
+    parser.add_argument('--load_size', type=int, default=286)
+    parser.add_argument('--crop_size', type=int, default=256)
+    parser.add_argument('--preprocess', type=str, default='resize_and_crop')
+    parser.add_argument('--batch_size', type=int, default=4)
+    parser.add_argument('--num_workers', type=int, nargs='+', default=[0, 4])
+    parser.add_argument('--n_epochs', type=int, default=2)
+    parser.add_argument('--max_dataset_size', type=int, default=200)
+    args = parser.parse_args()
+
+    flags = ['--dataroot', args.dataroot, '--load_size', str(args.load_size), '--crop_size', str(args.crop_size),
+             '--preprocess', args.preprocess, '--max_dataset_size', str(args.max_dataset_size)]
+    dataset_class = find_dataset_using_name('unaligned')
+    with tempfile.TemporaryDirectory() as cache_dir:
+        opt = make_opt(flags)
+        start = time.perf_counter()
+        for domain in 'AB':
+            paths = sorted(make_dataset(os.path.join(opt.dataroot, opt.phase + domain), opt.max_dataset_size, opt.image_index_dir))
+            build_cache(os.path.join(cache_dir, opt.phase + domain), paths, opt, num_workers=max(args.num_workers))
+        print('built the caches in %.1f s (%.1f MB)' % (time.perf_counter() - start, sum(
+            os.path.getsize(os.path.join(cache_dir, f)) for f in os.listdir(cache_dir)) / 2 ** 20))
+
+        datasets = {'raw files': dataset_class(opt), 'cache': dataset_class(make_opt(flags + ['--dataset_cache', cache_dir])),
+                    'cache + batch augment': dataset_class(make_opt(flags + ['--dataset_cache', cache_dir, '--batch_augment']))}
+        diff = max((sample(datasets['raw files'], i)['A'] - sample(datasets['cache'], i)['A']).abs().max().item() for i in range(8))
+        print('max |diff| between raw files and cache: %g' % diff)
+
+        print('%-22s %8s %12s' % ('source', 'workers', 'images / s'))
+        for num_workers in args.num_workers:
+            for name, dataset in datasets.items():
+                print('%-22s %8d %12.1f' % (name, num_workers, images_per_second(dataset, args.batch_size, num_workers, args.n_epochs)))
@@ -0,0 +1,113 @@
+"""Benchmark the generators exported by export.py against eager mode on CPU.
+
+For each generator architecture, the script saves a checkpoint, loads it with '--model test' (<BaseModel.load_networks>)
+and exports it (<export.export_generator>). It reports
+    - the cold start: the wall-clock time of a new process from its first import to its first output, once for the
+      eager path (options, create_model, setup) and once for util/runtime.py with the exported file
+    - the steady-state latency of the eager and exported generators
+    - the largest difference between the eager and exported outputs
+It also checks that the exported generator rejects an input of another size. The U-Nets downsample to 1x1, so they
+are exported for at least their own input size (128 or 256) even with a smaller '--size'.
+
+Example:
+    python -m benchmarks.bench_export --archs vit vit_window resnet_9blocks unet_256 --size 256
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import torch
+from models import create_model, networks
+from options.export_options import ExportOptions
+from export import export_generator
+from util.runtime import ExportedGenerator
+from benchmarks.common import make_opt, timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+UNET_SIZES = {'unet_128': 128, 'unet_256': 256}
+
+EAGER_START = '''
+import sys, time
+start = time.perf_counter()
+import torch
+from models import create_model
+from options.export_options import ExportOptions
+from benchmarks.common import make_opt
+opt = make_opt(sys.argv[1:], is_train=False, options=ExportOptions())
+model = create_model(opt)
+model.setup(opt)
+model.eval()
+with torch.no_grad():
+    model.netG(torch.zeros(1, opt.input_nc, opt.export_size, opt.export_size))
+print(time.perf_counter() - start)
+'''
+
+EXPORTED_START = '''
+import sys, time
+start = time.perf_counter()
+import torch
+from util.runtime import ExportedGenerator
+netG = ExportedGenerator(sys.argv[1])
+netG(torch.zeros(1, netG.meta['input_nc'], *netG.meta['input_size']))
+print(time.perf_counter() - start)
+'''
+
+
+def cold_start(code, args):
+    """Run <code> in a new Python process and return the time (in seconds) it prints on its last line."""
+    result = subprocess.run([sys.executable, '-c', code] + list(args), cwd=ROOT, capture_output=True, text=True, check=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def run(net, x):
+    with torch.no_grad():
+        return net(x)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('--archs', type=str, nargs='+', default=['vit', 'vit_window', 'vit_linear', 'vit_small', 'resnet_9blocks', 'resnet_attention', 'unet_256'])
+    parser.add_argument('--norm', type=str, default='instance')
+    parser.add_argument('--ngf', type=int, default=64)
+    parser.add_argument('--size', type=int, default=256)
+    parser.add_argument('--n_iters', type=int, default=5)
+    args = parser.parse_args()
+
+    torch.manual_seed(0)
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for arch in args.archs:
+            size = max(args.size, UNET_SIZES.get(arch, 0))
+            flags = ['--model', 'test', '--name', arch, '--checkpoints_dir', tmp, '--netG', arch, '--norm', args.norm,
+                     '--ngf', str(args.ngf), '--no_dropout', '--export_size', str(size)]
+            os.makedirs(os.path.join(tmp, arch))
+            torch.save(networks.define_G(3, 3, args.ngf, arch, args.norm).state_dict(), os.path.join(tmp, arch, 'latest_net_G.pth'))
+
+            opt = make_opt(flags, is_train=False, options=ExportOptions())
+            model = create_model(opt)
+            model.setup(opt)
+            model.eval()
+            path = os.path.join(tmp, arch, 'latest_net_G.torchscript.pt')
+            export_generator(model.netG, opt, path)
+            exported = ExportedGenerator(path)
+
+            x = torch.rand(1, 3, size, size) * 2 - 1
+            diff = (exported(x) - run(model.netG, x)).abs().max().item()
+            t_eager = timeit(lambda: run(model.netG, x), args.n_iters)
+            t_exported = timeit(lambda: exported(x), args.n_iters, n_warmup=3)  # the profiling executor optimizes the graph in the first calls
+            start_eager = cold_start(EAGER_START, flags)
+            start_exported = cold_start(EXPORTED_START, [path])
+            rows.append((arch, size, start_eager, start_exported, t_eager, t_exported, diff))
+            assert diff < 1e-3, 'the exported generator does not match the eager generator'
+            try:
+                exported(torch.rand(1, 3, size + 32, size + 32) * 2 - 1)
+            except ValueError:
+                pass
+            else:
+                raise AssertionError('the exported generator accepted an input of another size')
+
+    print('batch 1, norm %s, ngf %d' % (args.norm, args.ngf))
+    print('%-18s %5s %16s %19s %12s %15s %9s %12s' % ('netG', 'size', 'eager start (s)', 'exported start (s)', 'eager (ms)', 'exported (ms)', 'speedup', 'max |diff|'))
+    for arch, size, start_eager, start_exported, t_eager, t_exported, diff in rows:
+        print('%-18s %5d %16.2f %19.2f %12.1f %15.1f %8.2fx %12.2e' % (arch, size, start_eager, start_exported, t_eager * 1000, t_exported * 1000, t_eager / t_exported, diff))
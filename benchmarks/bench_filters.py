@@ -0,0 +1,46 @@
+"""Benchmark the cumulative-sum box filter and guided filter of models/filters.py.
+
+For each window size, the script reports the time to filter a batch of --batch_size x 3 x --height x --width images with
+    cumsum     -- <filters.box_filter>, O(1) per pixel
+    avg_pool   -- F.avg_pool2d on the reflect-padded batch, O(r^2) per pixel
+    opencv     -- cv2.boxFilter in float64, one image and channel at a time (as the former DCLoss)
+and the time of the guided filter of the whole batch, with the largest difference to OpenCV.
+
+Example:
+    python -m benchmarks.bench_filters --height 1080 --width 1920 --radii 9 15 31 61
+"""
+import argparse
+import cv2
+import numpy as np
+import torch
+import torch.nn.functional as F
+from models import filters
+from benchmarks.common import timeit
+
+
+def opencv_box_filter(x, r):
+    return np.stack([np.stack([cv2.boxFilter(c, cv2.CV_64F, (r, r)) for c in image]) for image in x])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('--batch_size', type=int, default=2)
+    parser.add_argument('--height', type=int, default=720)
+    parser.add_argument('--width', type=int, default=1280)
+    parser.add_argument('--radii', type=int, nargs='+', default=[9, 15, 31])
+    parser.add_argument('--n_iters', type=int, default=3)
+    args = parser.parse_args()
+
+    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    x = torch.rand(args.batch_size, 3, args.height, args.width, device=device)
+    x_np = x.cpu().double().numpy()
+    print('batch %d x 3 x %d x %d on %s' % (args.batch_size, args.height, args.width, device))
+    print('%-6s %12s %14s %12s %12s %16s' % ('window', 'cumsum (ms)', 'avg_pool (ms)', 'opencv (ms)', 'max |diff|', 'guided (ms)'))
+    for r in args.radii:
+        diff = np.abs(filters.box_filter(x, r).cpu().double().numpy() - opencv_box_filter(x_np, r)).max()
+        t_cumsum = timeit(lambda: filters.box_filter(x, r), args.n_iters)
+        t_pool = timeit(lambda: F.avg_pool2d(F.pad(x, [r // 2] * 4, mode='reflect'), r, stride=1), args.n_iters)
+        t_cv = timeit(lambda: opencv_box_filter(x_np, r), args.n_iters)
+        guide = x.mean(1, keepdim=True)
+        t_guided = timeit(lambda: filters.guided_filter(guide, x, r, 1e-3), args.n_iters)
+        print('%-6d %12.1f %14.1f %12.1f %12.2e %16.1f' % (r, t_cumsum * 1000, t_pool * 1000, t_cv * 1000, diff, t_guided * 1000))
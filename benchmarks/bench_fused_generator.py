@@ -0,0 +1,74 @@
+"""Benchmark the fused inference generators of models/fusion.py against the regular eval-mode generators on CPU.
+
+For each generator architecture and normalization, the script saves the weights of a generator to a checkpoint,
+loads them into a new generator, fuses it (<fusion.fuse_generator>) and reports
+    - the latency of the regular generator, of the fused one in the default layout, and of the fused one in channels_last
+    - the largest difference between the regular and the fused (channels_last) outputs
+
+The BatchNorm running statistics are randomized so that folding them into the convolutions is actually tested.
+The U-Nets downsample to 1x1, so they run on at least their own input size (128 or 256) even with a smaller '--size'.
+
+Example:
+    python -m benchmarks.bench_fused_generator --archs resnet_9blocks unet_256 vit --size 256
+"""
+import argparse
+import os
+import tempfile
+import torch
+from models import networks, fusion
+from benchmarks.common import timeit
+
+UNET_SIZES = {'unet_128': 128, 'unet_256': 256}
+
+
+def run(net, x):
+    with torch.no_grad():
+        return net(x)
+
+
+def load_generator(arch, norm, ngf, path):
+    """Create a generator and load its weights from the checkpoint <path>, like <BaseModel.load_networks>."""
+    net = networks.define_G(3, 3, ngf, arch, norm)
+    net.load_state_dict(torch.load(path, map_location='cpu'))
+    return net.eval()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('--archs', type=str, nargs='+', default=['resnet_6blocks', 'resnet_9blocks', 'resnet_attention', 'unet_256', 'vit'])
+    parser.add_argument('--norms', type=str, nargs='+', default=['instance', 'batch'])
+    parser.add_argument('--ngf', type=int, default=64)
+    parser.add_argument('--batch_size', type=int, default=1)
+    parser.add_argument('--size', type=int, default=256)
+    parser.add_argument('--n_iters', type=int, default=5)
+    args = parser.parse_args()
+
+    torch.manual_seed(0)
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for arch in args.archs:
+            size = max(args.size, UNET_SIZES.get(arch, 0))
+            x = torch.rand(args.batch_size, 3, size, size) * 2 - 1
+            for norm in args.norms:
+                net = networks.define_G(3, 3, args.ngf, arch, norm)
+                for layer in net.modules():
+                    if isinstance(layer, torch.nn.BatchNorm2d):
+                        layer.running_mean.normal_(0, 0.1)
+                        layer.running_var.uniform_(0.5, 2)
+                path = os.path.join(tmp, 'latest_net_G.pth')
+                torch.save(net.state_dict(), path)
+
+                net = load_generator(arch, norm, args.ngf, path)
+                fused_nchw = fusion.fuse_generator(net, channels_last=False)
+                fused = fusion.fuse_generator(net)
+                diff = (run(fused, x) - run(net, x)).abs().max().item()
+                t_base = timeit(lambda: run(net, x), args.n_iters)
+                t_nchw = timeit(lambda: run(fused_nchw, x), args.n_iters)
+                t_fused = timeit(lambda: run(fused, x), args.n_iters)
+                rows.append((arch, norm, size, t_base, t_nchw, t_fused, diff))
+                assert diff < 1e-3, 'the fused generator does not match the regular generator'
+
+    print('batch %d, ngf %d' % (args.batch_size, args.ngf))
+    print('%-18s %-9s %5s %12s %12s %17s %9s %12s' % ('netG', 'norm', 'size', 'eval (ms)', 'fused (ms)', 'channels_last (ms)', 'speedup', 'max |diff|'))
+    for arch, norm, size, t_base, t_nchw, t_fused, diff in rows:
+        print('%-18s %-9s %5d %12.1f %12.1f %17.1f %8.2fx %12.2e' % (arch, norm, size, t_base * 1000, t_nchw * 1000, t_fused * 1000, t_base / t_fused, diff))
@@ -0,0 +1,62 @@
+"""Benchmark the CycleGAN training step with and without '--fuse_identity' on synthetic data.
+
+Both models start from the same weights and see the same batch. The script reports
+    - the number of generator calls per step and the ms/iter of <CycleGANModel.optimize_parameters>
+    - the largest difference between the generator gradients of <backward_G> in the two modes
+
+Example:
+    python -m benchmarks.bench_fused_identity --crop_size 128 --netG resnet_6blocks --n_iters 5
+"""
+import argparse
+import torch
+from benchmarks.bench_train_step import build_model
+from benchmarks.common import timeit
+
+
+def generator_gradients(model):
+    """Run one forward/backward_G pass and return the gradients of G_A and G_B (without updating the weights)."""
+    model.set_requires_grad([model.netD_A, model.netD_B], False)
+    model.optimizer_G.zero_grad()
+    with model.autocast():
+        model.forward()
+    model.backward_G()
+    return [p.grad.clone() for net in (model.netG_A, model.netG_B) for p in net.parameters()]
+
+
+def count_calls(model):
+    """Return the number of generator calls of one <optimize_parameters>."""
+    calls = []
+    hooks = [net.register_forward_hook(lambda *args: calls.append(1)) for net in (model.netG_A, model.netG_B)]
+    model.optimize_parameters()
+    for hook in hooks:
+        hook.remove()
+    return len(calls)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('--batch_size', type=int, default=1)
+    parser.add_argument('--crop_size', type=int, default=128)
+    parser.add_argument('--n_iters', type=int, default=5)
+    args, model_args = parser.parse_known_args()
+    if '--norm' not in model_args:
+        model_args += ['--norm', 'instance']
+    if '--netG' not in model_args:
+        model_args += ['--netG', 'resnet_6blocks']
+
+    torch.manual_seed(0)
+    base = build_model(model_args, args.batch_size, args.crop_size)
+    fused = build_model(model_args + ['--fuse_identity'], args.batch_size, args.crop_size)
+    for name in base.model_names:
+        getattr(fused, 'net' + name).load_state_dict(getattr(base, 'net' + name).state_dict())
+    fused.set_input({'A': base.real_A, 'B': base.real_B, 'A_paths': base.image_paths, 'B_paths': base.image_paths})
+
+    diff = max((g1 - g2).abs().max().item() for g1, g2 in zip(generator_gradients(base), generator_gradients(fused)))
+    assert diff < 1e-3, 'the fused identity pass changes the generator gradients'
+    rows = [(name, count_calls(model), timeit(model.optimize_parameters, args.n_iters)) for name, model in (('separate', base), ('fused', fused))]
+
+    print('batch %d x 3 x %d x %d' % (args.batch_size, args.crop_size, args.crop_size))
+    print('%-10s %14s %12s' % ('mode', 'G calls/iter', 'ms / iter'))
+    for name, calls, t in rows:
+        print('%-10s %14d %12.1f' % (name, calls, t * 1000))
+    print('speedup %.2fx, max |generator gradient diff| %.2e' % (rows[0][2] / rows[1][2], diff))
@@ -0,0 +1,74 @@
+"""Benchmark listing a large image tree with <make_dataset>.
+
+The script writes --n_images small PNG files into --n_dirs subdirectories of a temporary directory
+(like frames extracted from videos) and reports the time of
+    os.walk     -- the former implementation: os.walk and an extension test per file
+    scan        -- <make_dataset> without an index: a parallel os.scandir scan of the file names
+    cold index  -- the first <make_dataset> with '--image_index_dir': the scan, saved as the index
+    warm index  -- later calls: the saved index, checked against the directory mtimes
+The index is saved in a temporary directory; the image tree is never written to.
+
+Example:
+    python -m benchmarks.bench_make_dataset --n_images 100000 --n_dirs 100
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from PIL import Image
+from data.image_folder import IMG_EXTENSIONS, make_dataset
+
+
+def walk(dir):
+    images = []
+    for root, _, fnames in sorted(os.walk(dir)):
+        for fname in fnames:
+            if any(fname.endswith(extension) for extension in IMG_EXTENSIONS):
+                images.append(os.path.join(root, fname))
+    return images
+
+
+def measure(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('--n_images', type=int, default=20000)
+    parser.add_argument('--n_dirs', type=int, default=20)
+    parser.add_argument('--root', type=str, default=None, help='benchmark this directory instead of a synthetic one')
+    args = parser.parse_args()
+
+    tmp = None
+    root = args.root
+    if root is None:
+        root = tmp = tempfile.mkdtemp()
+        source = os.path.join(root, 'source.png')
+        for d in range(args.n_dirs):
+            os.makedirs(os.path.join(root, 'video%04d' % d))
+        for i in range(args.n_images):
+            if i % 60000 == 0:  # a new source file before the hard link limit of the filesystem (65000 on ext4)
+                if i:
+                    os.remove(source)
+                Image.new('RGB', (64, 32)).save(source)
+            os.link(source, os.path.join(root, 'video%04d' % (i % args.n_dirs), 'frame%07d.png' % i))
+        os.remove(source)
+    index_dir = tempfile.mkdtemp()
+
+    try:
+        t_walk, reference = measure(walk, root)
+        t_scan, scan = measure(make_dataset, root)
+        t_cold, cold = measure(make_dataset, root, float('inf'), index_dir)
+        t_warm, warm = measure(make_dataset, root, float('inf'), index_dir)
+        assert reference == scan == cold == warm, 'the index does not list the same images in the same order as os.walk'
+        print('%d images' % len(reference))
+        print('%-12s %10s' % ('listing', 'seconds'))
+        for name, t in (('os.walk', t_walk), ('scan', t_scan), ('cold index', t_cold), ('warm index', t_warm)):
+            print('%-12s %10.3f' % (name, t))
+    finally:
+        shutil.rmtree(index_dir)
+        if tmp is not None:
+            shutil.rmtree(tmp)
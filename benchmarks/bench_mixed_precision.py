@@ -0,0 +1,61 @@
+"""Compare the training of CycleGANModel in float32 and with '--amp' (bfloat16 / float16 autocast) on synthetic data.
+
+The models of all modes start from the same weights and see the same batches. The script prints
+    - the loss curves of the generators (loss_G) and discriminators (D_A + D_B) of every mode, step by step,
+      with the largest relative difference to float32 (a parity check of the loss curves)
+    - the time per iteration and the training throughput (images / s) of every mode
+
+Example:
+    python -m benchmarks.bench_mixed_precision --crop_size 128 --netG resnet_6blocks --n_iters 10
+"""
+import argparse
+import time
+import torch
+from models import create_model
+from benchmarks.common import make_opt
+
+
+def train(model_args, amp, batches, seed):
+    """Train a new model on <batches> and return its (loss_G, loss_D) curve and the time of each step."""
+    torch.manual_seed(seed)  # same initial weights for every mode
+    opt = make_opt(model_args + ['--amp', amp, '--pool_seed', str(seed), '--batch_size', str(batches[0]['A'].size(0))])
+    model = create_model(opt)
+    curve, times = [], []
+    for data in batches:
+        model.set_input(data)
+        start = time.perf_counter()
+        model.optimize_parameters()
+        times.append(time.perf_counter() - start)
+        losses = model.get_current_losses()
+        curve.append((float(model.loss_G), losses['D_A'] + losses['D_B']))
+    return curve, times
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('--batch_size', type=int, default=1)
+    parser.add_argument('--crop_size', type=int, default=128)
+    parser.add_argument('--n_iters', type=int, default=10)
+    parser.add_argument('--modes', type=str, nargs='+', default=['none', 'bf16'], help='--amp values to compare; the first one is the reference')
+    parser.add_argument('--seed', type=int, default=0)
+    args, model_args = parser.parse_known_args()
+    model_args += ['--crop_size', str(args.crop_size)]
+
+    generator = torch.Generator().manual_seed(args.seed)
+    batches = [{'A': torch.rand(args.batch_size, 3, args.crop_size, args.crop_size, generator=generator) * 2 - 1,
+                'B': torch.rand(args.batch_size, 3, args.crop_size, args.crop_size, generator=generator) * 2 - 1,
+                'A_paths': ['A'] * args.batch_size, 'B_paths': ['B'] * args.batch_size} for _ in range(args.n_iters)]
+    results = {amp: train(model_args, amp, batches, args.seed) for amp in args.modes}
+
+    reference = results[args.modes[0]][0]
+    print('%-5s ' % 'step' + ' '.join('%10s %10s' % ('G ' + amp, 'D ' + amp) for amp in args.modes))
+    for step in range(args.n_iters):
+        print('%-5d ' % step + ' '.join('%10.4f %10.4f' % results[amp][0][step] for amp in args.modes))
+
+    print('%-6s %14s %14s %12s %12s' % ('amp', 'max rel G', 'max rel D', 'ms / iter', 'img / s'))
+    for amp in args.modes:
+        curve, times = results[amp]
+        rel_G = max(abs(g - g_ref) / abs(g_ref) for (g, _), (g_ref, _) in zip(curve, reference))
+        rel_D = max(abs(d - d_ref) / abs(d_ref) for (_, d), (_, d_ref) in zip(curve, reference))
+        t = sum(times[1:]) / max(len(times) - 1, 1)  # the first step includes the warm-up
+        print('%-6s %14.2e %14.2e %12.1f %12.2f' % (amp, rel_G, rel_D, t * 1000, args.batch_size / t))
@@ -0,0 +1,60 @@
+"""Compare the blocked <SelfAttention> of ResnetGeneratorWithAttention with the full (HW x HW) attention.
+
+For every input resolution, the attention layer sees a (4 * ngf) x (size / 4) x (size / 4) feature map,
+as in the [resnet_attention] generator. The script checks that both give the same output and reports
+latency and peak memory of a forward pass and of a forward + backward pass for
+    full        -- the original formulation
+    blocked     -- query blocks, kept for the backward pass
+    checkpoint  -- query blocks, recomputed in the backward pass (the default above 'checkpoint_tokens' positions)
+
+Example:
+    python -m benchmarks.bench_self_attention --sizes 256 512
+"""
+import argparse
+import torch
+from models.networks import SelfAttention
+from benchmarks.common import timeit, peak_memory
+
+
+def full_attention(layer, x):
+    """The original formulation, which builds the whole (HW x HW) energy matrix."""
+    batchsize, C, width, height = x.size()
+    proj_query = layer.query_conv(x).view(batchsize, -1, width*height).permute(0, 2, 1)
+    proj_key = layer.key_conv(x).view(batchsize, -1, width*height)
+    attention = layer.softmax(torch.bmm(proj_query, proj_key))
+    proj_value = layer.value_conv(x).view(batchsize, -1, width*height)
+    out = torch.bmm(proj_value, attention.permute(0, 2, 1)).view(batchsize, C, width, height)
+    return layer.gamma*out + x
+
+
+def run(layers, x, mode, backward):
+    x = x.detach().requires_grad_(backward)
+    with torch.set_grad_enabled(backward):
+        out = full_attention(layers['blocked'], x) if mode == 'full' else layers[mode](x)
+        if backward:
+            out.sum().backward()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[256, 512])
+    parser.add_argument('--ngf', type=int, default=64)
+    parser.add_argument('--batch_size', type=int, default=1)
+    parser.add_argument('--n_iters', type=int, default=2)
+    args = parser.parse_args()
+
+    layer = SelfAttention(args.ngf * 4)
+    torch.nn.init.normal_(layer.gamma)  # gamma is initialized to zero, which would hide the attention output
+    layers = {'blocked': SelfAttention(args.ngf * 4, checkpoint_tokens=float('inf')), 'checkpoint': SelfAttention(args.ngf * 4, checkpoint_tokens=0)}
+    for blocked_layer in layers.values():
+        blocked_layer.load_state_dict(layer.state_dict())
+    print('%6s %10s %10s %12s %14s %12s' % ('size', 'mode', 'backward', 'ms / iter', 'peak mem (MB)', 'max |diff|'))
+    for size in args.sizes:
+        x = torch.randn(args.batch_size, args.ngf * 4, size // 4, size // 4)
+        with torch.no_grad():
+            diff = (full_attention(layer, x) - layer(x)).abs().max().item()
+        for backward in (False, True):
+            for mode in ('full', 'blocked', 'checkpoint'):
+                latency = timeit(lambda: run(layers, x, mode, backward), args.n_iters)
+                memory = peak_memory(run, layers, x, mode, backward)
+                print('%6d %10s %10s %12.1f %14.1f %12.2e' % (size, mode, backward, latency * 1000, memory, diff))
@@ -0,0 +1,66 @@
+"""Synthetic load generator for the desmoking inference server (serve.py).
+
+Without '--url', the script starts an in-process server around a randomly initialized generator on localhost,
+so it runs without checkpoints or a GPU. '--concurrency' client threads each send '--n_requests' random images.
+The script prints the client-side latency percentiles and throughput, and the server's /stats counters.
+
+Example:
+    python -m benchmarks.bench_server --netG resnet_9blocks --concurrency 8 --max_batch 8 --max_wait_ms 5
+    python -m benchmarks.bench_server --url http://127.0.0.1:8000
+"""
+import argparse
+import json
+import threading
+import time
+import urllib.request
+import cv2
+import numpy as np
+from models import networks
+from benchmarks.common import make_opt
+
+
+def client(url, body, n_requests, latencies):
+    for _ in range(n_requests):
+        start = time.perf_counter()
+        request = urllib.request.Request(url + '/desmoke', data=body, headers={'Content-Type': 'image/png'})
+        with urllib.request.urlopen(request) as response:
+            response.read()
+        latencies.append(time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('--url', type=str, default='', help='address of a running server; if empty, start one in-process')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--n_requests', type=int, default=10, help='requests per client thread')
+    parser.add_argument('--image_size', type=int, default=256)
+    args, server_args = parser.parse_known_args()
+
+    url = args.url
+    if not url:
+        from serve import make_server
+        from options.serve_options import ServeOptions
+        opt = make_opt(['--port', '0'] + server_args, is_train=False, options=ServeOptions())
+        netG = networks.define_G(opt.input_nc, opt.output_nc, opt.ngf, opt.netG, opt.norm).eval()
+        server, _ = make_server(netG, opt)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = 'http://%s:%d' % server.server_address[:2]
+
+    image = (np.random.rand(args.image_size, args.image_size, 3) * 255).astype(np.uint8)
+    body = cv2.imencode('.png', image)[1].tobytes()
+    client(url, body, 1, [])  # warm up
+
+    latencies = []
+    threads = [threading.Thread(target=client, args=(url, body, args.n_requests, latencies)) for _ in range(args.concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array(latencies) * 1000.0
+    print('client: %d requests, %.2f req/s, p50 %.1f ms, p99 %.1f ms' % (
+        len(latencies), len(latencies) / elapsed, np.percentile(latencies, 50), np.percentile(latencies, 99)))
+    with urllib.request.urlopen(url + '/stats') as response:
+        print('server:', json.dumps(json.loads(response.read())))
@@ -0,0 +1,92 @@
+"""Compare a distilled student generator (models/distill_model.py) with its teacher on CPU.
+
+The script reports, for the teacher and the student, the number of parameters and the latency for one
+--size x --size image, and the PSNR/SSIM of the student output against the teacher output.
+With --teacher_path / --student_path the trained checkpoints are loaded (e.g. checkpoints/X/latest_net_G_A.pth and
+checkpoints/X_student/latest_net_G.pth); with --dataroot the quality is measured on real images (e.g. testA),
+otherwise on random inputs, which only makes sense with trained checkpoints.
+With --prune_ratio, the pruned student is saved and reloaded with '--model test' (<BaseModel.load_networks>), which must
+give the same outputs, and the reloaded student is compared.
+
+Example:
+    python -m benchmarks.bench_student --teacher_path checkpoints/vit_512_100epoch_vgg/latest_net_G_A.pth \
+        --student_path checkpoints/vit_student/latest_net_G.pth --dataroot datasets/hazy2clear_0206/testA
+"""
+import argparse
+import os
+import tempfile
+import torch
+from models import create_model, networks
+from data import create_dataset
+from util.metrics import psnr, ssim
+from benchmarks.common import make_opt, timeit
+
+
+def build(netG, ngf, norm, path):
+    net = networks.define_G(3, 3, ngf, netG, norm)
+    if path:
+        net.load_state_dict(torch.load(path, map_location='cpu'))
+    return net.eval()
+
+
+def run(net, x):
+    with torch.no_grad():
+        return net(x)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('--teacher_netG', type=str, default='vit')
+    parser.add_argument('--teacher_ngf', type=int, default=64)
+    parser.add_argument('--teacher_path', type=str, default='')
+    parser.add_argument('--student_netG', type=str, default='vit_small')
+    parser.add_argument('--student_ngf', type=int, default=32)
+    parser.add_argument('--student_path', type=str, default='')
+    parser.add_argument('--norm', type=str, default='instance')
+    parser.add_argument('--prune_ratio', type=float, default=0.0, help='prune the MLP hidden units of the student before the comparison')
+    parser.add_argument('--dataroot', type=str, default='', help='folder of images for the quality comparison; random inputs if empty')
+    parser.add_argument('--n_images', type=int, default=16)
+    parser.add_argument('--size', type=int, default=256)
+    parser.add_argument('--n_iters', type=int, default=5)
+    args = parser.parse_args()
+
+    torch.manual_seed(0)
+    teacher = build(args.teacher_netG, args.teacher_ngf, args.norm, args.teacher_path)
+    student = build(args.student_netG, args.student_ngf, args.norm, args.student_path)
+    if args.prune_ratio > 0:
+        for block in student.modules():
+            if isinstance(block, networks.TransformerBlock):
+                block.prune_mlp(args.prune_ratio)
+        with tempfile.TemporaryDirectory() as tmp:  # save the pruned student and reload it like test-new-eva.py
+            os.makedirs(os.path.join(tmp, 'student'))
+            torch.save(student.state_dict(), os.path.join(tmp, 'student', 'latest_net_G.pth'))
+            opt = make_opt(['--model', 'test', '--name', 'student', '--checkpoints_dir', tmp, '--netG', args.student_netG,
+                            '--ngf', str(args.student_ngf), '--norm', args.norm, '--no_dropout'], is_train=False)
+            model = create_model(opt)
+            model.setup(opt)
+            model.eval()
+        x = torch.rand(1, 3, args.size, args.size) * 2 - 1
+        assert torch.equal(run(model.netG, x), run(student, x)), 'the pruned student does not reload with --model test'
+        print('the pruned student reloads with --model test')
+        student = model.netG
+
+    if args.dataroot:
+        opt = make_opt(['--dataroot', args.dataroot, '--model', 'test', '--load_size', str(args.size), '--crop_size', str(args.size),
+                        '--serial_batches', '--no_flip', '--num_threads', '0', '--max_dataset_size', str(args.n_images)], is_train=False)
+        images = torch.cat([data['A'] for data in create_dataset(opt)]).float()
+    else:
+        images = torch.rand(args.n_images, 3, args.size, args.size) * 2 - 1
+
+    fake_teacher = torch.cat([run(teacher, x[None]) for x in images])
+    fake_student = torch.cat([run(student, x[None]) for x in images])
+    x = images[:1]
+    rows = []
+    for name, net in (('teacher', teacher), ('student', student)):
+        rows.append((name, sum(p.numel() for p in net.parameters()), timeit(lambda: run(net, x), args.n_iters)))
+
+    print('1 x 3 x %d x %d, %d %s images' % (args.size, args.size, len(images), 'real' if args.dataroot else 'random'))
+    print('%-8s %12s %12s' % ('', 'params (M)', 'latency (ms)'))
+    for name, params, latency in rows:
+        print('%-8s %12.2f %12.1f' % (name, params / 1e6, latency * 1000))
+    print('student: %.2fx faster, %.1fx fewer parameters; vs teacher: PSNR %.2f dB, SSIM %.4f'
+          % (rows[0][2] / rows[1][2], rows[0][1] / rows[1][1], psnr(fake_student, fake_teacher).mean().item(), ssim(fake_student, fake_teacher).mean().item()))
@@ -0,0 +1,51 @@
+"""Benchmark tiled full-resolution inference (<networks.TiledGenerator>) against tile size.
+
+For each tile size, the script reports the throughput (megapixels per second) and the peak memory
+for one frame of --height x --width pixels, and the largest difference to the untiled output.
+
+Example:
+    python -m benchmarks.bench_tiled_inference --netG resnet_attention --height 720 --width 1280 --tile_sizes 128 256 512
+"""
+import argparse
+import torch
+from models import networks
+from benchmarks.common import timeit, peak_memory
+
+
+def run(net, x):
+    with torch.no_grad():
+        return net(x)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('--netG', type=str, default='resnet_attention')
+    parser.add_argument('--ngf', type=int, default=64)
+    parser.add_argument('--norm', type=str, default='instance')
+    parser.add_argument('--height', type=int, default=512)
+    parser.add_argument('--width', type=int, default=768)
+    parser.add_argument('--tile_sizes', type=int, nargs='+', default=[128, 256, 512])
+    parser.add_argument('--tile_overlap', type=int, default=32)
+    parser.add_argument('--tile_batch', type=int, default=4)
+    parser.add_argument('--n_iters', type=int, default=2)
+    parser.add_argument('--no_reference', action='store_true', help='do not run the untiled generator (e.g. if the frame does not fit in memory)')
+    args = parser.parse_args()
+
+    net = networks.define_G(3, 3, args.ngf, args.netG, args.norm).eval()
+    x = torch.rand(1, 3, args.height, args.width) * 2 - 1
+    megapixels = args.height * args.width / 1e6
+
+    rows = []
+    reference = None
+    if not args.no_reference:
+        reference = run(net, x)
+        rows.append(('untiled', timeit(lambda: run(net, x), args.n_iters), peak_memory(run, net, x), 0.0))
+    for tile_size in args.tile_sizes:
+        tiled = networks.TiledGenerator(net, tile_size, args.tile_overlap, args.tile_batch)
+        diff = (run(tiled, x) - reference).abs().max().item() if reference is not None else float('nan')
+        rows.append((str(tile_size), timeit(lambda: run(tiled, x), args.n_iters), peak_memory(run, tiled, x), diff))
+
+    print('frame %dx%d, overlap %d, %d tiles per call' % (args.height, args.width, args.tile_overlap, args.tile_batch))
+    print('%-10s %12s %10s %14s %12s' % ('tile', 'ms / frame', 'MP / s', 'peak mem (MB)', 'max |diff|'))
+    for name, latency, memory, diff in rows:
+        print('%-10s %12.1f %10.3f %14.1f %12.4f' % (name, latency * 1000, megapixels / latency, memory, diff))
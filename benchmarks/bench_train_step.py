@@ -0,0 +1,43 @@
+"""Benchmark the per-iteration cost of <CycleGANModel.optimize_parameters> on synthetic data.
+
+The 'rebuild_vgg' row reproduces the old behaviour, where a new VGGLoss (including loading the
+VGG19 weights from disk) was created inside every call of <backward_G>.
+
+Example:
+    python -m benchmarks.bench_train_step --crop_size 128 --netG resnet_6blocks --n_iters 5
+"""
+import argparse
+import torch
+from models import create_model
+from models.cycle_gan_model import VGGLoss
+from benchmarks.common import make_opt, timeit
+
+
+def build_model(model_args, batch_size, crop_size):
+    opt = make_opt(model_args + ['--batch_size', str(batch_size), '--crop_size', str(crop_size)])
+    model = create_model(opt)
+    data = {'A': torch.rand(batch_size, opt.input_nc, crop_size, crop_size) * 2 - 1,
+            'B': torch.rand(batch_size, opt.output_nc, crop_size, crop_size) * 2 - 1,
+            'A_paths': ['A'] * batch_size, 'B_paths': ['B'] * batch_size}
+    model.set_input(data)
+    return model
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('--batch_size', type=int, default=1)
+    parser.add_argument('--crop_size', type=int, default=128)
+    parser.add_argument('--n_iters', type=int, default=5)
+    args, model_args = parser.parse_known_args()
+
+    model = build_model(model_args, args.batch_size, args.crop_size)
+    shared = timeit(model.optimize_parameters, args.n_iters)
+
+    def rebuild_step():
+        model.criterionVGG = VGGLoss(model.device)
+        model.optimize_parameters()
+    rebuilt = timeit(rebuild_step, args.n_iters)
+
+    print('%-12s %12s %12s' % ('mode', 'ms / iter', 'img / s'))
+    for name, t in [('rebuild_vgg', rebuilt), ('shared_vgg', shared)]:
+        print('%-12s %12.1f %12.2f' % (name, t * 1000, args.batch_size / t))
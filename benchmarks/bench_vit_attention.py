@@ -0,0 +1,38 @@
+"""Benchmark latency and peak memory of the transformer generators across input resolutions.
+
+[vit] uses full attention over all tokens at 1/4 resolution and grows quadratically with the number of
+pixels; [vit_window] and [vit_linear] should grow linearly.
+
+Example:
+    python -m benchmarks.bench_vit_attention --sizes 128 256 512 --netG vit vit_window vit_linear
+"""
+import argparse
+import torch
+from models import networks
+from benchmarks.common import timeit, peak_memory
+
+
+def run(net, size):
+    with torch.no_grad():
+        net(torch.randn(1, 3, size, size))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('--netG', nargs='+', default=['vit', 'vit_window', 'vit_linear'])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[128, 256, 512])
+    parser.add_argument('--ngf', type=int, default=64)
+    parser.add_argument('--n_iters', type=int, default=3)
+    args = parser.parse_args()
+
+    results = []
+    for name in args.netG:
+        net = networks.define_G(3, 3, args.ngf, name).eval()
+        for size in args.sizes:
+            latency = timeit(lambda: run(net, size), args.n_iters)
+            memory = peak_memory(run, net, size)
+            results.append((name, size, latency, memory))
+
+    print('%-12s %8s %12s %14s' % ('netG', 'size', 'ms / image', 'peak mem (MB)'))
+    for name, size, latency, memory in results:
+        print('%-12s %8d %12.1f %14.1f' % (name, size, latency * 1000, memory))
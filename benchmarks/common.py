@@ -0,0 +1,82 @@
+"""Helper functions shared by the benchmark scripts."""
+import argparse
+import multiprocessing
+import resource
+import time
+import torch
+import models
+import data
+from options.train_options import TrainOptions
+from options.test_options import TestOptions
+
+
+def make_opt(args=(), is_train=True, options=None):
+    """Build an option namespace without touching sys.argv or the checkpoint directory.
+
+    Parameters:
+        args (str list)       -- command line flags, e.g. ['--netG', 'vit']; '--dataroot' defaults to '.'
+        is_train (bool)       -- build training options (TrainOptions) or test options (TestOptions)
+        options (BaseOptions) -- use this option class instead, e.g. ServeOptions()
+
+    The model-specific and dataset-specific options are gathered the same way as <BaseOptions.gather_options>.
+    GPU ids default to CPU ('-1') so the benchmarks run on CPU-only machines.
+    """
+    args = list(args)
+    if '--dataroot' not in args:
+        args += ['--dataroot', '.']
+    if '--gpu_ids' not in args:
+        args += ['--gpu_ids', '-1']
+    if options is None:
+        options = TrainOptions() if is_train else TestOptions()
+    parser = options.initialize(argparse.ArgumentParser())
+    opt, _ = parser.parse_known_args(args)
+    parser = models.get_option_setter(opt.model)(parser, is_train)
+    opt, _ = parser.parse_known_args(args)
+    parser = data.get_option_setter(opt.dataset_mode)(parser, is_train)
+    opt = parser.parse_args(args)
+    opt.isTrain = is_train
+    opt.gpu_ids = [int(i) for i in opt.gpu_ids.split(',') if int(i) >= 0]
+    return opt
+
+
+def timeit(fn, n_iters, n_warmup=1):
+    """Return the mean wall-clock time (in seconds) of <fn> over <n_iters> calls, after <n_warmup> warm-up calls."""
+    for _ in range(n_warmup):
+        fn()
+    if torch.cuda.is_available():
+        torch.cuda.synchronize()
+    start = time.perf_counter()
+    for _ in range(n_iters):
+        fn()
+    if torch.cuda.is_available():
+        torch.cuda.synchronize()
+    return (time.perf_counter() - start) / n_iters
+
+
+def _peak_memory_worker(fn, args, queue):
+    base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    fn(*args)
+    queue.put((resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - base) / 1024.0)
+
+
+def peak_memory(fn, *args):
+    """Return the peak memory (in MB) allocated while running fn(*args).
+
+    On GPU this is the peak of the CUDA caching allocator. On CPU, <fn> runs in a forked
+    process and we report the growth of its peak resident set size, so the measurements
+    of different calls do not influence each other.
+    """
+    if torch.cuda.is_available():
+        torch.cuda.synchronize()
+        torch.cuda.reset_peak_memory_stats()
+        base = torch.cuda.memory_allocated()
+        fn(*args)
+        torch.cuda.synchronize()
+        return (torch.cuda.max_memory_allocated() - base) / 2 ** 20
+    ctx = multiprocessing.get_context('fork')
+    queue = ctx.Queue()
+    process = ctx.Process(target=_peak_memory_worker, args=(fn, args, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
@@ -0,0 +1,33 @@
+"""Build the resized image caches used by '--dataset_cache'.
+
+The script decodes and resizes the images of '<dataroot>/<phase>A' and '<dataroot>/<phase>B' once
+(see <get_resize_transform> in data/base_dataset.py) and stores them in '<dataset_cache>/<phase>A' and '<dataset_cache>/<phase>B'.
+Training with the same --dataset_cache and preprocess options then reads the images from the caches
+and only applies the random crop and flip.
+The caches have to be rebuilt whenever --preprocess, --load_size, --crop_size, the channel options or the images change.
+
+Example:
+    python cache_dataset.py --dataroot ./datasets/DesmokeData_0206 --dataset_cache ./datasets/DesmokeData_0206/cache --load_size 286
+    python train.py --dataroot ./datasets/DesmokeData_0206 --dataset_cache ./datasets/DesmokeData_0206/cache --load_size 286 ...
+
+See options/base_options.py for the preprocess options.
+"""
+import os
+import time
+from options.train_options import TrainOptions
+from data.image_folder import make_dataset
+from data.image_cache import build_cache
+
+if __name__ == '__main__':
+    opt = TrainOptions().parse()   # get the same options as the training run
+    assert opt.dataset_cache, 'please specify the cache directory with --dataset_cache'
+    os.makedirs(opt.dataset_cache, exist_ok=True)
+    btoA = opt.direction == 'BtoA'
+    input_nc = opt.output_nc if btoA else opt.input_nc
+    output_nc = opt.input_nc if btoA else opt.output_nc
+    for domain, nc in (('A', input_nc), ('B', output_nc)):
+        paths = sorted(make_dataset(os.path.join(opt.dataroot, opt.phase + domain), opt.max_dataset_size, opt.image_index_dir))
+        cache = os.path.join(opt.dataset_cache, opt.phase + domain)
+        start = time.time()
+        nbytes = build_cache(cache, paths, opt, grayscale=(nc == 1), num_workers=opt.num_threads)
+        print('cached %d images of %s%s in %s (%.1f MB, %.1f s)' % (len(paths), opt.phase, domain, cache, nbytes / 2 ** 20, time.time() - start))
@@ -11,8 +11,9 @@ Now you can use the dataset class by specifying flag '--dataset_mode dummy'.
 See our template dataset class 'template_dataset.py' for more details.
 """
 import importlib
+import time
 import torch.utils.data
-from data.base_dataset import BaseDataset
+from data.base_dataset import BaseDataset, augment_batch
 
 
 def find_dataset_using_name(dataset_name):
@@ -72,11 +73,22 @@ class CustomDatasetDataLoader():
         dataset_class = find_dataset_using_name(opt.dataset_mode)
         self.dataset = dataset_class(opt)
         print("dataset [%s] was created" % type(self.dataset).__name__)
+        num_workers = int(opt.num_threads)
+        worker_options = {}
+        if num_workers > 0:  # these options are only valid with worker processes
+            worker_options['persistent_workers'] = opt.persistent_workers
+            worker_options['prefetch_factor'] = opt.prefetch_factor
+            if opt.worker_start_method:
+                worker_options['multiprocessing_context'] = opt.worker_start_method
         self.dataloader = torch.utils.data.DataLoader(
             self.dataset,
             batch_size=opt.batch_size,
-            shuffle=not opt.serial_batches,
-            num_workers=int(opt.num_threads))
+            shuffle=not opt.serial_batches and not isinstance(self.dataset, torch.utils.data.IterableDataset),  # streams shuffle themselves
+            num_workers=num_workers,
+            pin_memory=opt.pin_memory and torch.cuda.is_available(),
+            **worker_options)
+        self.data_time = 0.0     # time spent waiting for batches in the last epoch
+        self.compute_time = 0.0  # time spent by the caller between batches in the last epoch
 
     def load_data(self):
         return self
@@ -86,8 +98,36 @@ class CustomDatasetDataLoader():
         return min(len(self.dataset), self.opt.max_dataset_size)
 
     def __iter__(self):
-        """Return a batch of data"""
+        """Return a batch of data
+
+        It also measures how long the caller waits for each batch (<data_time>) and how long it works
+        on a batch before asking for the next one (<compute_time>); see <timing_summary>.
+        """
+        self.data_time = self.compute_time = 0.0
+        start = time.perf_counter()
         for i, data in enumerate(self.dataloader):
             if i * self.opt.batch_size >= self.opt.max_dataset_size:
                 break
+            if self.opt.batch_augment:
+                data = self.augment(data)
+            ready = time.perf_counter()
+            self.data_time += ready - start
             yield data
+            start = time.perf_counter()
+            self.compute_time += start - ready
+
+    def timing_summary(self):
+        """Return a one-line summary of the data wait vs compute time of the last epoch."""
+        total = self.data_time + self.compute_time
+        return 'data wait %.1f sec (%.1f%%), compute %.1f sec' % (
+            self.data_time, 100.0 * self.data_time / total if total > 0 else 0.0, self.compute_time)
+
+    def augment(self, data):
+        """Crop, flip and normalize the uint8 images of a batch (see <augment_batch>)."""
+        params = None
+        for key in ('A', 'B'):
+            if key in data and data[key].dtype == torch.uint8:
+                data[key], batch_params = augment_batch(self.opt, data[key], params)
+                if getattr(self.dataset, 'paired', False):
+                    params = batch_params
+        return data
@@ -1,5 +1,5 @@
 import os
-from data.base_dataset import BaseDataset, get_params, get_transform
+from data.base_dataset import BaseDataset, get_params, get_resize_transform, get_augment_transform
 from data.image_folder import make_dataset
 from PIL import Image
 
@@ -11,6 +11,8 @@ class AlignedDataset(BaseDataset):
     During test time, you need to prepare a directory '/path/to/data/test'.
     """
 
+    paired = True  # with '--batch_augment', A and B get the same crop and flip
+
     def __init__(self, opt):
         """Initialize this dataset class.
 
@@ -19,10 +21,12 @@ class AlignedDataset(BaseDataset):
         """
         BaseDataset.__init__(self, opt)
         self.dir_AB = os.path.join(opt.dataroot, opt.phase)  # get the image directory
-        self.AB_paths = sorted(make_dataset(self.dir_AB, opt.max_dataset_size))  # get image paths
+        self.AB_paths = sorted(make_dataset(self.dir_AB, opt.max_dataset_size, opt.image_index_dir))  # get image paths
         assert(self.opt.load_size >= self.opt.crop_size)   # crop_size should be smaller than the size of loaded image
         self.input_nc = self.opt.output_nc if self.opt.direction == 'BtoA' else self.opt.input_nc
         self.output_nc = self.opt.input_nc if self.opt.direction == 'BtoA' else self.opt.output_nc
+        self.resize_A = get_resize_transform(self.opt, grayscale=(self.input_nc == 1))
+        self.resize_B = get_resize_transform(self.opt, grayscale=(self.output_nc == 1))
 
     def __getitem__(self, index):
         """Return a data point and its metadata information.
@@ -38,17 +42,23 @@ class AlignedDataset(BaseDataset):
         """
         # read a image given a random integer index
         AB_path = self.AB_paths[index]
-        AB = Image.open(AB_path).convert('RGB')
-        # split AB image into A and B
-        w, h = AB.size
-        w2 = int(w / 2)
-        A = AB.crop((0, 0, w2, h))
-        B = AB.crop((w2, 0, w, h))
+        if self.resize_cache is None:
+            AB = Image.open(AB_path).convert('RGB')
+            # split AB image into A and B
+            w, h = AB.size
+            w2 = int(w / 2)
+            A = self.resize_A(AB.crop((0, 0, w2, h)))
+            B = self.resize_B(AB.crop((w2, 0, w, h)))
+        else:  # load the two resized halves from the resize cache
+            w, h = Image.open(AB_path).size  # only reads the header
+            w2 = int(w / 2)
+            A = self.load_image(AB_path, self.resize_A, self.input_nc == 1, box=(0, 0, w2, h))
+            B = self.load_image(AB_path, self.resize_B, self.output_nc == 1, box=(w2, 0, w, h))
 
         # apply the same transform to both A and B
-        transform_params = get_params(self.opt, A.size)
-        A_transform = get_transform(self.opt, transform_params, grayscale=(self.input_nc == 1))
-        B_transform = get_transform(self.opt, transform_params, grayscale=(self.output_nc == 1))
+        transform_params = get_params(self.opt, (w2, h))
+        A_transform = get_augment_transform(self.opt, transform_params, grayscale=(self.input_nc == 1))
+        B_transform = get_augment_transform(self.opt, transform_params, grayscale=(self.output_nc == 1))
 
         A = A_transform(A)
         B = B_transform(B)
@@ -37,7 +37,7 @@ class ColorizationDataset(BaseDataset):
         """
         BaseDataset.__init__(self, opt)
         self.dir = os.path.join(opt.dataroot, opt.phase)
-        self.AB_paths = sorted(make_dataset(self.dir, opt.max_dataset_size))
+        self.AB_paths = sorted(make_dataset(self.dir, opt.max_dataset_size, opt.image_index_dir))
         assert(opt.input_nc == 1 and opt.output_nc == 2 and opt.direction == 'AtoB')
         self.transform = get_transform(self.opt, convert=False)
 
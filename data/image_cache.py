@@ -0,0 +1,105 @@
+"""A pre-decoded, pre-resized image store.
+
+Decoding a PNG/JPEG and resizing it to --load_size gives the same result in every epoch.
+<build_cache> does this work once for a list of images and writes the results into two files:
+    <cache>.bin  -- all resized images, concatenated as raw uint8 HxWxC arrays
+    <cache>.json -- the index: the preprocess parameters, the image paths, and the shape and offset of every image
+<ImageCache> memory-maps the .bin file; reading an image is a tensor view of a slice of the memory map, without any
+decoding, resizing or copy. Only the random crop and flip are left for the data loader, done on the view
+(<augment_tensor>) instead of with PIL.
+
+Build a cache with 'cache_dataset.py' and use it with the flag '--dataset_cache'.
+"""
+import json
+import os
+from multiprocessing import Pool
+import numpy as np
+import torch
+from PIL import Image
+from data.base_dataset import get_resize_params, get_resize_transform
+
+
+_resize = None
+
+
+def _init_worker(opt, grayscale):
+    global _resize
+    _resize = get_resize_transform(opt, grayscale=grayscale)
+
+
+def _load(path):
+    return np.asarray(_resize(Image.open(path).convert('RGB')), dtype=np.uint8)
+
+
+def build_cache(cache, paths, opt, grayscale=False, num_workers=4):
+    """Decode and resize <paths> and write them to the cache files <cache>.bin and <cache>.json.
+
+    Parameters:
+        cache (str)        -- the path of the cache, without extension
+        paths (str list)   -- the image paths
+        opt (Option class) -- the preprocess options; see <get_resize_params>
+        grayscale (bool)   -- if the images are converted to grayscale
+        num_workers (int)  -- the number of processes that decode and resize the images
+
+    Returns the number of bytes of image data.
+    """
+    shapes, offsets = [], []
+    offset = 0
+    with Pool(max(num_workers, 1), initializer=_init_worker, initargs=(opt, grayscale)) as pool, \
+            open(cache + '.bin', 'wb') as f:
+        for image in pool.imap(_load, paths, chunksize=8):  # imap keeps the order of <paths>
+            f.write(image.tobytes())
+            shapes.append(list(image.shape))
+            offsets.append(offset)
+            offset += image.size
+    index = {'params': get_resize_params(opt, grayscale), 'paths': list(paths), 'shapes': shapes, 'offsets': offsets}
+    with open(cache + '.json', 'w') as f:
+        json.dump(index, f)
+    return offset
+
+
+class ImageCache():
+    """Read the resized images written by <build_cache>."""
+
+    def __init__(self, cache, paths=None, params=None):
+        """Load the index of a cache.
+
+        Parameters:
+            cache (str)       -- the path of the cache, without extension
+            paths (str list)  -- if given, the cache must contain exactly these images
+            params (dict)     -- if given, the cache must have been built with these parameters; see <get_resize_params>
+        """
+        self.cache = cache
+        with open(cache + '.json') as f:
+            index = json.load(f)
+        self.paths = index['paths']
+        self.shapes = [tuple(s) for s in index['shapes']]
+        self.offsets = index['offsets']
+        assert paths is None or list(paths) == self.paths, \
+            'the images in %s do not match the dataset; rebuild it with cache_dataset.py' % cache
+        assert params is None or params == index['params'], \
+            '%s was built with %s, but the current options are %s; rebuild it with cache_dataset.py' % (cache, index['params'], params)
+        self.data = None  # the memory map is opened lazily, so that each data loader worker opens its own
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['data'] = None
+        return state
+
+    def __len__(self):
+        return len(self.paths)
+
+    def array(self, index):
+        """Return the <index>-th image as a HxWxC (or HxW for grayscale) uint8 view of the memory map.
+
+        The map is copy-on-write: the view can be wrapped in a tensor, and writing to it never changes the file.
+        """
+        if self.data is None:
+            self.data = np.memmap(self.cache + '.bin', dtype=np.uint8, mode='c')
+        shape = self.shapes[index]
+        offset = self.offsets[index]
+        return self.data[offset:offset + int(np.prod(shape))].reshape(shape)
+
+    def tensor(self, index):
+        """Return the <index>-th image as a HxWxC (or HxW) uint8 tensor that shares the memory map (no copy)."""
+        return torch.from_numpy(self.array(index))
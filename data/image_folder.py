@@ -8,28 +8,139 @@ import torch.utils.data as data
 
 from PIL import Image
 import os
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 
 IMG_EXTENSIONS = [
     '.jpg', '.JPG', '.jpeg', '.JPEG',
     '.png', '.PNG', '.ppm', '.PPM', '.bmp', '.BMP',
     '.tif', '.TIF', '.tiff', '.TIFF',
 ]
+_IMG_EXTENSIONS = tuple(IMG_EXTENSIONS)
+_INDEX_VERSION = 1
+_INDEX_COLUMNS = ('paths', 'sizes', 'mtimes', 'widths', 'heights')  # paths are relative to the indexed directory
 
 
 def is_image_file(filename):
-    return any(filename.endswith(extension) for extension in IMG_EXTENSIONS)
+    return filename.endswith(_IMG_EXTENSIONS)
+
+
+def make_dataset(dir, max_dataset_size=float("inf"), index_dir=''):
+    """Return the paths of the images under <dir> (including subdirectories).
+
+    The images are listed in the same order as the former os.walk version (directories sorted, files in listing order),
+    so '--max_dataset_size' selects the same images. The datasets sort the paths afterwards.
+    With <index_dir> (the option '--image_index_dir'), the listing is kept in an image index there
+    (see <make_dataset_index>), so it is only rebuilt when the tree changes; <dir> itself is never written to.
+    Without it, only the file names are listed (no stat or image header per file), like os.walk.
+    """
+    if index_dir:
+        paths = _load_index(dir, index_dir=index_dir)['paths']
+    else:
+        assert os.path.isdir(dir), '%s is not a valid directory' % dir
+        paths = _scan(dir)[1]
+    prefix = os.path.join(dir, '')
+    images = [prefix + path for path in paths]
+    return images[:min(max_dataset_size, len(images))]
 
 
-def make_dataset(dir, max_dataset_size=float("inf")):
-    images = []
-    assert os.path.isdir(dir), '%s is not a valid directory' % dir
+def make_dataset_index(dir, num_workers=16, index_dir=''):
+    """Return the (relative path, size, mtime, width, height) entries of the images under <dir>, sorted by path.
 
-    for root, _, fnames in sorted(os.walk(dir)):
-        for fname in fnames:
-            if is_image_file(fname):
-                path = os.path.join(root, fname)
-                images.append(path)
-    return images[:min(max_dataset_size, len(images))]
+    Parameters:
+        dir (str)         -- the image directory
+        num_workers (int) -- the number of threads that scan directories and read image headers on a rebuild
+        index_dir (str)   -- if set, the directory where the index is saved; otherwise the tree is scanned every time
+
+    The index is saved as <index_dir>/<hash of the absolute path of dir>.json together with the modification times of
+    all directories in the tree. It is reused as long as none of them changed (i.e. no image was added, removed or
+    renamed), which only costs one stat per directory instead of a walk over every file.
+    """
+    index = _load_index(dir, num_workers, index_dir)
+    return sorted(zip(*(index[column] for column in _INDEX_COLUMNS)))
+
+
+def _index_path(dir, index_dir):
+    return os.path.join(index_dir, hashlib.sha1(os.path.abspath(dir).encode()).hexdigest() + '.json')
+
+
+def _load_index(dir, num_workers=16, index_dir=''):
+    assert os.path.isdir(dir), '%s is not a valid directory' % dir
+    index_path = _index_path(dir, index_dir) if index_dir else None
+    if index_path is not None:
+        try:
+            with open(index_path) as f:
+                index = json.load(f)
+            if index.get('version') == _INDEX_VERSION and all(column in index for column in _INDEX_COLUMNS) and all(
+                    os.stat(os.path.join(dir, d)).st_mtime_ns == mtime for d, mtime in index['dirs'].items()):
+                return index
+        except (OSError, ValueError, KeyError):  # no index yet, a removed directory, or a damaged file
+            pass
+
+    dirs, images = _scan(dir, num_workers, details=True)
+    index = {'version': _INDEX_VERSION, 'dirs': dirs}
+    for column, values in zip(_INDEX_COLUMNS, zip(*images) if images else [[]] * len(_INDEX_COLUMNS)):
+        index[column] = list(values)  # one flat list per column: fast to parse and no garbage collector work
+    if index_path is not None:
+        try:
+            os.makedirs(index_dir, exist_ok=True)
+            with open(index_path, 'w') as f:
+                json.dump(index, f)
+        except OSError:
+            print('could not save the image index of %s in %s' % (dir, index_dir))
+    return index
+
+
+def _scan_dir(root, dir, details):
+    """List one directory: return it with its mtime, its images and its subdirectories (relative to <root>).
+
+    The images are relative paths, or with <details> [path, size, mtime, width, height] entries.
+    """
+    images, subdirs = [], []
+    with os.scandir(os.path.join(root, dir)) as it:
+        for entry in it:
+            if entry.is_dir():
+                if not entry.is_symlink():  # like os.walk, do not follow symlinked directories
+                    subdirs.append(os.path.join(dir, entry.name))
+            elif is_image_file(entry.name):
+                path = os.path.join(dir, entry.name)
+                images.append([path] + _image_details(entry) if details else path)
+    return dir, os.stat(os.path.join(root, dir)).st_mtime_ns, images, subdirs
+
+
+def _image_details(entry):
+    try:
+        st = entry.stat()
+    except OSError:  # e.g. a broken symlink: listed, like os.walk does
+        return [0, 0, 0, 0]
+    return [st.st_size, st.st_mtime_ns] + _image_size(entry.path)
+
+
+def _image_size(path):
+    try:
+        with Image.open(path) as img:  # only reads the header
+            return list(img.size)
+    except OSError:
+        return [0, 0]
+
+
+def _scan(root, num_workers=16, details=False):
+    """Scan the tree under <root>, one directory per task; with <details>, also stat the images and read their headers.
+
+    The images are returned directory by directory in sorted order, and in listing order within a directory, like os.walk.
+    """
+    dirs, images = {}, {}
+    with ThreadPoolExecutor(max(num_workers, 1)) as pool:
+        pending = {pool.submit(_scan_dir, root, '', details)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                dir, mtime, dir_images, subdirs = future.result()
+                dirs[dir] = mtime
+                images[dir] = dir_images
+                pending |= {pool.submit(_scan_dir, root, d, details) for d in subdirs}
+    return dirs, [image for dir in sorted(images) for image in images[dir]]
 
 
 def default_loader(path):
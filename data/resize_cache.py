@@ -0,0 +1,148 @@
+"""A content-addressed on-disk cache of resized images, shared by all runs and datasets.
+
+Every entry is the output of the deterministic part of the transform (<get_resize_transform>) for one image,
+stored as a .npy file. Its key is the hash of the source file's content together with the preprocess parameters,
+so experiments with different --load_size/--crop_size/--preprocess share one cache directory, and an edited
+image is never served from a stale entry.
+The content hashes of the source files are kept in a side-table (<root>/sources, one small file per source), keyed on
+the path, size and modification time of the file, so a source is only read and hashed again when it changes.
+The cache is bounded by size: when it grows past its limit, the least recently used entries are removed
+(the modification time of an entry is refreshed on every hit). A damaged entry is removed and computed again.
+
+Enable it with the flag '--resize_cache <dir>' (see options/base_options.py).
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+import numpy as np
+from PIL import Image
+
+
+class ResizeCache():
+    """Load resized images from <root>, or compute and store them on a miss."""
+
+    def __init__(self, root, max_size_mb=2048):
+        """Open (or create) a cache directory.
+
+        Parameters:
+            root (str)          -- the cache directory
+            max_size_mb (float) -- the cache is trimmed to 90% of this size when it grows past it
+
+        The hit/miss counters and the size estimate live in shared memory, so they also count
+        the lookups done by data loader workers.
+        """
+        self.root = root
+        self.max_size = int(max_size_mb * 2 ** 20)
+        os.makedirs(root, exist_ok=True)
+        self.hits = multiprocessing.Value('q', 0)
+        self.misses = multiprocessing.Value('q', 0)
+        self.size = multiprocessing.Value('q', sum(size for _, _, size in self.entries()))
+        self.source_hashes = {}  # (path, size, mtime) -> content hash, per process; the side-table persists them
+
+    def entries(self):
+        """Return the (path, mtime, size) list of the cache entries."""
+        result = []
+        for root, _, fnames in os.walk(self.root):
+            for fname in fnames:
+                if fname.endswith('.npy'):
+                    path = os.path.join(root, fname)
+                    try:
+                        st = os.stat(path)
+                    except FileNotFoundError:  # removed by another process
+                        continue
+                    result.append((path, st.st_mtime, st.st_size))
+        return result
+
+    def source_hash(self, path):
+        """Return the content hash of a source image; it is recomputed only if the file's size or mtime change.
+
+        The hash is looked up in memory, then in the side-table, which survives the data loader workers of every epoch
+        (without '--persistent_workers') and new runs; only then is the source file read.
+        """
+        st = os.stat(path)
+        stamp = [os.path.abspath(path), st.st_size, st.st_mtime_ns]
+        key = tuple(stamp)
+        if key not in self.source_hashes:
+            record = os.path.join(self.root, 'sources', hashlib.sha1(stamp[0].encode()).hexdigest() + '.json')
+            try:
+                with open(record) as f:
+                    saved = json.load(f)
+                if saved['stamp'] == stamp:
+                    self.source_hashes[key] = saved['hash']
+            except (OSError, ValueError, KeyError):  # not hashed yet, or a damaged record
+                pass
+            if key not in self.source_hashes:
+                with open(path, 'rb') as f:
+                    self.source_hashes[key] = hashlib.sha1(f.read()).hexdigest()
+                os.makedirs(os.path.dirname(record), exist_ok=True)
+                tmp = '%s.%d.tmp' % (record, os.getpid())
+                with open(tmp, 'w') as f:
+                    json.dump({'stamp': stamp, 'hash': self.source_hashes[key]}, f)
+                os.replace(tmp, record)
+        return self.source_hashes[key]
+
+    def entry(self, path, params):
+        key = hashlib.sha1((self.source_hash(path) + json.dumps(params, sort_keys=True)).encode()).hexdigest()
+        return os.path.join(self.root, key[:2], key + '.npy')
+
+    def load(self, path, params, make):
+        """Return the cached image for (<path>, <params>), or compute it with make() and store it.
+
+        Parameters:
+            path (str)      -- the source image
+            params (dict)   -- everything else the result depends on, e.g. <get_resize_params>
+            make (function) -- returns the resized PIL image
+        """
+        entry = self.entry(path, params)
+        try:
+            image = Image.fromarray(np.load(entry))
+            os.utime(entry)  # mark it as recently used
+            with self.hits.get_lock():
+                self.hits.value += 1
+            return image
+        except FileNotFoundError:  # not cached yet
+            pass
+        except (ValueError, EOFError):  # a damaged entry (entries are written atomically): remove it and compute it again
+            try:
+                size = os.path.getsize(entry)
+                os.remove(entry)
+                with self.size.get_lock():
+                    self.size.value -= size
+            except FileNotFoundError:  # already removed by another process
+                pass
+        image = make()
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+        tmp = '%s.%d.tmp' % (entry, os.getpid())
+        with open(tmp, 'wb') as f:
+            np.save(f, np.asarray(image))
+        os.replace(tmp, entry)  # atomic, so readers never see a partial entry
+        with self.misses.get_lock():
+            self.misses.value += 1
+        with self.size.get_lock():
+            self.size.value += os.path.getsize(entry)
+            if self.size.value > self.max_size:
+                self.evict()
+        return image
+
+    def evict(self):
+        """Remove the least recently used entries until the cache is below 90% of its maximum size."""
+        entries = sorted(self.entries(), key=lambda e: e[1])
+        total = sum(size for _, _, size in entries)
+        for path, _, size in entries:
+            if total <= 0.9 * self.max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        self.size.value = total
+
+    def hit_rate(self):
+        lookups = self.hits.value + self.misses.value
+        return self.hits.value / lookups if lookups else 0.0
+
+    def __str__(self):
+        return 'resize cache %s: %d hits, %d misses (hit rate %.1f%%), %.1f MB / %.1f MB' % (
+            self.root, self.hits.value, self.misses.value, 100 * self.hit_rate(), self.size.value / 2 ** 20, self.max_size / 2 ** 20)
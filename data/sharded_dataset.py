@@ -0,0 +1,181 @@
+"""A streaming version of the unaligned dataset that reads tar shards instead of one file per image.
+
+Pack a dataset with 'make_shards.py': for every domain directory (e.g. trainA) it writes
+    trainA-00000.tar, trainA-00001.tar, ...  -- the encoded images, in order, each followed by a small .json with its metadata
+    trainA.json                              -- the shard names and the number of images in each shard
+Then train with '--dataroot <shard directory> --dataset_mode sharded'. Every data loader worker reads its own subset
+of the shards sequentially and shuffles the images with a buffer of '--shuffle_buffer' images. Each shard is read by
+one worker only, so at most as many workers as the smaller domain has shards get work; pack the dataset with a
+smaller '--shard_size' to use more workers.
+"""
+import io
+import json
+import os
+import random
+import tarfile
+import torch.utils.data
+from PIL import Image
+from data.base_dataset import BaseDataset, get_resize_transform, get_augment_transform
+from data.image_folder import make_dataset_index
+
+
+def write_shards(dir, prefix, shard_size=256):
+    """Pack the images under <dir> into tar shards <prefix>-00000.tar, ... and write the shard index <prefix>.json.
+
+    Parameters:
+        dir (str)           -- the image directory
+        prefix (str)        -- the path of the shards, without the shard number and extension
+        shard_size (float)  -- a new shard is started when a shard would grow past this size (in MB)
+
+    The images are stored as they are (no decoding or re-encoding). Returns the number of shards.
+    """
+    limit = shard_size * 2 ** 20
+    shards, counts = [], []
+    tar = None
+    for i, (path, size, _, width, height) in enumerate(make_dataset_index(dir)):
+        if tar is None or (tar_size + size > limit and counts[-1] > 0):
+            if tar is not None:
+                tar.close()
+            shards.append('%s-%05d.tar' % (os.path.basename(prefix), len(shards)))
+            counts.append(0)
+            tar = tarfile.open(os.path.join(os.path.dirname(prefix), shards[-1]), 'w')
+            tar_size = 0
+        key = '%08d' % i
+        tar.add(os.path.join(dir, path), arcname=key + os.path.splitext(path)[1])
+        meta = json.dumps({'path': os.path.join(dir, path), 'width': width, 'height': height}).encode()
+        info = tarfile.TarInfo(key + '.json')
+        info.size = len(meta)
+        tar.addfile(info, io.BytesIO(meta))
+        counts[-1] += 1
+        tar_size += size
+    if tar is not None:
+        tar.close()
+    with open(prefix + '.json', 'w') as f:
+        json.dump({'shards': shards, 'counts': counts}, f)
+    return len(shards)
+
+
+def read_shard(path):
+    """Yield the (source path, encoded image) pairs of a shard, reading the tar file sequentially."""
+    image = None
+    with tarfile.open(path, 'r|') as tar:  # stream mode: one sequential read, no seeking
+        for member in tar:
+            data = tar.extractfile(member).read()
+            if member.name.endswith('.json'):
+                yield json.loads(data)['path'], image
+            else:
+                image = data
+
+
+class ShardedDataset(BaseDataset, torch.utils.data.IterableDataset):
+    """This dataset class streams unaligned/unpaired images from tar shards.
+
+    It requires the shard indices '<dataroot>/trainA.json' and '<dataroot>/trainB.json' written by make_shards.py
+    (or testA/testB with '--phase test'). As in <UnalignedDataset>, A and B images are paired randomly.
+    """
+
+    @staticmethod
+    def modify_commandline_options(parser, is_train):
+        """Add new dataset-specific options, and rewrite default values for existing options.
+
+        Parameters:
+            parser          -- original option parser
+            is_train (bool) -- whether training phase or test phase. You can use this flag to add training-specific or test-specific options.
+
+        Returns:
+            the modified parser.
+        """
+        parser.add_argument('--shuffle_buffer', type=int, default=256, help='# encoded images each worker keeps per domain to shuffle the stream')
+        return parser
+
+    def __init__(self, opt):
+        """Initialize this dataset class.
+
+        Parameters:
+            opt (Option class) -- stores all the experiment flags; needs to be a subclass of BaseOptions
+        """
+        BaseDataset.__init__(self, opt)
+        self.shards_A, self.A_size = self.read_index(os.path.join(opt.dataroot, opt.phase + 'A'))
+        self.shards_B, self.B_size = self.read_index(os.path.join(opt.dataroot, opt.phase + 'B'))
+        btoA = self.opt.direction == 'BtoA'
+        input_nc = self.opt.output_nc if btoA else self.opt.input_nc       # get the number of channels of input image
+        output_nc = self.opt.input_nc if btoA else self.opt.output_nc      # get the number of channels of output image
+        self.resize_A = get_resize_transform(self.opt, grayscale=(input_nc == 1))
+        self.resize_B = get_resize_transform(self.opt, grayscale=(output_nc == 1))
+        self.transform_A = get_augment_transform(self.opt, grayscale=(input_nc == 1))
+        self.transform_B = get_augment_transform(self.opt, grayscale=(output_nc == 1))
+        self.max_workers = min(len(self.shards_A), len(self.shards_B))
+        if opt.num_threads > self.max_workers:
+            print('%d data loader workers but only %d shards in the smaller domain: %d workers stay idle; '
+                  'use a smaller --shard_size in make_shards.py' % (opt.num_threads, self.max_workers, opt.num_threads - self.max_workers))
+
+    @staticmethod
+    def read_index(prefix):
+        """Return the shard paths and the number of images of the shard index <prefix>.json."""
+        assert os.path.isfile(prefix + '.json'), '%s.json not found; pack the dataset with make_shards.py' % prefix
+        with open(prefix + '.json') as f:
+            index = json.load(f)
+        assert index['shards'], '%s.json has no shards' % prefix
+        return [os.path.join(os.path.dirname(prefix), shard) for shard in index['shards']], sum(index['counts'])
+
+    def stream(self, shards, worker_id, num_workers, endless=False):
+        """Yield (path, PIL image) pairs from this worker's shards, shuffled with a buffer.
+
+        Parameters:
+            shards (str list) -- the shard paths of one domain
+            worker_id (int)   -- the id of this data loader worker
+            num_workers (int) -- the number of active data loader workers, at most the number of shards
+            endless (bool)    -- restart from the first shard when all were read, instead of stopping
+
+        The shards are split between the workers, so each shard is read by one worker per epoch.
+        """
+        shards = shards[worker_id::num_workers]
+        assert shards, 'worker %d of %d has no shards' % (worker_id, num_workers)  # an endless stream of nothing never yields
+        buffer_size = 1 if self.opt.serial_batches else max(self.opt.shuffle_buffer, 1)
+        buffer = []
+        while True:
+            order = list(shards)
+            if not self.opt.serial_batches:
+                random.shuffle(order)
+            for shard in order:
+                for sample in read_shard(shard):
+                    buffer.append(sample)
+                    if len(buffer) >= buffer_size:
+                        yield self.pop(buffer)
+            if not endless:
+                break
+        while buffer:
+            yield self.pop(buffer)
+
+    @staticmethod
+    def pop(buffer):
+        """Remove a random sample from the shuffle buffer and decode it."""
+        i = random.randrange(len(buffer))
+        buffer[i], buffer[-1] = buffer[-1], buffer[i]
+        path, data = buffer.pop()
+        return path, Image.open(io.BytesIO(data)).convert('RGB')
+
+    def __iter__(self):
+        """Yield this worker's share of one epoch: dictionaries with A, B, A_paths and B_paths as in <UnalignedDataset>.
+
+        An epoch is one pass over the larger domain; the images of the other domain are drawn from an endless stream.
+        Workers beyond the number of shards of the smaller domain yield nothing.
+        """
+        worker = torch.utils.data.get_worker_info()
+        worker_id, num_workers = (worker.id, worker.num_workers) if worker is not None else (0, 1)
+        num_workers = min(num_workers, self.max_workers)
+        if worker_id >= num_workers:
+            return
+        A_larger = self.A_size >= self.B_size
+        stream_A = self.stream(self.shards_A, worker_id, num_workers, endless=not A_larger)
+        stream_B = self.stream(self.shards_B, worker_id, num_workers, endless=A_larger)
+        for (A_path, A_img), (B_path, B_img) in zip(stream_A, stream_B):
+            A = self.transform_A(self.resize_A(A_img))
+            B = self.transform_B(self.resize_B(B_img))
+            yield {'A': A, 'B': B, 'A_paths': A_path, 'B_paths': B_path}
+
+    __getitem__ = None  # an IterableDataset is not indexable; None also satisfies the abstract method of BaseDataset
+
+    def __len__(self):
+        """Return the number of images in one epoch, the larger of the two domains."""
+        return max(self.A_size, self.B_size)
@@ -1,6 +1,5 @@
-from data.base_dataset import BaseDataset, get_transform
+from data.base_dataset import BaseDataset, get_resize_transform, get_augment_transform
 from data.image_folder import make_dataset
-from PIL import Image
 
 
 class SingleDataset(BaseDataset):
@@ -16,9 +15,11 @@ class SingleDataset(BaseDataset):
             opt (Option class) -- stores all the experiment flags; needs to be a subclass of BaseOptions
         """
         BaseDataset.__init__(self, opt)
-        self.A_paths = sorted(make_dataset(opt.dataroot, opt.max_dataset_size))
+        self.A_paths = sorted(make_dataset(opt.dataroot, opt.max_dataset_size, opt.image_index_dir))
         input_nc = self.opt.output_nc if self.opt.direction == 'BtoA' else self.opt.input_nc
-        self.transform = get_transform(opt, grayscale=(input_nc == 1))
+        self.grayscale = input_nc == 1
+        self.resize = get_resize_transform(opt, grayscale=self.grayscale)
+        self.transform = get_augment_transform(opt, grayscale=self.grayscale)
 
     def __getitem__(self, index):
         """Return a data point and its metadata information.
@@ -31,7 +32,7 @@ class SingleDataset(BaseDataset):
             A_paths(str) - - the path of the image
         """
         A_path = self.A_paths[index]
-        A_img = Image.open(A_path).convert('RGB')
+        A_img = self.load_image(A_path, self.resize, self.grayscale)
         A = self.transform(A_img)
         return {'A': A, 'A_paths': A_path}
 
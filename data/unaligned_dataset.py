@@ -1,7 +1,7 @@
 import os
-from data.base_dataset import BaseDataset, get_transform
+from data.base_dataset import BaseDataset, get_resize_params, get_resize_transform, get_augment_transform, augment_tensor
+from data.image_cache import ImageCache
 from data.image_folder import make_dataset
-from PIL import Image
 import random
 
 
@@ -26,15 +26,23 @@ class UnalignedDataset(BaseDataset):
         self.dir_A = os.path.join(opt.dataroot, opt.phase + 'A')  # create a path '/path/to/data/trainA'
         self.dir_B = os.path.join(opt.dataroot, opt.phase + 'B')  # create a path '/path/to/data/trainB'
 
-        self.A_paths = sorted(make_dataset(self.dir_A, opt.max_dataset_size))   # load images from '/path/to/data/trainA'
-        self.B_paths = sorted(make_dataset(self.dir_B, opt.max_dataset_size))    # load images from '/path/to/data/trainB'
+        self.A_paths = sorted(make_dataset(self.dir_A, opt.max_dataset_size, opt.image_index_dir))   # load images from '/path/to/data/trainA'
+        self.B_paths = sorted(make_dataset(self.dir_B, opt.max_dataset_size, opt.image_index_dir))    # load images from '/path/to/data/trainB'
         self.A_size = len(self.A_paths)  # get the size of dataset A
         self.B_size = len(self.B_paths)  # get the size of dataset B
         btoA = self.opt.direction == 'BtoA'
         input_nc = self.opt.output_nc if btoA else self.opt.input_nc       # get the number of channels of input image
         output_nc = self.opt.input_nc if btoA else self.opt.output_nc      # get the number of channels of output image
-        self.transform_A = get_transform(self.opt, grayscale=(input_nc == 1))
-        self.transform_B = get_transform(self.opt, grayscale=(output_nc == 1))
+        self.resize_A = get_resize_transform(self.opt, grayscale=(input_nc == 1))
+        self.resize_B = get_resize_transform(self.opt, grayscale=(output_nc == 1))
+        self.transform_A = get_augment_transform(self.opt, grayscale=(input_nc == 1))
+        self.transform_B = get_augment_transform(self.opt, grayscale=(output_nc == 1))
+        self.grayscale_A, self.grayscale_B = input_nc == 1, output_nc == 1
+        if opt.dataset_cache:  # read pre-resized images built by cache_dataset.py
+            self.cache_A = ImageCache(os.path.join(opt.dataset_cache, opt.phase + 'A'), self.A_paths, get_resize_params(opt, self.grayscale_A))
+            self.cache_B = ImageCache(os.path.join(opt.dataset_cache, opt.phase + 'B'), self.B_paths, get_resize_params(opt, self.grayscale_B))
+        else:
+            self.cache_A = self.cache_B = None
 
     def __getitem__(self, index):
         """Return a data point and its metadata information.
@@ -54,11 +62,15 @@ class UnalignedDataset(BaseDataset):
         else:   # randomize the index for domain B to avoid fixed pairs.
             index_B = random.randint(0, self.B_size - 1)
         B_path = self.B_paths[index_B]
-        A_img = Image.open(A_path).convert('RGB')
-        B_img = Image.open(B_path).convert('RGB')
-        # apply image transformation
-        A = self.transform_A(A_img)
-        B = self.transform_B(B_img)
+        if self.cache_A is not None:  # crop and flip tensor views of the cache, without PIL
+            A = augment_tensor(self.opt, self.cache_A.tensor(index % self.A_size))
+            B = augment_tensor(self.opt, self.cache_B.tensor(index_B))
+        else:
+            A_img = self.load_image(A_path, self.resize_A, self.grayscale_A)
+            B_img = self.load_image(B_path, self.resize_B, self.grayscale_B)
+            # apply the random part of the image transformation
+            A = self.transform_A(A_img)
+            B = self.transform_B(B_img)
 
         return {'A': A, 'B': B, 'A_paths': A_path, 'B_paths': B_path}
 
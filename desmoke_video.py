@@ -0,0 +1,127 @@
+"""Desmoking script for laparoscopic video recordings.
+
+It loads a generator with '--model test' (see test-new-eva.py) and runs it on every frame of the video given by '--dataroot'.
+The script runs as a three-stage pipeline:
+    -- a producer thread decodes frames with OpenCV and stacks them into batches of '--batch_size';
+    -- the main thread runs the batches through the generator;
+    -- a consumer thread converts the results back to frames at the original resolution and encodes them.
+The stages are connected by queues of at most '--queue_size' batches, so memory stays flat for any video length.
+The sustained throughput (frames per second) is printed every '--report_freq' frames and compared with the frame rate of the video.
+
+Frames are resized to '--load_size' (or, with '--preprocess none', kept at their size rounded to a multiple of 4).
+Use '--preprocess none --tile_size 256' to process full-resolution frames on overlapping tiles.
+
+Example:
+    python desmoke_video.py --dataroot surgery.mp4 --name vit_512_100epoch_vgg --model test --netG vit --no_dropout --batch_size 4
+"""
+import os
+import queue
+import threading
+import time
+import cv2
+import numpy as np
+import torch
+from options.video_options import VideoOptions
+from models import create_model
+from util import util
+
+
+def read_frames(capture, opt, size, frames_queue):
+    """Producer: decode frames, convert them to normalized tensors, and put them into <frames_queue> in batches.
+
+    The last item is None, or the exception that stopped the decoding; the main thread re-raises it.
+    """
+    batch = []
+    count = 0
+    try:
+        while opt.max_frames <= 0 or count < opt.max_frames:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            frame = cv2.cvtColor(cv2.resize(frame, size, interpolation=cv2.INTER_CUBIC), cv2.COLOR_BGR2RGB)
+            batch.append(torch.from_numpy(frame).permute(2, 0, 1))
+            count += 1
+            if len(batch) == opt.batch_size:
+                frames_queue.put(torch.stack(batch))
+                batch = []
+        if batch:
+            frames_queue.put(torch.stack(batch))
+    except Exception as error:
+        frames_queue.put(error)
+    else:
+        frames_queue.put(None)
+
+
+def write_frames(writer, size, results_queue, errors):
+    """Consumer: resize the generated frames back to the video size and encode them.
+
+    An exception is appended to <errors> for the main thread to re-raise; the queue is still emptied until the final
+    None, so the main thread never blocks on a full queue.
+    """
+    while True:
+        images = results_queue.get()
+        if images is None:
+            break
+        if errors:
+            continue
+        try:
+            for image in images:
+                writer.write(cv2.resize(cv2.cvtColor(image, cv2.COLOR_RGB2BGR), size, interpolation=cv2.INTER_CUBIC))
+        except Exception as error:
+            errors.append(error)
+
+
+if __name__ == '__main__':
+    opt = VideoOptions().parse()  # get video options
+    assert opt.model == 'test', 'desmoke_video.py uses a single generator; please use --model test'
+    capture = cv2.VideoCapture(opt.dataroot)
+    assert capture.isOpened(), 'cannot open video %s' % opt.dataroot
+    fps = capture.get(cv2.CAP_PROP_FPS) or 25.0
+    width, height = int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)), int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    output = opt.output or os.path.join(opt.results_dir, opt.name, os.path.splitext(os.path.basename(opt.dataroot))[0] + '_desmoked.mp4')
+    util.mkdirs(os.path.dirname(os.path.abspath(output)))
+    writer = cv2.VideoWriter(output, cv2.VideoWriter_fourcc(*opt.fourcc), fps, (width, height))
+
+    model = create_model(opt)      # create a model given opt.model and other options
+    model.setup(opt)               # regular setup: load and print networks
+    if opt.eval:
+        model.eval()
+
+    frames_queue = queue.Queue(maxsize=opt.queue_size)
+    results_queue = queue.Queue(maxsize=opt.queue_size)
+    write_errors = []  # filled by the consumer thread
+    producer = threading.Thread(target=read_frames, args=(capture, opt, util.inference_size(opt, width, height), frames_queue), daemon=True)
+    consumer = threading.Thread(target=write_frames, args=(writer, (width, height), results_queue, write_errors), daemon=True)
+    producer.start()
+    consumer.start()
+
+    print('desmoking %s (%dx%d, %.2f fps) -> %s' % (opt.dataroot, width, height, fps, output))
+    start_time = time.time()
+    n_frames, next_report = 0, opt.report_freq
+    while True:
+        frames = frames_queue.get()
+        if frames is None:
+            break
+        if isinstance(frames, Exception):  # the producer failed
+            raise frames
+        real = frames.float().div_(127.5).sub_(1.0)  # uint8 [0, 255] -> [-1, 1], as the Normalize in <get_transform>
+        model.set_input({'A': real, 'A_paths': [opt.dataroot] * len(real)})
+        model.test()
+        results_queue.put(util.tensor2im_batch(model.get_current_visuals()['fake']))
+        if write_errors:  # the consumer failed
+            raise write_errors[0]
+        n_frames += len(real)
+        if n_frames >= next_report:
+            elapsed = time.time() - start_time
+            print('%d frames, %.2f fps (%.2fx real time)' % (n_frames, n_frames / elapsed, n_frames / elapsed / fps))
+            next_report += opt.report_freq
+    results_queue.put(None)
+    consumer.join()
+    producer.join()
+    if write_errors:
+        raise write_errors[0]
+    capture.release()
+    writer.release()
+
+    elapsed = time.time() - start_time
+    print('finished %d frames in %.1f sec: %.2f fps sustained, %.2fx real time' % (n_frames, elapsed, n_frames / max(elapsed, 1e-8), n_frames / max(elapsed, 1e-8) / fps))
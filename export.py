@@ -0,0 +1,67 @@
+"""Export a trained generator as a self-contained TorchScript file.
+
+The generator is built and loaded like in test-new-eva.py ('--model test', <BaseModel.load_networks>), traced on an
+example input of '--export_size' pixels and saved with its metadata (netG, norm, ngf, channels, traced input size, ...).
+The exported file is loaded by util/runtime.py, which only depends on torch:
+
+    from util.runtime import ExportedGenerator
+    netG = ExportedGenerator('checkpoints/vit_512_100epoch_vgg/latest_net_G.torchscript.pt')
+    fake = netG(real)
+
+The test options that replace the generator (e.g. '--fuse_generator', '--guided_radius') are applied before tracing,
+so they are part of the exported graph. Python control flow that depends on the input size (the tiling of
+'--tile_size', the window padding of [vit_window], the chunk count of the self-attention) is fixed at the traced size,
+so the exported generator only accepts inputs of '--export_size' pixels; <ExportedGenerator> rejects other sizes.
+
+Example:
+    python export.py --name vit_512_100epoch_vgg --model test --netG vit --no_dropout --gpu_ids -1 --export_size 256
+Use 'python -m benchmarks.bench_export' to compare the exported and eager generators.
+"""
+import json
+import os
+import torch
+from options.export_options import ExportOptions
+from models import create_model
+from util.runtime import META_FILE
+
+
+def generator_meta(netG, opt, input_size):
+    """Return the metadata stored with an exported generator; see <util.runtime.ExportedGenerator>."""
+    return {'netG': opt.netG, 'norm': opt.norm, 'ngf': opt.ngf, 'input_nc': opt.input_nc, 'output_nc': opt.output_nc,
+            'no_dropout': opt.no_dropout, 'name': opt.name, 'epoch': opt.epoch, 'fuse_generator': opt.fuse_generator,
+            'input_size': list(input_size), 'value_range': [-1.0, 1.0],
+            'num_params': sum(p.numel() for p in netG.parameters()), 'torch_version': torch.__version__}
+
+
+def export_generator(netG, opt, path, device=torch.device('cpu')):
+    """Trace the (loaded) generator <netG> and save it with its metadata to <path>
+
+    Parameters:
+        netG (network)     -- the generator, possibly wrapped in DataParallel
+        opt (Option class) -- export options (export_size, export_batch, no_freeze) and the options netG was built with
+        path (str)         -- the exported file
+        device             -- the device of the generator
+
+    Returns the metadata.
+    """
+    if isinstance(netG, torch.nn.DataParallel):
+        netG = netG.module
+    netG.eval()
+    example = torch.rand(opt.export_batch, opt.input_nc, opt.export_size, opt.export_size, device=device) * 2 - 1
+    with torch.no_grad():
+        traced = torch.jit.trace(netG, example)
+    if not opt.no_freeze:  # fold the weights into the graph as constants
+        traced = torch.jit.freeze(traced)
+    meta = generator_meta(netG, opt, (opt.export_size, opt.export_size))
+    torch.jit.save(traced, path, _extra_files={META_FILE: json.dumps(meta)})
+    return meta
+
+
+if __name__ == '__main__':
+    opt = ExportOptions().parse()  # get export options
+    assert opt.model == 'test', 'export.py exports a single generator; please use --model test'
+    model = create_model(opt)      # create a model given opt.model and other options
+    model.setup(opt)               # load the generator
+    path = opt.export_path or os.path.join(model.save_dir, '%s_net_G%s.torchscript.pt' % (opt.epoch, opt.model_suffix))
+    meta = export_generator(model.netG, opt, path, model.device)
+    print('exported %s (%d parameters) to %s (%.1f MB)' % (meta['netG'], meta['num_params'], path, os.path.getsize(path) / 2 ** 20))
@@ -0,0 +1,30 @@
+"""Pack a dataset into tar shards for '--dataset_mode sharded'.
+
+Every domain directory of <dataroot> (e.g. trainA, trainB, testA, testB) is written as a sequence of tar shards
+of about --shard_size MB each, plus a shard index; see data/sharded_dataset.py. The images are copied as they are.
+
+Example:
+    python make_shards.py --dataroot ./datasets/DesmokeData_0206 --output ./datasets/DesmokeData_0206_shards
+    python train.py --dataroot ./datasets/DesmokeData_0206_shards --dataset_mode sharded --num_threads 8 ...
+"""
+import argparse
+import os
+import time
+from data.sharded_dataset import write_shards
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('--dataroot', required=True, help='path to images (should have subfolders trainA, trainB, testA, testB, etc)')
+    parser.add_argument('--output', required=True, help='the shard directory')
+    parser.add_argument('--domains', type=str, nargs='+', default=['trainA', 'trainB', 'testA', 'testB'], help='the subfolders to pack; missing ones are skipped')
+    parser.add_argument('--shard_size', type=float, default=256, help='maximum size of a shard in MB')
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+    for domain in args.domains:
+        dir = os.path.join(args.dataroot, domain)
+        if not os.path.isdir(dir):
+            continue
+        start = time.time()
+        n_shards = write_shards(dir, os.path.join(args.output, domain), args.shard_size)
+        print('packed %s into %d shards (%.1f s)' % (dir, n_shards, time.time() - start))
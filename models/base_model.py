@@ -3,6 +3,8 @@ import torch
 from collections import OrderedDict
 from abc import ABC, abstractmethod
 from . import networks
+from . import fusion
+from . import quantization
 
 
 class BaseModel(ABC):
@@ -86,8 +88,67 @@ class BaseModel(ABC):
         if not self.isTrain or opt.continue_train:
             load_suffix = 'iter_%d' % opt.load_iter if opt.load_iter > 0 else opt.epoch
             self.load_networks(load_suffix)
+        if not self.isTrain and opt.int8:
+            assert not opt.fuse_generator, '--int8 and --fuse_generator cannot be combined'
+            self.load_quantized_networks(load_suffix, opt.quant_backend)
+        if not self.isTrain and opt.visuals:
+            visual_names = opt.visuals.split(',')
+            assert all(name in self.visual_names for name in visual_names), 'visuals must be chosen from %s' % self.visual_names
+            self.visual_names = visual_names
+        if not self.isTrain and opt.fuse_generator:
+            self.wrap_generators(lambda net: fusion.fuse_generator(net, not opt.no_channels_last))
+        if not self.isTrain and opt.tile_size > 0:
+            self.tile_generators(opt.tile_size, opt.tile_overlap, opt.tile_batch)
+        if not self.isTrain and opt.guided_radius > 0:
+            self.wrap_generators(lambda net: networks.GuidedRefiner(net, opt.guided_radius, opt.guided_eps))
         self.print_networks(opt.verbose)
 
+    def tile_generators(self, tile_size, overlap, batch_size):
+        """Run every generator on overlapping tiles at test time; see <networks.TiledGenerator>
+
+        Parameters:
+            tile_size (int)  -- the size of the tiles
+            overlap (int)    -- the number of pixels shared by neighbouring tiles
+            batch_size (int) -- the number of tiles per generator call
+        """
+        self.wrap_generators(lambda net: networks.TiledGenerator(net, tile_size, overlap, batch_size))
+
+    def wrap_generators(self, wrap):
+        """Replace every generator <net> by wrap(net), e.g. a <networks.TiledGenerator>, a <networks.GuidedRefiner> or a fused copy (<fusion.fuse_generator>)
+
+        Every attribute that refers to a generator (e.g. both netG and netG_A in TestModel) is replaced by the wrapped version.
+        Call this function after <load_networks>, as the wrapped generators are not saved/loaded.
+        """
+        for name in self.model_names:
+            if isinstance(name, str) and name.startswith('G'):
+                net = getattr(self, 'net' + name)
+                self.replace_network(net, wrap(net))
+
+    def replace_network(self, net, new_net):
+        """Make every attribute that refers to <net> refer to <new_net> instead"""
+        for attr, value in list(vars(self).items()):
+            if value is net:
+                setattr(self, attr, new_net)
+
+    def load_quantized_networks(self, epoch, backend=''):
+        """Replace every generator by its int8 version saved by quantize.py; see <quantization.quantize_generator>
+
+        Parameters:
+            epoch (int)   -- current epoch; used in the file name '%s_net_%s_int8.pth' % (epoch, name)
+            backend (str) -- quantized engine: fbgemm | x86 | qnnpack; the current engine if empty
+
+        The int8 generators run on CPU.
+        """
+        assert self.device.type == 'cpu', 'int8 generators run on CPU; please use --gpu_ids -1'
+        for name in self.model_names:
+            if isinstance(name, str) and name.startswith('G'):
+                load_path = os.path.join(self.save_dir, '%s_net_%s_int8.pth' % (epoch, name))
+                net = getattr(self, 'net' + name)
+                qnet = quantization.quantize_generator(net, (), backend)
+                print('loading the int8 model from %s' % load_path)
+                qnet.load_state_dict(torch.load(load_path, map_location='cpu'))
+                self.replace_network(net, qnet)
+
     def eval(self):
         """Make models eval mode during test time"""
         for name in self.model_names:
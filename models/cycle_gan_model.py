@@ -19,6 +19,9 @@ class CycleGANModel(BaseModel):
     a '--netD basic' discriminator (PatchGAN introduced by pix2pix),
     and a least-square GANs objective ('--gan_mode lsgan').
 
+    At test time, only the generators needed for the requested '--visuals' are built, loaded and run;
+    e.g. '--visuals fake_B' (or '--dataset_mode single', which only loads domain A) runs G_A alone.
+
     CycleGAN paper: https://arxiv.org/pdf/1703.10593.pdf
     """
     @staticmethod
@@ -46,6 +49,11 @@ class CycleGANModel(BaseModel):
             parser.add_argument('--lambda_A', type=float, default=10.0, help='weight for cycle loss (A -> B -> A)')
             parser.add_argument('--lambda_B', type=float, default=10.0, help='weight for cycle loss (B -> A -> B)')
             parser.add_argument('--lambda_identity', type=float, default=0.5, help='use identity mapping. Setting lambda_identity other than 0 has an effect of scaling the weight of the identity mapping loss. For example, if the weight of the identity loss should be 10 times smaller than the weight of the reconstruction loss, please set lambda_identity = 0.1')
+            parser.add_argument('--ic_per_sample', action='store_true', help='normalize every generated image by its own range in the inter-channel loss, instead of by the range of the whole batch (which couples the images of a batch)')
+            parser.add_argument('--dc_refine', action='store_true', help='compute the dark channel loss on the eroded dark channel refined by a guided filter, instead of the per-pixel channel minimum')
+            parser.add_argument('--vgg_half', action='store_true', help='run the frozen VGG19 perceptual network in half precision (only used on GPU)')
+            parser.add_argument('--fuse_identity', action='store_true', help='run the identity and translation passes of each generator as one batch, e.g. G_A([real_A, real_B]); only for the resnet and unet generators with --norm instance or none (the vit generators always use BatchNorm)')
+            parser.add_argument('--amp', type=str, default='none', choices=['none', 'bf16', 'fp16'], help='mixed precision training: run the networks and losses under autocast in bfloat16 or float16 (float16 uses gradient scaling and is meant for GPUs; on CPU use bf16). [none | bf16 | fp16]')
 
         return parser
 
@@ -66,21 +74,33 @@ class CycleGANModel(BaseModel):
             visual_names_B.append('idt_A')
 
         self.visual_names = visual_names_A + visual_names_B  # combine visualizations for A and B
+        if not self.isTrain and opt.dataset_mode == 'single':  # only the images of one domain are loaded
+            single_names = ['real_A', 'fake_B', 'rec_A'] if opt.direction == 'AtoB' else ['real_B', 'fake_A', 'rec_B']
+            if opt.visuals:
+                assert all(name in single_names for name in opt.visuals.split(',')), \
+                    'with --dataset_mode single and --direction %s, visuals must be chosen from %s' % (opt.direction, single_names)
+            else:
+                self.visual_names = single_names[:2]
         # specify the models you want to save to the disk. The training/test scripts will call <BaseModel.save_networks> and <BaseModel.load_networks>.
         # 训练模式是训练生成器和鉴别器，两组
         if self.isTrain:
             self.model_names = ['G_A', 'G_B', 'D_A', 'D_B']
-        else:  # during test time, only load Gs
-            #测试模式只有两个生成器
-            self.model_names = ['G_A', 'G_B']
+        else:  # during test time, only load the Gs that the requested visuals depend on
+            #测试模式最多两个生成器
+            visuals = set(opt.visuals.split(',')) if opt.visuals else set(self.visual_names)
+            self.model_names = [name for name, outputs in (('G_A', {'fake_B', 'rec_A', 'rec_B'}), ('G_B', {'fake_A', 'rec_A', 'rec_B'}))
+                                if visuals & outputs]
 
         # define networks (both Generators and discriminators)
         # The naming is different from those used in the paper.
         # Code (vs. paper): G_A (G), G_B (F), D_A (D_Y), D_B (D_X)
-        self.netG_A = networks.define_G(opt.input_nc, opt.output_nc, opt.ngf, opt.netG, opt.norm,
-                                        not opt.no_dropout, opt.init_type, opt.init_gain, self.gpu_ids)
-        self.netG_B = networks.define_G(opt.output_nc, opt.input_nc, opt.ngf, opt.netG, opt.norm,
-                                        not opt.no_dropout, opt.init_type, opt.init_gain, self.gpu_ids)
+        self.netG_A = self.netG_B = None
+        if 'G_A' in self.model_names:
+            self.netG_A = networks.define_G(opt.input_nc, opt.output_nc, opt.ngf, opt.netG, opt.norm,
+                                            not opt.no_dropout, opt.init_type, opt.init_gain, self.gpu_ids)
+        if 'G_B' in self.model_names:
+            self.netG_B = networks.define_G(opt.output_nc, opt.input_nc, opt.ngf, opt.netG, opt.norm,
+                                            not opt.no_dropout, opt.init_type, opt.init_gain, self.gpu_ids)
 
         if self.isTrain:  # define discriminators
             self.netD_A = networks.define_D(opt.output_nc, opt.ndf, opt.netD,
@@ -91,19 +111,39 @@ class CycleGANModel(BaseModel):
         if self.isTrain:
             if opt.lambda_identity > 0.0:  # only works when input and output images have the same number of channels
                 assert(opt.input_nc == opt.output_nc)
-            self.fake_A_pool = ImagePool(opt.pool_size)  # create image buffer to store previously generated images
-            self.fake_B_pool = ImagePool(opt.pool_size)  # create image buffer to store previously generated images
+            pool_seed = opt.pool_seed if opt.pool_seed >= 0 else None
+            self.fake_A_pool = ImagePool(opt.pool_size, pool_seed)  # create image buffer to store previously generated images
+            self.fake_B_pool = ImagePool(opt.pool_size, None if pool_seed is None else pool_seed + 1)  # create image buffer to store previously generated images
             # define loss functions
             self.criterionGAN = networks.GANLoss(opt.gan_mode).to(self.device)  # define GAN loss.
             self.criterionCycle = torch.nn.L1Loss()
             self.criterionIdt = torch.nn.L1Loss()
-            self.criterionIC = networks.ICLoss()  # define inter-channel loss.
-            self.criterionDC = dark_channel_loss.DCLoss() # define dark channel loss
+            self.criterionIC = networks.ICLoss(per_sample=opt.ic_per_sample)  # define inter-channel loss.
+            self.criterionDC = dark_channel_loss.DCLoss(refine=opt.dc_refine) # define dark channel loss
+            # the perceptual network is built once and kept frozen; rebuilding it in every step reloads VGG19 from disk
+            self.criterionVGG = VGGLoss(self.device, half=opt.vgg_half and self.device.type == 'cuda')
             # initialize optimizers; schedulers will be automatically created by function <BaseModel.setup>.
             self.optimizer_G = torch.optim.Adam(itertools.chain(self.netG_A.parameters(), self.netG_B.parameters()), lr=opt.lr, betas=(opt.beta1, 0.999))
             self.optimizer_D = torch.optim.Adam(itertools.chain(self.netD_A.parameters(), self.netD_B.parameters()), lr=opt.lr, betas=(opt.beta1, 0.999))
             self.optimizers.append(self.optimizer_G)
             self.optimizers.append(self.optimizer_D)
+            # mixed precision: the weights, gradients and optimizer states stay in float32; only the forward passes run in low precision.
+            # float16 gradients can underflow, so the losses are scaled before backward; bfloat16 has the range of float32 and needs no scaling.
+            self.amp_dtype = {'bf16': torch.bfloat16, 'fp16': torch.float16}.get(opt.amp)
+            fp16 = self.amp_dtype == torch.float16
+            if fp16 and self.device.type == 'cpu':  # most CPU kernels have no float16 path; bench_mixed_precision measured ~80x slower steps
+                print('warning: --amp fp16 is much slower than float32 on CPU; use --amp bf16')
+            if hasattr(torch.amp, 'GradScaler'):  # torch >= 2.3: any device
+                self.scaler = torch.amp.GradScaler(self.device.type, enabled=fp16)
+            else:  # older versions only scale on CUDA; a disabled scaler is a no-op for '--amp none' and '--amp bf16'
+                assert not fp16 or self.device.type == 'cuda', '--amp fp16 on CPU needs torch >= 2.3; use --amp bf16'
+                self.scaler = torch.cuda.amp.GradScaler(enabled=fp16)
+            # G_A(real_A) and the identity pass G_A(real_B) (and likewise for G_B) can run as one batch only if every
+            # sample is normalized on its own: BatchNorm would mix the statistics of the two inputs
+            self.fuse_identity = opt.fuse_identity and opt.lambda_identity > 0.0
+            if self.fuse_identity:
+                assert not any(isinstance(m, nn.modules.batchnorm._BatchNorm) for net in (self.netG_A, self.netG_B) for m in net.modules()), \
+                    '--fuse_identity needs generators without BatchNorm (e.g. --norm instance; the vit generators use BatchNorm)'
 
     def set_input(self, input):
         """Unpack input data from the dataloader and perform necessary pre-processing steps.
@@ -112,18 +152,42 @@ class CycleGANModel(BaseModel):
             input (dict): include the data itself and its metadata information.
 
         The option 'direction' can be used to swap domain A and domain B.
+        With '--dataset_mode single' (test time), the images are the inputs of the generator of that direction.
         """
         AtoB = self.opt.direction == 'AtoB'
-        self.real_A = input['A' if AtoB else 'B'].to(self.device)
-        self.real_B = input['B' if AtoB else 'A'].to(self.device)
+        if 'B' not in input:
+            real = input['A'].to(self.device, non_blocking=True)
+            self.real_A, self.real_B = (real, None) if AtoB else (None, real)
+            self.image_paths = input['A_paths']
+            return
+        self.real_A = input['A' if AtoB else 'B'].to(self.device, non_blocking=True)
+        self.real_B = input['B' if AtoB else 'A'].to(self.device, non_blocking=True)
         self.image_paths = input['A_paths' if AtoB else 'B_paths']
 
     def forward(self):
-        """Run forward pass; called by both functions <optimize_parameters> and <test>."""
-        self.fake_B = self.netG_A(self.real_A)  # G_A(A)
-        self.rec_A = self.netG_B(self.fake_B)   # G_B(G_A(A))
-        self.fake_A = self.netG_B(self.real_B)  # G_B(B)
-        self.rec_B = self.netG_A(self.fake_A)   # G_A(G_B(B))
+        """Run forward pass; called by both functions <optimize_parameters> and <test>.
+
+        At test time, only the images listed in <visual_names> (and the images they depend on) are computed.
+        """
+        needed = set(self.visual_names) if not self.isTrain else None
+        if self.isTrain and self.fuse_identity:  # G_A([A, B]) = [fake_B, idt_A], G_B([B, A]) = [fake_A, idt_B]
+            self.fake_B, self.idt_A = self.netG_A(torch.cat([self.real_A, self.real_B])).split([self.real_A.size(0), self.real_B.size(0)])
+            self.fake_A, self.idt_B = self.netG_B(torch.cat([self.real_B, self.real_A])).split([self.real_B.size(0), self.real_A.size(0)])
+            self.rec_A = self.netG_B(self.fake_B)   # G_B(G_A(A))
+            self.rec_B = self.netG_A(self.fake_A)   # G_A(G_B(B))
+            return
+        if needed is None or needed & {'fake_B', 'rec_A'}:
+            self.fake_B = self.netG_A(self.real_A)  # G_A(A)
+        if needed is None or 'rec_A' in needed:
+            self.rec_A = self.netG_B(self.fake_B)   # G_B(G_A(A))
+        if needed is None or needed & {'fake_A', 'rec_B'}:
+            self.fake_A = self.netG_B(self.real_B)  # G_B(B)
+        if needed is None or 'rec_B' in needed:
+            self.rec_B = self.netG_A(self.fake_A)   # G_A(G_B(B))
+
+    def autocast(self):
+        """Return the autocast context of the forward passes and losses (a no-op unless '--amp' is set)."""
+        return torch.autocast(self.device.type, dtype=self.amp_dtype, enabled=self.amp_dtype is not None)
 
     def backward_D_basic(self, netD, real, fake):
         """Calculate GAN loss for the discriminator
@@ -136,15 +200,16 @@ class CycleGANModel(BaseModel):
         Return the discriminator loss.
         We also call loss_D.backward() to calculate the gradients.
         """
-        # Real
-        pred_real = netD(real)
-        loss_D_real = self.criterionGAN(pred_real, True)
-        # Fake
-        pred_fake = netD(fake.detach())
-        loss_D_fake = self.criterionGAN(pred_fake, False) 
-        # Combined loss and calculate gradients
-        loss_D = (loss_D_real + loss_D_fake) * 0.5
-        loss_D.backward()
+        with self.autocast():
+            # Real
+            pred_real = netD(real)
+            loss_D_real = self.criterionGAN(pred_real, True)
+            # Fake
+            pred_fake = netD(fake.detach())
+            loss_D_fake = self.criterionGAN(pred_fake, False)
+            # Combined loss and calculate gradients
+            loss_D = (loss_D_real + loss_D_fake) * 0.5
+        self.scaler.scale(loss_D).backward()
         return loss_D
 
     def backward_D_A(self):
@@ -169,64 +234,66 @@ class CycleGANModel(BaseModel):
         # lyf-perceptual/edge
         lambda_perceptual = 5.0  # Perceptual loss weight
         lambda_edge = 1.0  # Edge loss weight
-        device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-        self.criterionVGG = VGGLoss(device)
-        # Identity loss
-        if lambda_idt > 0:
-            # G_A should be identity if real_B is fed: ||G_A(B) - B||
-            self.idt_A = self.netG_A(self.real_B)
-            self.loss_idt_A = self.criterionIdt(self.idt_A, self.real_B) * lambda_B * lambda_idt
-            # G_B should be identity if real_A is fed: ||G_B(A) - A||
-            self.idt_B = self.netG_B(self.real_A)
-            self.loss_idt_B = self.criterionIdt(self.idt_B, self.real_A) * lambda_A * lambda_idt
-        else:
-            self.loss_idt_A = 0
-            self.loss_idt_B = 0
-
-        # GAN loss D_A(G_A(A))
-        self.loss_G_A = self.criterionGAN(self.netD_A(self.fake_B), True)
-        # GAN loss D_B(G_B(B))
-        self.loss_G_B = self.criterionGAN(self.netD_B(self.fake_A), True)
-
-        # Forward cycle loss || G_B(G_A(A)) - A||
-        self.loss_cycle_A = self.criterionCycle(self.rec_A, self.real_A) * lambda_A
-        # Backward cycle loss || G_A(G_B(B)) - B||
-        self.loss_cycle_B = self.criterionCycle(self.rec_B, self.real_B) * lambda_B
-        
-        #lyf
-        # Perceptual loss
-        self.loss_perceptual_A = self.criterionVGG(self.rec_B.to(device), self.real_B.to(device)) * lambda_perceptual
-        self.loss_perceptual_B = self.criterionVGG(self.rec_A.to(device), self.real_A.to(device)) * lambda_perceptual
-
-        # Edge loss
-        # self.loss_edge_A = edge_loss(self.rec_A, self.real_A, device) * lambda_edge
-        # self.loss_edge_B = edge_loss(self.rec_B, self.real_B, device) * lambda_edge
-
-        # print("loss_perceptual_A:",self.loss_perceptual_A)
-        # print("loss_perceptualB:",self.loss_perceptual_B)
-        # print("loss_edgeA:",self.loss_edge_A)
-        # print("loss_edgeB:",self.loss_edge_B)
-        # combined loss and calculate gradients
-        # self.loss_G = self.loss_G_A + self.loss_G_B + self.loss_cycle_A + self.loss_cycle_B + self.loss_idt_A + self.loss_idt_B + self.loss_perceptual_A + self.loss_perceptual_B + self.loss_edge_A + self.loss_edge_B
-        self.loss_G = self.loss_G_A + self.loss_G_B + self.loss_cycle_A + self.loss_cycle_B + self.loss_idt_A + self.loss_idt_B + self.loss_perceptual_A + self.loss_perceptual_B
-        self.loss_G.backward()
+        with self.autocast():
+            # Identity loss
+            if lambda_idt > 0:
+                if not self.fuse_identity:  # otherwise idt_A and idt_B were computed in <forward>
+                    self.idt_A = self.netG_A(self.real_B)
+                    self.idt_B = self.netG_B(self.real_A)
+                # G_A should be identity if real_B is fed: ||G_A(B) - B||
+                self.loss_idt_A = self.criterionIdt(self.idt_A, self.real_B) * lambda_B * lambda_idt
+                # G_B should be identity if real_A is fed: ||G_B(A) - A||
+                self.loss_idt_B = self.criterionIdt(self.idt_B, self.real_A) * lambda_A * lambda_idt
+            else:
+                self.loss_idt_A = 0
+                self.loss_idt_B = 0
+
+            # GAN loss D_A(G_A(A))
+            self.loss_G_A = self.criterionGAN(self.netD_A(self.fake_B), True)
+            # GAN loss D_B(G_B(B))
+            self.loss_G_B = self.criterionGAN(self.netD_B(self.fake_A), True)
+
+            # Forward cycle loss || G_B(G_A(A)) - A||
+            self.loss_cycle_A = self.criterionCycle(self.rec_A, self.real_A) * lambda_A
+            # Backward cycle loss || G_A(G_B(B)) - B||
+            self.loss_cycle_B = self.criterionCycle(self.rec_B, self.real_B) * lambda_B
+
+            #lyf
+            # Perceptual loss
+            self.loss_perceptual_A = self.criterionVGG(self.rec_B, self.real_B) * lambda_perceptual
+            self.loss_perceptual_B = self.criterionVGG(self.rec_A, self.real_A) * lambda_perceptual
+
+            # Edge loss
+            # self.loss_edge_A = edge_loss(self.rec_A, self.real_A, device) * lambda_edge
+            # self.loss_edge_B = edge_loss(self.rec_B, self.real_B, device) * lambda_edge
+
+            # print("loss_perceptual_A:",self.loss_perceptual_A)
+            # print("loss_perceptualB:",self.loss_perceptual_B)
+            # print("loss_edgeA:",self.loss_edge_A)
+            # print("loss_edgeB:",self.loss_edge_B)
+            # combined loss and calculate gradients
+            # self.loss_G = self.loss_G_A + self.loss_G_B + self.loss_cycle_A + self.loss_cycle_B + self.loss_idt_A + self.loss_idt_B + self.loss_perceptual_A + self.loss_perceptual_B + self.loss_edge_A + self.loss_edge_B
+            self.loss_G = self.loss_G_A + self.loss_G_B + self.loss_cycle_A + self.loss_cycle_B + self.loss_idt_A + self.loss_idt_B + self.loss_perceptual_A + self.loss_perceptual_B
+        self.scaler.scale(self.loss_G).backward()
        
 
     def optimize_parameters(self):
         """Calculate losses, gradients, and update network weights; called in every training iteration"""
         # forward
-        self.forward()      # compute fake images and reconstruction images.
+        with self.autocast():
+            self.forward()  # compute fake images and reconstruction images.
         # G_A and G_B
         self.set_requires_grad([self.netD_A, self.netD_B], False)  # Ds require no gradients when optimizing Gs
         self.optimizer_G.zero_grad()  # set G_A and G_B's gradients to zero
         self.backward_G()             # calculate gradients for G_A and G_B
-        self.optimizer_G.step()       # update G_A and G_B's weights
+        self.scaler.step(self.optimizer_G)  # update G_A and G_B's weights (skipped if the scaled float16 gradients overflowed)
         # D_A and D_B
         self.set_requires_grad([self.netD_A, self.netD_B], True)
         self.optimizer_D.zero_grad()   # set D_A and D_B's gradients to zero
         self.backward_D_A()      # calculate gradients for D_A
         self.backward_D_B()      # calculate graidents for D_B
-        self.optimizer_D.step()  # update D_A and D_B's weights
+        self.scaler.step(self.optimizer_D)  # update D_A and D_B's weights
+        self.scaler.update()                # adjust the loss scale of '--amp fp16'
 
 
 # 定义Perceptual Loss
@@ -243,7 +310,17 @@ class CycleGANModel(BaseModel):
 #         return self.criterion(x_vgg, y_vgg)
 # update in 20241125(chj)
 class VGGLoss(nn.Module):
-    def __init__(self, device, layer_indices=None, loss_type="L1"):
+    """Perceptual loss on frozen VGG19 features.
+
+    The VGG19 feature stack is truncated after the deepest requested layer and split into
+    contiguous slices, so every requested feature map is the output of the real network
+    up to that layer. x and y are concatenated and go through the slices in a single pass.
+
+    The network is meant to be built once per model: its weights are frozen, it stays
+    in eval mode, and with half=True the features are computed in float16.
+    """
+
+    def __init__(self, device, layer_indices=None, loss_type="L1", half=False):
         super(VGGLoss, self).__init__()
         # 加载预训练的 VGG 模型
         vgg = models.vgg19(pretrained=True).features
@@ -255,31 +332,56 @@ class VGGLoss(nn.Module):
 
         # 默认提取的层索引
         if layer_indices is None:
-            layer_indices = [3, 8, 15, 22, 29]  # ReLU_1_1, ReLU_2_1, ReLU_3_1, ReLU_4_1, ReLU_5_1
+            layer_indices = [3, 8, 15, 22, 29]  # relu1_2, relu2_2, relu3_3, relu4_2, relu5_1
             # layer_indices = [2, 7, 12]
-        self.layer_indices = layer_indices
+        self.layer_indices = sorted(layer_indices)
 
-        # 保存所需层
-        self.selected_layers = nn.ModuleList([vgg[i] for i in layer_indices]).to(device)
+        # 按所需层切分为连续的子网络, 在最深的所需层之后截断
+        slices, start = [], 0
+        for index in self.layer_indices:
+            slices.append(nn.Sequential(*[vgg[i] for i in range(start, index + 1)]))
+            start = index + 1
+        self.slices = nn.ModuleList(slices).to(device)
 
         # 冻结参数
-        for param in self.selected_layers.parameters():
+        for param in self.slices.parameters():
             param.requires_grad = False
+        self.dtype = torch.float16 if half else torch.float32
+        self.slices.to(self.dtype)
+        self.eval()
 
         # 损失函数
         self.criterion = nn.L1Loss() if loss_type == "L1" else nn.MSELoss()
 
+    def train(self, mode=True):
+        """The feature extractor is frozen, so it always stays in eval mode."""
+        return super(VGGLoss, self).train(False)
+
+    def flops(self, height, width):
+        """Return the number of floating point operations of the truncated network for one (height x width) image.
+
+        Only convolutions are counted (2 operations per multiply-accumulate); ReLU and pooling are negligible.
+        """
+        total = 0
+        for layer in self.slices.modules():
+            if isinstance(layer, nn.Conv2d):
+                height = (height + 2 * layer.padding[0] - layer.kernel_size[0]) // layer.stride[0] + 1
+                width = (width + 2 * layer.padding[1] - layer.kernel_size[1]) // layer.stride[1] + 1
+                total += 2 * layer.in_channels * layer.out_channels * layer.kernel_size[0] * layer.kernel_size[1] * height * width
+            elif isinstance(layer, nn.MaxPool2d):
+                height, width = height // 2, width // 2
+        return total
+
     def forward(self, x, y):
-        x_features, y_features = [], []
-        for layer in self.selected_layers:
-            x = layer(x)
-            y = layer(y)
-            x_features.append(x)
-            y_features.append(y)
+        batch_size = x.size(0)
+        h = torch.cat([x, y], 0).to(self.dtype)
 
         # 计算损失（逐层累加）
-        loss = sum(self.criterion(x_f, y_f) for x_f, y_f in zip(x_features, y_features))
-        return loss
+        loss = 0
+        for layer in self.slices:
+            h = layer(h)
+            loss = loss + self.criterion(h[:batch_size], h[batch_size:])
+        return loss.float()
 
 
 
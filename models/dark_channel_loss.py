@@ -1,67 +1,59 @@
-import cv2
-# from PIL import Image
-# import matplotlib.pyplot as plt
-# import matplotlib.image as mpimg
-import numpy as np
-# import torch
+import torch
 import torch.nn as nn
-# from torch.nn import init
-# import functools
-# from torch.optim import lr_scheduler
+import torch.nn.functional as F
+from .filters import guided_filter
 
 
 class DCLoss(nn.Module):
-
-    def compute_dc(self, im, sz):
-        r = im[0]
-        g = im[1]
-        b = im[2]
-        min_dc = cv2.min(cv2.min(r,g),b);
-        kernel = cv2.getStructuringElement(cv2.MORPH_RECT,(sz,sz))
-        dark = cv2.erode(min_dc,kernel)
-        
+    """Define the dark channel prior objective.
+
+    The dark channel of a haze-free (or smoke-free) image is close to zero: in most patches,
+    at least one color channel is dark. The loss is the mean of the dark channel, quantized to 8 bits
+    as an image, times 0.05. It is computed for the whole batch, on the device of the images.
+    """
+
+    def __init__(self, patch_size=15, refine=False, radius=15, eps=0.0001):
+        """ Initialize the DCLoss class.
+
+        Parameters:
+            patch_size (int) -- the window of the min-pool erosion of the dark channel
+            refine (bool)    -- if False, use the per-pixel minimum of the color channels;
+                                if True, use the eroded dark channel, refined by a guided filter with the per-pixel minimum as guide
+            radius (int)     -- the window of the box filters of the guided filter (see models/filters.py)
+            eps (float)      -- the regularization of the guided filter
+
+        With refine=False (default), the loss is the same as the former OpenCV implementation, which discarded the refined dark channel;
+        the CycleGAN model enables the refinement with '--dc_refine'.
+        """
+        super(DCLoss, self).__init__()
+        self.patch_size = patch_size
+        self.refine = refine
+        self.radius = radius
+        self.eps = eps
+
+    def compute_dc(self, images):
+        """Return the per-pixel channel minimum (N x 1 x H x W) and, if <refine>, its erosion over patch_size x patch_size windows."""
+        min_dc = images[:, :1]
+        for c in range(1, images.size(1)):  # elementwise minimum; much faster than a min reduction over dim 1 on the CPU
+            min_dc = torch.minimum(min_dc, images[:, c:c + 1])
+        if not self.refine:
+            return None, min_dc
+        # min-pool erosion; the padding of max_pool2d never wins, like the default border of cv2.erode
+        dark = -F.max_pool2d(-min_dc, self.patch_size, stride=1, padding=self.patch_size // 2)
         return dark, min_dc
 
-    def apply_guided_filter(self, im, p, r, eps):
-        mean_I = cv2.boxFilter(im,cv2.CV_64F,(r,r));
-        mean_p = cv2.boxFilter(p, cv2.CV_64F,(r,r));
-        mean_Ip = cv2.boxFilter(im*p,cv2.CV_64F,(r,r));
-        cov_Ip = mean_Ip - mean_I*mean_p;
-
-        mean_II = cv2.boxFilter(im*im,cv2.CV_64F,(r,r));
-        var_I   = mean_II - mean_I*mean_I;
-
-        a = cov_Ip/(var_I + eps);
-        b = mean_p - a*mean_I;
-
-        mean_a = cv2.boxFilter(a,cv2.CV_64F,(r,r));
-        mean_b = cv2.boxFilter(b,cv2.CV_64F,(r,r));
-
-        q = mean_a*im + mean_b;
-
-        return q;
-
-    def refine_dc(self, im, dc, min_dc):
-        r = 15;
-        eps = 0.0001;
-        dc_rfd = self.apply_guided_filter(min_dc,dc,r,eps);
-
-        return min_dc;
-
-    def get_refined_dc(self, input_img):
-        # input_img = cv2.imread(path_image);
-        dc, min_dc = self.compute_dc(input_img.cpu().data.numpy(), 15)
-        dc = self.refine_dc(input_img,dc,min_dc)*255
-        dc[dc < 0] = 0
-        dc[dc > 255] = 255
-
-        return np.uint8(dc)
-
-    def __call__(self, hazy_image):
-        batch_size, channels, height, width = hazy_image.size()
-        index = np.random.randint(batch_size)
-        input_img = hazy_image[index]
-        refined_dc = self.get_refined_dc(input_img)
-        loss = refined_dc.mean()*0.05
-
-        return loss
+    @torch.no_grad()
+    def forward(self, images):
+        """Calculate the dark channel loss of a batch of images.
+
+        Parameters:
+            images (tensor) - - a N x C x H x W batch, typically the output from a generator
+
+        Returns:
+            the mean of the 8-bit dark channels times 0.05, as a 0-dim tensor. The loss is only used for monitoring
+            (it is not differentiable), so it is computed without gradient and without copying to the host.
+        """
+        dark, min_dc = self.compute_dc(images)
+        dc = guided_filter(min_dc, dark, self.radius, self.eps) if self.refine else min_dc
+        dc = (dc * 255).clamp_(0, 255).floor_()  # as converting to uint8
+        return dc.mean() * 0.05
@@ -0,0 +1,127 @@
+import torch
+from .base_model import BaseModel
+from . import networks
+from .cycle_gan_model import VGGLoss
+
+
+class DistillModel(BaseModel):
+    """
+    This class distills a trained desmoking generator (the teacher, e.g. netG_A of a CycleGAN model) into a smaller student.
+
+    The teacher is frozen; the student learns to reproduce its outputs on the (smoky) input images.
+    By default, the student is a '--netG vit_small' generator (depthwise-separable convolutions, 2 heads, a 256-wide MLP)
+    with '--ngf 32', and the model uses '--dataset_mode single' on the smoky images, e.g. '--dataroot datasets/X/trainA'.
+    The student is saved as [epoch]_net_G.pth, so it can be deployed with '--model test --netG vit_small --ngf 32'.
+
+    With '--prune_ratio', the MLP hidden units of the student's transformer blocks with the smallest weight magnitude
+    are removed when the model is set up; prune a distilled student with '--continue_train' and fine-tune it. The ratio
+    is relative to the unpruned MLP, so resuming the fine-tuning with the same options does not prune the student again.
+    """
+    @staticmethod
+    def modify_commandline_options(parser, is_train=True):
+        """Add new model-specific options, and rewrite default values for existing options.
+
+        Parameters:
+            parser          -- original option parser
+            is_train (bool) -- whether training phase or test phase. You can use this flag to add training-specific or test-specific options.
+
+        Returns:
+            the modified parser.
+
+        The student loss is lambda_distill * ||S(A) - T(A)||_1 + lambda_perceptual * VGG(S(A), T(A)).
+        """
+        parser.set_defaults(netG='vit_small', ngf=32, dataset_mode='single', no_dropout=True)
+        if is_train:
+            parser.add_argument('--teacher_name', type=str, required=True, help='name of the experiment of the teacher; its checkpoint is loaded from [checkpoints_dir]/[teacher_name]')
+            parser.add_argument('--teacher_net', type=str, default='G_A', help='the teacher is [teacher_epoch]_net_[teacher_net].pth, e.g. G_A of a CycleGAN model or G of a test model')
+            parser.add_argument('--teacher_epoch', type=str, default='latest', help='which epoch of the teacher to load')
+            parser.add_argument('--teacher_netG', type=str, default='vit', help='generator architecture of the teacher')
+            parser.add_argument('--teacher_ngf', type=int, default=64, help='# of gen filters in the last conv layer of the teacher')
+            parser.add_argument('--teacher_norm', type=str, default='instance', help='normalization layers of the teacher [instance | batch | none]')
+            parser.add_argument('--lambda_distill', type=float, default=10.0, help='weight of the L1 loss between the student and teacher outputs')
+            parser.add_argument('--lambda_perceptual', type=float, default=1.0, help='weight of the VGG perceptual loss between the student and teacher outputs; 0 disables VGG')
+            parser.add_argument('--prune_ratio', type=float, default=0.0, help='fraction of the MLP hidden units of the student removed by weight magnitude when the model is set up')
+        return parser
+
+    def __init__(self, opt):
+        """Initialize the distillation class.
+
+        Parameters:
+            opt (Option class)-- stores all the experiment flags; needs to be a subclass of BaseOptions
+        """
+        BaseModel.__init__(self, opt)
+        # specify the training losses you want to print out. The training/test scripts will call <BaseModel.get_current_losses>
+        self.loss_names = ['distill', 'perceptual'] if self.isTrain else []
+        # specify the images you want to save/display. The training/test scripts will call <BaseModel.get_current_visuals>
+        self.visual_names = ['real', 'fake_teacher', 'fake'] if self.isTrain else ['real', 'fake']
+        # specify the models you want to save to the disk. The training/test scripts will call <BaseModel.save_networks> and <BaseModel.load_networks>
+        self.model_names = ['G']  # only the student is saved; the teacher is frozen
+        self.netG = networks.define_G(opt.input_nc, opt.output_nc, opt.ngf, opt.netG, opt.norm,
+                                      not opt.no_dropout, opt.init_type, opt.init_gain, self.gpu_ids)
+
+        if self.isTrain:
+            self.netTeacher = networks.define_G(opt.input_nc, opt.output_nc, opt.teacher_ngf, opt.teacher_netG, opt.teacher_norm,
+                                                False, opt.init_type, opt.init_gain, self.gpu_ids)
+            load_path = '%s/%s/%s_net_%s.pth' % (opt.checkpoints_dir, opt.teacher_name, opt.teacher_epoch, opt.teacher_net)
+            print('loading the teacher from %s' % load_path)
+            teacher = self.netTeacher.module if isinstance(self.netTeacher, torch.nn.DataParallel) else self.netTeacher
+            teacher.load_state_dict(torch.load(load_path, map_location=str(self.device)))
+            self.netTeacher.eval()
+            self.set_requires_grad(self.netTeacher, False)
+            # define loss functions
+            self.criterionDistill = torch.nn.L1Loss()
+            self.criterionVGG = VGGLoss(self.device) if opt.lambda_perceptual > 0 else None
+            # the optimizer is created in <setup>, after the student has been loaded and pruned
+
+    def setup(self, opt):
+        """Load and print networks, prune the student (with '--prune_ratio') and create the optimizer and scheduler"""
+        BaseModel.setup(self, opt)
+        if not self.isTrain:
+            return
+        if opt.prune_ratio > 0:
+            blocks = [block for block in self.netG.modules() if isinstance(block, networks.TransformerBlock)]
+            assert blocks, '--prune_ratio prunes the MLP of the transformer blocks; netG [%s] has none' % opt.netG
+            for block in blocks:
+                # the ratio is relative to the unpruned MLP: a student resumed with '--continue_train' after pruning keeps its size
+                hidden = block.mlp[0].out_features
+                keep = max(1, int(round(block.mlp_dim * (1 - opt.prune_ratio))))
+                if hidden <= keep:
+                    print('the MLP of a transformer block has %d of %d hidden units; already pruned' % (hidden, block.mlp_dim))
+                    continue
+                print('pruned the MLP of a transformer block from %d to %d hidden units' % (hidden, block.prune_mlp(1 - keep / hidden)))
+        # the MLP layers are new modules after pruning or after loading a pruned checkpoint, so the optimizer is created here
+        self.optimizer_G = torch.optim.Adam(self.netG.parameters(), lr=opt.lr, betas=(opt.beta1, 0.999))
+        self.optimizers = [self.optimizer_G]
+        self.schedulers = [networks.get_scheduler(self.optimizer_G, opt)]
+
+    def set_input(self, input):
+        """Unpack input data from the dataloader and perform necessary pre-processing steps.
+
+        Parameters:
+            input: a dictionary that contains the data itself and its metadata information.
+
+        We use the 'single' dataset mode: only the smoky images are needed.
+        """
+        self.real = input['A'].to(self.device, non_blocking=True)
+        self.image_paths = input['A_paths']
+
+    def forward(self):
+        """Run forward pass; called by both functions <optimize_parameters> and <test>."""
+        self.fake = self.netG(self.real)  # S(A)
+        if self.isTrain:
+            with torch.no_grad():
+                self.fake_teacher = self.netTeacher(self.real)  # T(A)
+
+    def backward_G(self):
+        """Calculate the distillation losses of the student"""
+        self.loss_distill = self.criterionDistill(self.fake, self.fake_teacher) * self.opt.lambda_distill
+        self.loss_perceptual = self.criterionVGG(self.fake, self.fake_teacher) * self.opt.lambda_perceptual if self.criterionVGG is not None else 0
+        self.loss_G = self.loss_distill + self.loss_perceptual
+        self.loss_G.backward()
+
+    def optimize_parameters(self):
+        """Calculate losses, gradients, and update network weights; called in every training iteration"""
+        self.forward()                # compute the student and teacher outputs
+        self.optimizer_G.zero_grad()  # set the student's gradients to zero
+        self.backward_G()             # calculate gradients for the student
+        self.optimizer_G.step()       # update the student's weights
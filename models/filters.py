@@ -0,0 +1,52 @@
+"""Box filter and guided filter for N x C x H x W tensors.
+
+Both run on whole batches on any device, and cost O(1) per pixel whatever the window size:
+the box filter is a difference of cumulative sums, one axis at a time.
+They are used by the dark channel loss (models/dark_channel_loss.py) and to refine the generator output at test time
+(see <networks.GuidedRefiner> and the test option '--guided_radius').
+"""
+import torch
+import torch.nn.functional as F
+
+
+def _box_filter_1d(x, r, dim):
+    """Mean over windows of r elements along <dim> (-1 or -2), with reflected borders."""
+    pad = [r // 2, r // 2, 0, 0] if dim == -1 else [0, 0, r // 2, r // 2]
+    x = F.pad(x, pad, mode='reflect')
+    # subtract the mean of each line so that the running sums stay small and keep their precision
+    offset = x.mean(dim, keepdim=True)
+    total = torch.cumsum(x - offset, dim)
+    total = torch.cat([torch.zeros_like(total.narrow(dim, 0, 1)), total], dim)
+    n = total.size(dim) - r
+    return (total.narrow(dim, r, n) - total.narrow(dim, 0, n)) / r + offset
+
+
+def box_filter(x, r):
+    """Return the mean of <x> over r x r windows (r odd), like cv2.boxFilter with the default BORDER_REFLECT_101.
+
+    Parameters:
+        x (tensor) -- a N x C x H x W tensor; H and W must be larger than r // 2
+        r (int)    -- the (odd) window size
+    """
+    return _box_filter_1d(_box_filter_1d(x, r, -1), r, -2)
+
+
+def guided_filter(guide, src, r, eps):
+    """Return the guided filter (He et al.) of <src> with the guide image <guide>.
+
+    Parameters:
+        guide (tensor) -- a N x 1 x H x W or N x C x H x W guide; a single-channel guide is shared by all channels of <src>
+        src (tensor)   -- the N x C x H x W image to filter
+        r (int)        -- the (odd) window size of the box filters
+        eps (float)    -- the regularization; larger values smooth more
+
+    Every channel is filtered with its own local linear model q = a * guide + b, all in one pass.
+    """
+    mean_I = box_filter(guide, r)
+    mean_p = box_filter(src, r)
+    cov_Ip = box_filter(guide * src, r) - mean_I * mean_p
+    var_I = box_filter(guide * guide, r) - mean_I * mean_I
+
+    a = cov_Ip / (var_I + eps)
+    b = mean_p - a * mean_I
+    return box_filter(a, r) * guide + box_filter(b, r)
@@ -0,0 +1,129 @@
+"""Inference-only rewrite of the convolutional generators: folded BatchNorm, fused pointwise ops and channels_last.
+
+<fuse_generator> returns an optimized copy of a (trained, loaded) generator:
+    - Conv2d / ConvTranspose2d + BatchNorm2d (running statistics): the normalization is folded into the weights and bias
+    - Conv + InstanceNorm2d: the normalization runs as a group norm with one group per channel, which computes the same
+      values in a single pass and keeps the channels_last layout
+    - the following ReLU / Tanh runs in place on the output of the conv (or norm), and Dropout (an identity at test time) is dropped
+    - the skip connection of <networks.ResnetBlock> is added in place
+    - the weights and activations use the channels_last memory format, the fast layout of the oneDNN convolutions on CPU
+
+The copy has the same outputs as the eval-mode network (up to float rounding). It is meant for inference only: the
+weights are not trained and the original state_dict keys are not kept, so load the checkpoint into the regular network
+first and fuse it afterwards (see the test option '--fuse_generator').
+"""
+import copy
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from torch.nn.utils.fusion import fuse_conv_bn_eval
+from . import networks
+
+
+class FusedConv(nn.Module):
+    """A convolution followed by an optional (instance) normalization and an optional in-place activation."""
+
+    def __init__(self, conv, norm=None, activation=None):
+        """Initialize the fused block
+
+        Parameters:
+            conv (nn.Module)      -- a Conv2d or ConvTranspose2d, with any BatchNorm already folded in
+            norm (nn.Module)      -- an InstanceNorm2d without running statistics, or None
+            activation (str)      -- relu | tanh | None
+        """
+        super(FusedConv, self).__init__()
+        self.conv = conv
+        self.norm = norm
+        self.activation = activation
+
+    def forward(self, x):
+        x = self.conv(x)
+        if self.norm is not None:  # instance norm == group norm with one channel per group
+            x = F.group_norm(x, x.size(1), self.norm.weight, self.norm.bias, self.norm.eps)
+        if self.activation == 'relu':
+            x = x.relu_()
+        elif self.activation == 'tanh':
+            x = x.tanh_()
+        return x
+
+
+class FusedResnetBlock(nn.Module):
+    """<networks.ResnetBlock> with a fused conv block and an in-place skip connection."""
+
+    def __init__(self, conv_block):
+        super(FusedResnetBlock, self).__init__()
+        self.conv_block = conv_block
+
+    def forward(self, x):
+        return self.conv_block(x).add_(x)
+
+
+class FusedGenerator(nn.Module):
+    """Run a fused generator on channels_last inputs and return a contiguous (N x C x H x W) output."""
+
+    def __init__(self, net, channels_last=True):
+        super(FusedGenerator, self).__init__()
+        self.net = net
+        self.memory_format = torch.channels_last if channels_last else torch.contiguous_format
+
+    def forward(self, input):
+        return self.net(input.contiguous(memory_format=self.memory_format)).contiguous()
+
+
+def _is_foldable(norm):
+    """Whether <norm> normalizes with fixed statistics at test time, so it can be folded into the preceding conv."""
+    return isinstance(norm, (nn.BatchNorm2d, nn.InstanceNorm2d)) and norm.track_running_stats and norm.running_mean is not None
+
+
+def _fuse_sequential(layers):
+    """Return a list of modules computing the same function as the (eval-mode) <layers>, with fused conv blocks."""
+    layers = [layer for layer in layers if not isinstance(layer, (nn.Dropout, networks.Identity))]
+    fused, i = [], 0
+    while i < len(layers):
+        layer = layers[i]
+        i += 1
+        if not isinstance(layer, (nn.Conv2d, nn.ConvTranspose2d)):
+            fused.append(_fuse_module(layer))
+            continue
+        conv, norm, activation = layer, None, None
+        if i < len(layers) and _is_foldable(layers[i]):
+            conv = fuse_conv_bn_eval(conv, layers[i], transpose=isinstance(conv, nn.ConvTranspose2d))
+            i += 1
+        elif i < len(layers) and isinstance(layers[i], nn.InstanceNorm2d):
+            norm = layers[i]
+            i += 1
+        if i < len(layers) and isinstance(layers[i], (nn.ReLU, nn.Tanh)):
+            activation = 'relu' if isinstance(layers[i], nn.ReLU) else 'tanh'
+            i += 1
+        fused.append(FusedConv(conv, norm, activation))
+    return fused
+
+
+def _fuse_module(module):
+    """Return the fused version of <module>: Sequentials and Resnet blocks are rewritten, other modules are searched for them."""
+    if isinstance(module, nn.Sequential):
+        return nn.Sequential(*_fuse_sequential(module))
+    if isinstance(module, networks.ResnetBlock):
+        return FusedResnetBlock(_fuse_module(module.conv_block))
+    for name, child in module.named_children():
+        setattr(module, name, _fuse_module(child))
+    return module
+
+
+def fuse_generator(net, channels_last=True):
+    """Return an inference-only copy of the generator <net> with folded BatchNorm, fused pointwise ops and channels_last layout.
+
+    Parameters:
+        net (network)        -- a generator, e.g. a <networks.ResnetGenerator>, possibly wrapped in DataParallel
+        channels_last (bool) -- use the channels_last memory format for the weights and activations
+
+    Any normalization that uses the batch statistics (BatchNorm in train mode) is replaced by its running statistics,
+    as in eval mode. The copy does not require gradients.
+    """
+    if isinstance(net, nn.DataParallel):
+        net = net.module
+    fused = _fuse_module(copy.deepcopy(net).eval())
+    fused.requires_grad_(False)
+    if channels_last:
+        fused = fused.to(memory_format=torch.channels_last)
+    return FusedGenerator(fused, channels_last).eval()
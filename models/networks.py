@@ -3,8 +3,10 @@ import torch.nn as nn
 from torch.nn import init
 import functools
 from torch.optim import lr_scheduler
+from torch.utils.checkpoint import checkpoint
 from einops import rearrange, repeat
 import torch.nn.functional as F
+from . import filters
 
 ###############################################################################
 # Helper Functions
@@ -124,7 +126,7 @@ def define_G(input_nc, output_nc, ngf, netG, norm='batch', use_dropout=False, in
         input_nc (int) -- the number of channels in input images
         output_nc (int) -- the number of channels in output images
         ngf (int) -- the number of filters in the last conv layer
-        netG (str) -- the architecture's name: resnet_9blocks | resnet_6blocks | unet_256 | unet_128
+        netG (str) -- the architecture's name: resnet_9blocks | resnet_6blocks | resnet_attention | vit | vit_window | vit_linear | vit_small | unet_256 | unet_128
         norm (str) -- the name of normalization layers used in the network: batch | instance | none
         use_dropout (bool) -- if use dropout layers.
         init_type (str)    -- the name of our initialization method.
@@ -141,6 +143,11 @@ def define_G(input_nc, output_nc, ngf, netG, norm='batch', use_dropout=False, in
         Resnet-based generator consists of several Resnet blocks between a few downsampling/upsampling operations.
         We adapt Torch code from Justin Johnson's neural style transfer project (https://github.com/jcjohnson/fast-neural-style).
 
+        Transformer-based generator: [vit] uses full self-attention at 1/4 resolution, whose memory grows quadratically
+        with the number of pixels. [vit_window] (a regular and a shifted-window block) and [vit_linear] (linear attention)
+        grow linearly and can process large frames. [vit_linear] has the same parameters as [vit].
+        [vit_small] is a narrow student for distillation (see distill_model.py): depthwise-separable convolutions,
+        2 heads and a 256-wide MLP; use it with a smaller --ngf, e.g. 32.
 
     The generator has been initialized by <init_net>. It uses RELU for non-linearity.
     """
@@ -155,6 +162,12 @@ def define_G(input_nc, output_nc, ngf, netG, norm='batch', use_dropout=False, in
         net = ResnetGeneratorWithAttention(input_nc, output_nc, ngf, norm_layer=norm_layer, use_dropout=use_dropout, n_blocks=9)
     elif netG == 'vit':
         net = TransformerGenerator(input_nc, output_nc, ngf)
+    elif netG == 'vit_window':
+        net = TransformerGenerator(input_nc, output_nc, ngf, num_blocks=2, attention='window')
+    elif netG == 'vit_linear':
+        net = TransformerGenerator(input_nc, output_nc, ngf, attention='linear')
+    elif netG == 'vit_small':
+        net = TransformerGenerator(input_nc, output_nc, ngf, num_heads=2, mlp_dim=256, depthwise=True)
     elif netG == 'unet_128':
         net = UnetGenerator(input_nc, output_nc, 7, ngf, norm_layer=norm_layer, use_dropout=use_dropout)
     elif netG == 'unet_256':
@@ -208,6 +221,98 @@ def define_D(input_nc, ndf, netD, n_layers_D=3, norm='batch', init_type='normal'
     return init_net(net, init_type, init_gain, gpu_ids)
 
 
+class TiledGenerator(nn.Module):
+    """Run a generator on overlapping tiles of an image and feather-blend the results.
+
+    The input is split into tile_size x tile_size tiles that overlap by <overlap> pixels. The tiles
+    go through the generator <batch_size> at a time. Each output tile is weighted by a window that
+    ramps up linearly across the overlap, so the seams between tiles are blended. Peak memory of the
+    generator only depends on tile_size and batch_size, not on the size of the image.
+    Images smaller than a tile are padded (replicate) to one tile, and the padding is cropped from the output.
+    """
+
+    def __init__(self, net, tile_size=256, overlap=32, batch_size=4):
+        """Initialize the tiled generator
+
+        Parameters:
+            net (network)     -- the generator to run on each tile
+            tile_size (int)   -- the size of the (square) tiles; a multiple of 4 so that it fits the down/upsampling layers
+            overlap (int)     -- the number of pixels shared by neighbouring tiles
+            batch_size (int)  -- the number of tiles per generator call
+        """
+        super(TiledGenerator, self).__init__()
+        assert(tile_size % 4 == 0 and 0 <= overlap < tile_size)
+        self.net = net
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.batch_size = batch_size
+
+    def tile_starts(self, length):
+        """Return the start offsets of the tiles along an axis of the given length (>= tile_size)."""
+        stride = self.tile_size - self.overlap
+        return list(range(0, length - self.tile_size, stride)) + [length - self.tile_size]
+
+    def blend_window(self, device):
+        """Return a (tile_size x tile_size) weight map that ramps from the tile border over <overlap> pixels."""
+        ramp = torch.ones(self.tile_size, device=device)
+        if self.overlap > 0:
+            edge = torch.arange(1, self.overlap + 1, dtype=torch.float32, device=device) / (self.overlap + 1)
+            ramp[:self.overlap] = edge
+            ramp[-self.overlap:] = edge.flip(0)
+        return ramp[:, None] * ramp[None, :]
+
+    def forward(self, input):
+        """Run the generator tile by tile and blend the tiles into a full-size output"""
+        batch, _, height, width = input.shape
+        tile = self.tile_size
+        pad_h, pad_w = max(tile - height, 0), max(tile - width, 0)
+        if pad_h or pad_w:
+            input = F.pad(input, (0, pad_w, 0, pad_h), mode='replicate')
+        full_h, full_w = input.shape[2:]
+
+        window = self.blend_window(input.device)
+        positions = [(y, x) for y in self.tile_starts(full_h) for x in self.tile_starts(full_w)]
+        output = None
+        weight = input.new_zeros(1, 1, full_h, full_w)
+        for i in range(0, len(positions), self.batch_size):
+            group = positions[i:i + self.batch_size]
+            tiles = self.net(torch.cat([input[:, :, y:y + tile, x:x + tile] for y, x in group], 0))
+            if output is None:
+                output = input.new_zeros(batch, tiles.size(1), full_h, full_w)
+            for j, (y, x) in enumerate(group):
+                output[:, :, y:y + tile, x:x + tile] += tiles[j * batch:(j + 1) * batch] * window
+                weight[:, :, y:y + tile, x:x + tile] += window
+        return (output / weight)[:, :, :height, :width]
+
+
+class GuidedRefiner(nn.Module):
+    """Refine the output of a generator with a guided filter, using the (grayscale) input image as guide.
+
+    Each output channel is replaced by a local linear function of the input, fitted in radius x radius windows
+    (see <filters.guided_filter>). This keeps the edges of the input frame and removes small generator artifacts
+    such as checkerboard patterns. The cost per pixel does not depend on the radius.
+    """
+
+    def __init__(self, net, radius=9, eps=1e-3):
+        """Initialize the refiner
+
+        Parameters:
+            net (network) -- the generator whose output is refined
+            radius (int)  -- the (odd) window size of the guided filter
+            eps (float)   -- the regularization of the guided filter, for images in [0, 1]; larger values smooth more
+        """
+        super(GuidedRefiner, self).__init__()
+        self.net = net
+        self.radius = radius
+        self.eps = eps
+
+    def forward(self, input):
+        """Run the generator and filter its output; the images are mapped from [-1, 1] to [0, 1] for the filter"""
+        output = self.net(input)
+        guide = (input.mean(1, keepdim=True) + 1) / 2
+        return filters.guided_filter(guide, (output + 1) / 2, self.radius, self.eps) * 2 - 1
+
+
 ##############################################################################
 # Classes
 ##############################################################################
@@ -286,16 +391,14 @@ class ICLoss(nn.Module):
     """Define Inter-channel objectives.
     """
 
-    # def __init__(self, real_image, fake_image):
-    #     """ Initialize the ICLoss class.
-
-    #     Parameters:
-    #         real_image 
-    #         fake_image 
+    def __init__(self, per_sample=False):
+        """ Initialize the ICLoss class.
 
-    #     """
-    #     self.real_image = real_image
-    #     self.fake_image = fake_image
+        Parameters:
+            per_sample (bool) - - normalize every image by its own range instead of the range of the whole batch
+        """
+        super(ICLoss, self).__init__()
+        self.per_sample = per_sample
 
     def __call__(self, fake_image, target_is_clear):
         """ Calculate the Inter-channel differences of the fake image (X).
@@ -308,21 +411,23 @@ class ICLoss(nn.Module):
 
         Returns:
             the calculated loss.
+
+        X is normalized to [0, 1] by (X - min) / (max - min); min cancels out in the differences, so the loss
+        is the mean channel difference divided by the range, computed in float32 (also under autocast).
         """
-        loss = 0
-        batch_size, channels, height, width = fake_image.size()
-        fake_image = (fake_image - torch.min(fake_image))/(torch.max(fake_image) - torch.min(fake_image)) #Normalized Data
-        # print(fake_image)
-        for index in range(channels):
-            if index < (channels - 1):
-                loss += torch.abs(fake_image[:, index] - fake_image[:, index+1]) 
-            else:
-                loss += torch.abs(fake_image[:, index] - fake_image[:, 0])
+        fake_image = fake_image.float()
+        diff = (fake_image - fake_image.roll(-1, dims=1)).abs().sum(1)  # |X_c - X_{c+1}|, with X_C = X_0
+        if self.per_sample:
+            low, high = torch.aminmax(fake_image.flatten(1), dim=1)
+            loss = (diff.flatten(1).mean(1) / (high - low)).mean()
+        else:
+            low, high = torch.aminmax(fake_image)
+            loss = diff.mean() / (high - low)
 
         if target_is_clear:
-            loss = torch.abs(loss.mean() - 1)
+            loss = torch.abs(loss - 1)
         else:
-            loss = 1 - torch.abs(loss.mean() - 1)
+            loss = 1 - torch.abs(loss - 1)
 
         return loss
 
@@ -680,10 +785,21 @@ class PixelDiscriminator(nn.Module):
 
 
 class SelfAttention(nn.Module):
-    """ Self attention Layer"""
-    def __init__(self, in_dim):
+    """ Self attention Layer
+
+    The attention is computed for blocks of <chunk_size> query positions at a time, so only a
+    (chunk_size x HW) slice of the attention matrix exists instead of the full (HW x HW) matrix.
+    Every query row is still normalized over all keys, so the output is the same as the full
+    computation. When gradients are needed and the feature map has more than <checkpoint_tokens>
+    positions, the blocks are recomputed in the backward pass (torch.utils.checkpoint) instead of
+    keeping every attention block alive; below that, the blocks are kept and nothing is recomputed.
+    The default threshold is the 64 x 64 feature map of a 256 x 256 crop.
+    """
+    def __init__(self, in_dim, chunk_size=1024, checkpoint_tokens=4096):
         super(SelfAttention, self).__init__()
         self.chanel_in = in_dim
+        self.chunk_size = chunk_size
+        self.checkpoint_tokens = checkpoint_tokens
         self.query_conv = nn.Conv2d(in_channels=in_dim, out_channels=in_dim//8, kernel_size=1)
         self.key_conv = nn.Conv2d(in_channels=in_dim, out_channels=in_dim//8, kernel_size=1)
         self.value_conv = nn.Conv2d(in_channels=in_dim, out_channels=in_dim, kernel_size=1)
@@ -691,16 +807,23 @@ class SelfAttention(nn.Module):
 
         self.softmax = nn.Softmax(dim=-1)
 
+    def attend(self, proj_query, proj_key, proj_value):
+        """Attention output (B, C, n) for a block of n queries (B, n, C//8), given all keys (B, C//8, HW) and values (B, C, HW)."""
+        attention = self.softmax(torch.bmm(proj_query, proj_key))
+        return torch.bmm(proj_value, attention.permute(0, 2, 1))
+
     def forward(self, x):
         batchsize, C, width, height = x.size()
-        proj_query = self.query_conv(x).view(batchsize, -1, width*height).permute(0, 2, 1)
-        proj_key = self.key_conv(x).view(batchsize, -1, width*height)
-        energy = torch.bmm(proj_query, proj_key)
-        attention = self.softmax(energy)
-        proj_value = self.value_conv(x).view(batchsize, -1, width*height)
+        proj_query = self.query_conv(x).reshape(batchsize, -1, width*height).permute(0, 2, 1)
+        proj_key = self.key_conv(x).reshape(batchsize, -1, width*height)
+        proj_value = self.value_conv(x).reshape(batchsize, -1, width*height)
 
-        out = torch.bmm(proj_value, attention.permute(0, 2, 1))
-        out = out.view(batchsize, C, width, height)
+        query_blocks = proj_query.split(self.chunk_size, dim=1)
+        if len(query_blocks) > 1 and width * height > self.checkpoint_tokens and torch.is_grad_enabled():
+            out = [checkpoint(self.attend, q, proj_key, proj_value, use_reentrant=False) for q in query_blocks]
+        else:
+            out = [self.attend(q, proj_key, proj_value) for q in query_blocks]
+        out = torch.cat(out, dim=2).view(batchsize, C, width, height)
 
         out = self.gamma*out + x
         return out
@@ -836,8 +959,11 @@ class ResnetGeneratorWithAttention(nn.Module):
 
 
 class TransformerBlock(nn.Module):
+    """Post-norm transformer block with full multi-head self-attention over all tokens."""
+
     def __init__(self, dim, num_heads, mlp_dim, dropout=0.1):
         super(TransformerBlock, self).__init__()
+        self.mlp_dim = mlp_dim  # the unpruned hidden size of the MLP
         self.attn = nn.MultiheadAttention(dim, num_heads, dropout=dropout)
         self.mlp = nn.Sequential(
             nn.Linear(dim, mlp_dim),
@@ -849,8 +975,50 @@ class TransformerBlock(nn.Module):
         self.norm1 = nn.LayerNorm(dim)
         self.norm2 = nn.LayerNorm(dim)
 
-    def forward(self, x):
+    def attention(self, x, size):
+        """Self-attention over a (H*W, B, C) token sequence; <size> is the (H, W) of the feature map."""
         attn_output, _ = self.attn(x, x, x)
+        return attn_output
+
+    def prune_mlp(self, ratio):
+        """Remove the <ratio> fraction of the MLP hidden units with the smallest weight magnitude
+
+        The importance of a hidden unit is the product of the L2 norms of its input weights (row of the first
+        linear layer) and its output weights (column of the second linear layer). Returns the number of units kept.
+        """
+        fc1, fc2 = self.mlp[0], self.mlp[3]
+        keep = max(1, int(round(fc1.out_features * (1 - ratio))))
+        importance = fc1.weight.norm(dim=1) * fc2.weight.norm(dim=0)
+        index = importance.topk(keep).indices.sort().values
+        pruned1 = nn.Linear(fc1.in_features, keep).to(fc1.weight)
+        pruned2 = nn.Linear(keep, fc2.out_features).to(fc2.weight)
+        with torch.no_grad():
+            pruned1.weight.copy_(fc1.weight[index])
+            pruned1.bias.copy_(fc1.bias[index])
+            pruned2.weight.copy_(fc2.weight[:, index])
+            pruned2.bias.copy_(fc2.bias)
+        self.mlp[0], self.mlp[3] = pruned1, pruned2
+        return keep
+
+    def _load_from_state_dict(self, state_dict, prefix, *args, **kwargs):
+        """Resize the MLP to the hidden size of the checkpoint, which is smaller than mlp_dim if it was pruned (see <prune_mlp>)."""
+        key = prefix + 'mlp.0.weight'
+        if key in state_dict and state_dict[key].size(0) != self.mlp[0].out_features:
+            hidden = state_dict[key].size(0)
+            self.mlp[0] = nn.Linear(self.mlp[0].in_features, hidden).to(self.mlp[0].weight)
+            self.mlp[3] = nn.Linear(hidden, self.mlp[3].out_features).to(self.mlp[3].weight)
+        super(TransformerBlock, self)._load_from_state_dict(state_dict, prefix, *args, **kwargs)
+
+    def split_heads(self, x):
+        """Project a (L, B, C) sequence with the weights of <self.attn> and return q, k, v as (B, heads, L, C // heads)."""
+        length, batch, dim = x.shape
+        qkv = F.linear(x, self.attn.in_proj_weight, self.attn.in_proj_bias)
+        qkv = qkv.view(length, batch, 3, self.attn.num_heads, dim // self.attn.num_heads)
+        q, k, v = qkv.permute(2, 1, 3, 0, 4).unbind(0)
+        return q, k, v
+
+    def forward(self, x, size=None):
+        attn_output = self.attention(x, size)
         x = x + attn_output
         x = self.norm1(x)
         mlp_output = self.mlp(x)
@@ -859,45 +1027,155 @@ class TransformerBlock(nn.Module):
         return x
 
 
+class WindowTransformerBlock(TransformerBlock):
+    """Transformer block with (shifted) window self-attention.
+
+    Tokens only attend to the tokens of their own window_size x window_size window, so memory and
+    compute grow linearly with the number of pixels. With shift_size > 0 the windows are cyclically
+    shifted and masked as in the Swin Transformer (https://arxiv.org/abs/2103.14030), which lets
+    information cross window borders when regular and shifted blocks alternate.
+    The parameters are the same as <TransformerBlock>.
+    """
+
+    def __init__(self, dim, num_heads, mlp_dim, dropout=0.1, window_size=8, shift_size=0):
+        super(WindowTransformerBlock, self).__init__(dim, num_heads, mlp_dim, dropout)
+        assert(0 <= shift_size < window_size)
+        self.window_size = window_size
+        self.shift_size = shift_size
+
+    def shift_mask(self, height, width, device):
+        """Return a (num_windows, L, L) boolean mask; True where two tokens of a shifted window come from the same region."""
+        ws, shift = self.window_size, self.shift_size
+        region = torch.zeros(height, width, dtype=torch.long, device=device)
+        label = 0
+        for hs in (slice(0, -ws), slice(-ws, -shift), slice(-shift, None)):
+            for wsl in (slice(0, -ws), slice(-ws, -shift), slice(-shift, None)):
+                region[hs, wsl] = label
+                label += 1
+        region = region.view(height // ws, ws, width // ws, ws).permute(0, 2, 1, 3).reshape(-1, ws * ws)
+        return region.unsqueeze(1) == region.unsqueeze(2)
+
+    def attention(self, x, size):
+        height, width = size
+        length, batch, dim = x.shape
+        ws = self.window_size
+        heads = self.attn.num_heads
+        q, k, v = self.split_heads(x)  # (B, heads, H*W, d)
+
+        def to_windows(t):  # (B, heads, H*W, d) -> (B, nW, heads, ws*ws, d)
+            t = t.reshape(batch * heads, height, width, -1)
+            t = F.pad(t, (0, 0, 0, pad_w, 0, pad_h))
+            if self.shift_size > 0:
+                t = torch.roll(t, shifts=(-self.shift_size, -self.shift_size), dims=(1, 2))
+            t = t.view(batch, heads, hp // ws, ws, wp // ws, ws, -1).permute(0, 2, 4, 1, 3, 5, 6)
+            return t.reshape(batch, -1, heads, ws * ws, t.size(-1))
+
+        pad_h, pad_w = (-height) % ws, (-width) % ws
+        hp, wp = height + pad_h, width + pad_w
+        mask = None
+        if self.shift_size > 0:
+            mask = self.shift_mask(hp, wp, x.device).unsqueeze(1)  # (nW, 1, L, L), broadcast over batch and heads
+        dropout_p = self.attn.dropout if self.training else 0.0
+        out = F.scaled_dot_product_attention(to_windows(q), to_windows(k), to_windows(v), attn_mask=mask, dropout_p=dropout_p)
+
+        # (B, nW, heads, ws*ws, d) -> (H*W, B, C)
+        out = out.view(batch, hp // ws, wp // ws, heads, ws, ws, -1).permute(0, 1, 4, 2, 5, 3, 6).reshape(batch, hp, wp, dim)
+        if self.shift_size > 0:
+            out = torch.roll(out, shifts=(self.shift_size, self.shift_size), dims=(1, 2))
+        out = out[:, :height, :width].reshape(batch, length, dim).transpose(0, 1)
+        return self.attn.out_proj(out)
+
+
+class LinearTransformerBlock(TransformerBlock):
+    """Transformer block with linear attention.
+
+    softmax(QK^T)V is replaced by phi(Q) (phi(K)^T V) with phi(x) = elu(x) + 1
+    (Katharopoulos et al., https://arxiv.org/abs/2006.16236), so every token still sees the whole
+    image but memory and compute grow linearly with the number of pixels.
+    The parameters are the same as <TransformerBlock>.
+    """
+
+    def __init__(self, dim, num_heads, mlp_dim, dropout=0.1, eps=1e-6):
+        super(LinearTransformerBlock, self).__init__(dim, num_heads, mlp_dim, dropout)
+        self.eps = eps
+
+    def attention(self, x, size):
+        length, batch, dim = x.shape
+        q, k, v = self.split_heads(x)  # (B, heads, L, d)
+        q, k = F.elu(q) + 1, F.elu(k) + 1
+        kv = torch.einsum('bhld,bhle->bhde', k, v)
+        normalizer = 1.0 / (torch.einsum('bhld,bhd->bhl', q, k.sum(dim=2)) + self.eps)
+        out = torch.einsum('bhld,bhde,bhl->bhle', q, kv, normalizer)
+        out = out.permute(2, 0, 1, 3).reshape(length, batch, dim)
+        return self.attn.out_proj(out)
+
+
 class TransformerGenerator(nn.Module):
-    def __init__(self, input_nc, output_nc, ngf=64, norm_layer=nn.BatchNorm2d, num_blocks=1, num_heads=4, mlp_dim=1024):
+    """Generator with a transformer bottleneck at 1/4 resolution.
+
+    <attention> selects the self-attention of the transformer blocks:
+        full   -- full multi-head attention over all H*W tokens (quadratic in the number of pixels)
+        window -- shifted-window attention; blocks alternate between regular and shifted windows
+        linear -- kernelized linear attention
+    With <depthwise>, every convolution is split into a per-channel (depthwise) convolution and a 1x1 convolution,
+    which cuts the cost of the full-resolution 7x7 convolutions; used by the distillation student [vit_small].
+    """
+
+    def __init__(self, input_nc, output_nc, ngf=64, norm_layer=nn.BatchNorm2d, num_blocks=1, num_heads=4, mlp_dim=1024, attention='full', window_size=8, depthwise=False):
         super(TransformerGenerator, self).__init__()
+
+        def conv(in_nc, out_nc, kernel_size, stride=1, padding=0, transpose=False):
+            """Return the layers of a (transposed) convolution; with <depthwise>, a per-channel conv followed by a 1x1 conv."""
+            layer = nn.ConvTranspose2d if transpose else nn.Conv2d
+            extra = {'output_padding': 1} if transpose else {}
+            if not depthwise:
+                return [layer(in_nc, out_nc, kernel_size=kernel_size, stride=stride, padding=padding, **extra)]
+            return [layer(in_nc, in_nc, kernel_size=kernel_size, stride=stride, padding=padding, groups=in_nc, **extra),
+                    nn.Conv2d(in_nc, out_nc, kernel_size=1)]
+
         self.initial = nn.Sequential(
             nn.ReflectionPad2d(3),
-            nn.Conv2d(input_nc, ngf, kernel_size=7, padding=0),
+            *conv(input_nc, ngf, 7),
             norm_layer(ngf),
             nn.ReLU(True)
         )
 
         self.down1 = nn.Sequential(
-            nn.Conv2d(ngf, ngf * 2, kernel_size=3, stride=2, padding=1),
+            *conv(ngf, ngf * 2, 3, stride=2, padding=1),
             norm_layer(ngf * 2),
             nn.ReLU(True)
         )
         self.down2 = nn.Sequential(
-            nn.Conv2d(ngf * 2, ngf * 4, kernel_size=3, stride=2, padding=1),
+            *conv(ngf * 2, ngf * 4, 3, stride=2, padding=1),
             norm_layer(ngf * 4),
             nn.ReLU(True)
         )
 
-        self.transformer_blocks = nn.Sequential(
-            *[TransformerBlock(ngf * 4, num_heads, mlp_dim) for _ in range(num_blocks)]
-        )
+        if attention == 'full':
+            blocks = [TransformerBlock(ngf * 4, num_heads, mlp_dim) for _ in range(num_blocks)]
+        elif attention == 'window':
+            blocks = [WindowTransformerBlock(ngf * 4, num_heads, mlp_dim, window_size=window_size, shift_size=(i % 2) * (window_size // 2))
+                      for i in range(num_blocks)]
+        elif attention == 'linear':
+            blocks = [LinearTransformerBlock(ngf * 4, num_heads, mlp_dim) for _ in range(num_blocks)]
+        else:
+            raise NotImplementedError('attention [%s] is not implemented' % attention)
+        self.transformer_blocks = nn.ModuleList(blocks)
 
         self.up1 = nn.Sequential(
-            nn.ConvTranspose2d(ngf * 4, ngf * 2, kernel_size=3, stride=2, padding=1, output_padding=1),
+            *conv(ngf * 4, ngf * 2, 3, stride=2, padding=1, transpose=True),
             norm_layer(ngf * 2),
             nn.ReLU(True)
         )
         self.up2 = nn.Sequential(
-            nn.ConvTranspose2d(ngf * 2, ngf, kernel_size=3, stride=2, padding=1, output_padding=1),
+            *conv(ngf * 2, ngf, 3, stride=2, padding=1, transpose=True),
             norm_layer(ngf),
             nn.ReLU(True)
         )
 
         self.final = nn.Sequential(
             nn.ReflectionPad2d(3),
-            nn.Conv2d(ngf, output_nc, kernel_size=7, padding=0),
+            *conv(ngf, output_nc, 7),
             nn.Tanh()
         )
 
@@ -909,7 +1187,8 @@ class TransformerGenerator(nn.Module):
         # Flatten for transformer
         b, c, h, w = x.shape
         x = x.view(b, c, -1).permute(2, 0, 1)  # (H*W, B, C)
-        x = self.transformer_blocks(x)
+        for block in self.transformer_blocks:
+            x = block(x, (h, w))
         x = x.permute(1, 2, 0).view(b, c, h, w)  # (B, C, H, W)
 
         x = self.up1(x)
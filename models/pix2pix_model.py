@@ -79,8 +79,8 @@ class Pix2PixModel(BaseModel):
         The option 'direction' can be used to swap images in domain A and domain B.
         """
         AtoB = self.opt.direction == 'AtoB'
-        self.real_A = input['A' if AtoB else 'B'].to(self.device)
-        self.real_B = input['B' if AtoB else 'A'].to(self.device)
+        self.real_A = input['A' if AtoB else 'B'].to(self.device, non_blocking=True)
+        self.real_B = input['B' if AtoB else 'A'].to(self.device, non_blocking=True)
         self.image_paths = input['A_paths' if AtoB else 'B_paths']
 
     def forward(self):
@@ -0,0 +1,219 @@
+"""Post-training static int8 quantization of the generators for CPU inference.
+
+<quantize_generator> returns a quantized copy of a (trained, loaded) generator. The layers of every nn.Sequential are
+split into runs of quantizable layers and float layers:
+    - a quantizable run (Conv2d, ConvTranspose2d, Linear, BatchNorm2d, InstanceNorm2d, ReLU, LeakyReLU, ReflectionPad2d,
+      <networks.ResnetBlock>, inner <networks.UnetSkipConnectionBlock>) that contains a conv or linear layer becomes a
+      <QuantRegion>: its input is quantized once, all its layers run in int8, and its output is dequantized
+    - BatchNorm is folded into the preceding conv, and conv + ReLU / linear + ReLU run as fused int8 kernels
+    - the residual addition of the Resnet blocks and the skip concatenation of the U-Net blocks run in int8
+    - the other layers stay in float: the final conv followed by Tanh (the most sensitive layer, whose output is the
+      image), the self-attention layers (<networks.SelfAttention>, nn.MultiheadAttention) and the LayerNorms
+
+The activation ranges are calibrated by running the prepared generator on a few batches of real images. Quantized
+kernels run on CPU only. The x86 engine of some torch versions computes wrong transposed convolutions for many shapes
+(e.g. those of the U-Nets, whose in and out channels differ), so every ConvTranspose2d is checked on a random probe
+input first and the generator falls back to the fbgemm engine if one fails.
+Save the state_dict of the quantized copy; to load it, build the quantized structure with
+quantize_generator(net, ()) and call load_state_dict (see <BaseModel.load_quantized_networks>).
+"""
+import copy
+import torch
+import torch.nn as nn
+import torch.ao.nn.intrinsic as nni
+import torch.ao.nn.quantized as nnq
+from torch.ao import quantization
+from torch.nn.utils.fusion import fuse_conv_bn_eval
+from . import networks
+
+
+class QuantRegion(nn.Module):
+    """Run <body> in int8: quantize the input, run the (quantized) layers, and dequantize the output."""
+
+    def __init__(self, body):
+        super(QuantRegion, self).__init__()
+        self.quant = quantization.QuantStub()
+        self.body = body
+        self.dequant = quantization.DeQuantStub()
+
+    def forward(self, x):
+        return self.dequant(self.body(self.quant(x)))
+
+
+class QuantResnetBlock(nn.Module):
+    """<networks.ResnetBlock> whose skip connection is a quantizable addition."""
+
+    def __init__(self, conv_block):
+        super(QuantResnetBlock, self).__init__()
+        self.conv_block = conv_block
+        self.skip = nnq.FloatFunctional()
+
+    def forward(self, x):
+        return self.skip.add(x, self.conv_block(x))
+
+
+class QuantUnetBlock(nn.Module):
+    """Inner <networks.UnetSkipConnectionBlock> whose skip connection is a quantizable concatenation.
+
+    The first (in-place) LeakyReLU of the original block also modifies the skip connection, so it is applied first.
+    """
+
+    def __init__(self, activation, model):
+        super(QuantUnetBlock, self).__init__()
+        self.activation = activation
+        self.model = model
+        self.skip = nnq.FloatFunctional()
+
+    def forward(self, x):
+        if self.activation is not None:
+            x = self.activation(x)
+        return self.skip.cat([x, self.model(x)], 1)
+
+
+QUANTIZABLE = (nn.Conv2d, nn.ConvTranspose2d, nn.Linear, nn.BatchNorm2d, nn.InstanceNorm2d, nn.ReLU, nn.LeakyReLU,
+               nn.ReflectionPad2d, nn.Dropout, networks.Identity, QuantResnetBlock, QuantUnetBlock,
+               nni.ConvReLU2d, nni.LinearReLU)
+
+
+def _fuse_run(layers):
+    """Fold BatchNorm into the preceding conv and pair conv / linear with a following ReLU; drop Dropout (eval mode)."""
+    layers = [layer for layer in layers if not isinstance(layer, (nn.Dropout, networks.Identity))]
+    fused, i = [], 0
+    while i < len(layers):
+        layer = layers[i]
+        i += 1
+        if isinstance(layer, (nn.Conv2d, nn.ConvTranspose2d)) and i < len(layers) and isinstance(layers[i], nn.BatchNorm2d) \
+                and layers[i].running_mean is not None:
+            layer = fuse_conv_bn_eval(layer, layers[i], transpose=isinstance(layer, nn.ConvTranspose2d))
+            i += 1
+        if type(layer) in (nn.Conv2d, nn.Linear) and i < len(layers) and isinstance(layers[i], nn.ReLU):
+            layer = nni.ConvReLU2d(layer, nn.ReLU()) if isinstance(layer, nn.Conv2d) else nni.LinearReLU(layer, nn.ReLU())
+            i += 1
+        fused.append(layer)
+    return fused
+
+
+def _convert_layer(layer):
+    """Return <layer> with its Resnet / inner U-Net blocks replaced by quantizable blocks; other layers are searched for Sequentials."""
+    if isinstance(layer, networks.ResnetBlock):
+        block = QuantResnetBlock(_quantizable_sequential(layer.conv_block))
+    elif isinstance(layer, networks.UnetSkipConnectionBlock) and not layer.outermost:
+        layers = list(layer.model)
+        activation = layers.pop(0) if isinstance(layers[0], nn.LeakyReLU) else None
+        block = QuantUnetBlock(activation, _quantizable_sequential(nn.Sequential(*layers)))
+    else:
+        return _quantize_module(layer)
+    body = block.conv_block if isinstance(block, QuantResnetBlock) else block.model
+    if all(isinstance(child, QUANTIZABLE) for child in body):
+        return block
+    return _quantize_module(layer)  # e.g. with a 'replicate' padding: keep the block in float
+
+
+def _quantizable_sequential(sequential):
+    """Return a Sequential of the fused, converted layers of <sequential> (used inside a <QuantRegion>)."""
+    return nn.Sequential(*_fuse_run([_convert_layer(layer) for layer in sequential]))
+
+
+def _quantize_sequential(sequential):
+    """Split <sequential> into int8 regions and float layers; see the module docstring."""
+    layers = [_convert_layer(layer) for layer in sequential]
+    is_float = [not isinstance(layer, QUANTIZABLE) for layer in layers]
+    for i, layer in enumerate(layers[:-1]):  # keep the output conv before the Tanh in float
+        if isinstance(layer, (nn.Conv2d, nn.ConvTranspose2d)) and isinstance(layers[i + 1], nn.Tanh):
+            is_float[i] = True
+
+    result, run = [], []
+
+    def flush():
+        if any(isinstance(layer, (nn.Conv2d, nn.ConvTranspose2d, nn.Linear, QuantResnetBlock, QuantUnetBlock)) for layer in run):
+            result.append(QuantRegion(nn.Sequential(*_fuse_run(run))))
+        else:  # no conv or linear layer: quantizing would only add conversions
+            result.extend(run)
+        del run[:]
+
+    for layer, float_layer in zip(layers, is_float):
+        if float_layer:
+            flush()
+            result.append(layer)
+        else:
+            run.append(layer)
+    flush()
+    return nn.Sequential(*result)
+
+
+def _quantize_module(module):
+    """Rewrite the Sequentials of <module> into int8 regions and float layers."""
+    if isinstance(module, nn.Sequential):
+        return _quantize_sequential(module)
+    for name, child in module.named_children():
+        setattr(module, name, _quantize_module(child))
+    return module
+
+
+def _qconfig(backend, calibrated=True):
+    """Return the default static qconfig of <backend> and a per-tensor variant for ConvTranspose2d (no per-channel support).
+
+    If not <calibrated>, the activations get fixed placeholder qparams instead of observers that never see any data;
+    the actual qparams are then loaded from a saved state_dict.
+    """
+    qconfig = quantization.get_default_qconfig(backend)
+    if not calibrated:
+        placeholder = quantization.FixedQParamsObserver.with_args(scale=1.0, zero_point=0)
+        qconfig = quantization.QConfig(activation=placeholder, weight=qconfig.weight)
+    return qconfig, quantization.QConfig(activation=qconfig.activation, weight=quantization.default_weight_observer)
+
+
+def _transpose_conv_ok(layer):
+    """Return whether the current quantized engine computes a ConvTranspose2d with the shape and hyperparameters of <layer> correctly."""
+    with torch.random.fork_rng(devices=[]):  # leave the global random state untouched
+        torch.manual_seed(0)
+        probe = nn.ConvTranspose2d(layer.in_channels, layer.out_channels, layer.kernel_size, layer.stride, layer.padding,
+                                   layer.output_padding, layer.groups, dilation=layer.dilation)
+        x = torch.rand(1, layer.in_channels, 8, 8)
+    with torch.no_grad():
+        expected = probe(x)
+    region = QuantRegion(probe).eval()
+    region.qconfig = _qconfig(torch.backends.quantized.engine)[1]
+    quantization.prepare(region, inplace=True)
+    with torch.no_grad():
+        region(x)
+        quantization.convert(region, inplace=True)
+        error = (region(x) - expected).norm() / expected.norm()
+    return error.item() < 0.1  # int8 rounding gives a few percent; a wrong kernel gives ~100%
+
+
+def quantize_generator(net, batches, backend=''):
+    """Return an int8 copy of the generator <net>, calibrated on <batches>
+
+    Parameters:
+        net (network)           -- a generator, e.g. a <networks.ResnetGenerator>, possibly wrapped in DataParallel
+        batches (tensor list)   -- input batches (N x C x H x W, in [-1, 1]) used to calibrate the activation ranges;
+                                   with no batches, the copy only has the structure needed to load a quantized state_dict
+                                   (its activation qparams are placeholders until the state_dict is loaded)
+        backend (str)           -- quantized engine: fbgemm | x86 | qnnpack; the current engine if empty
+
+    The copy runs on CPU, in eval mode, and does not require gradients.
+    """
+    if backend:
+        torch.backends.quantized.engine = backend
+    backend = torch.backends.quantized.engine
+    if isinstance(net, nn.DataParallel):
+        net = net.module
+    if backend == 'x86' and not all(_transpose_conv_ok(layer) for layer in net.modules() if isinstance(layer, nn.ConvTranspose2d)):
+        print('the x86 quantized engine computes wrong transposed convolutions for this generator; using fbgemm')
+        backend = torch.backends.quantized.engine = 'fbgemm'
+    batches = list(batches)
+    qnet = _quantize_module(copy.deepcopy(net).cpu().eval())
+    qconfig, transpose_qconfig = _qconfig(backend, calibrated=len(batches) > 0)
+    for region in qnet.modules():
+        if isinstance(region, QuantRegion):  # the layers outside the regions have no qconfig and stay in float
+            region.qconfig = qconfig
+            for module in region.modules():
+                if isinstance(module, nn.ConvTranspose2d):
+                    module.qconfig = transpose_qconfig
+    quantization.prepare(qnet, inplace=True)
+    with torch.no_grad():
+        for batch in batches:
+            qnet(batch.cpu())
+    quantization.convert(qnet, inplace=True)
+    return qnet.eval().requires_grad_(False)
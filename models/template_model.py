@@ -76,8 +76,8 @@ class TemplateModel(BaseModel):
             input: a dictionary that contains the data itself and its metadata information.
         """
         AtoB = self.opt.direction == 'AtoB'  # use <direction> to swap data_A and data_B
-        self.data_A = input['A' if AtoB else 'B'].to(self.device)  # get image data A
-        self.data_B = input['B' if AtoB else 'A'].to(self.device)  # get image data B
+        self.data_A = input['A' if AtoB else 'B'].to(self.device, non_blocking=True)  # get image data A
+        self.data_B = input['B' if AtoB else 'A'].to(self.device, non_blocking=True)  # get image data B
         self.image_paths = input['A_paths' if AtoB else 'B_paths']  # get image paths
 
     def forward(self):
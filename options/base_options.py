@@ -13,6 +13,8 @@ class BaseOptions():
     It also gathers additional options defined in <modify_commandline_options> functions in both dataset class and model class.
     """
 
+    requires_dataroot = True  # set to False in subclasses that do not read a dataset
+
     def __init__(self):
         """Reset the class; indicates the class hasn't been initailized"""
         self.initialized = False
@@ -20,7 +22,7 @@ class BaseOptions():
     def initialize(self, parser):
         """Define the common options that are used in both training and test."""
         # basic parameters
-        parser.add_argument('--dataroot', required=True, help='path to images (should have subfolders trainA, trainB, valA, valB, etc)')
+        parser.add_argument('--dataroot', required=self.requires_dataroot, help='path to images (should have subfolders trainA, trainB, valA, valB, etc)')
         parser.add_argument('--name', type=str, default='experiment_name', help='name of the experiment. It decides where to store samples and models')
         parser.add_argument('--gpu_ids', type=str, default='0', help='gpu ids: e.g. 0  0,1,2, 0,2. use -1 for CPU')
         parser.add_argument('--checkpoints_dir', type=str, default='./checkpoints', help='models are saved here')
@@ -33,7 +35,7 @@ class BaseOptions():
         parser.add_argument('--netD', type=str, default='basic', help='specify discriminator architecture [basic | n_layers | pixel]. The basic model is a 70x70 PatchGAN. n_layers allows you to specify the layers in the discriminator')
         # parser.add_argument('--netG', type=str, default='resnet_9blocks', help='specify generator architecture [resnet_9blocks | resnet_6blocks | unet_256 | unet_128]')
         # lyf test 6151947
-        parser.add_argument('--netG', type=str, default='resnet_attention', help='specify generator architecture [resnet_9blocks | resnet_6blocks | unet_256 | unet_128]')
+        parser.add_argument('--netG', type=str, default='resnet_attention', help='specify generator architecture [resnet_9blocks | resnet_6blocks | resnet_attention | vit | vit_window | vit_linear | vit_small | unet_256 | unet_128]')
         parser.add_argument('--n_layers_D', type=int, default=3, help='only used if netD==n_layers')
         parser.add_argument('--norm', type=str, default='instance', help='instance normalization or batch normalization [instance | batch | none]')
         parser.add_argument('--init_type', type=str, default='normal', help='network initialization [normal | xavier | kaiming | orthogonal]')
@@ -44,12 +46,21 @@ class BaseOptions():
         parser.add_argument('--direction', type=str, default='AtoB', help='AtoB or BtoA')
         parser.add_argument('--serial_batches', action='store_true', help='if true, takes images in order to make batches, otherwise takes them randomly')
         parser.add_argument('--num_threads', default=4, type=int, help='# threads for loading data')
+        parser.add_argument('--persistent_workers', action='store_true', help='if specified, keep the data loader workers alive across epochs instead of restarting them')
+        parser.add_argument('--prefetch_factor', type=int, default=2, help='# batches loaded in advance by each data loader worker')
+        parser.add_argument('--pin_memory', action='store_true', help='if specified, the data loader returns batches in pinned memory for faster (asynchronous) copies to the GPU')
+        parser.add_argument('--worker_start_method', type=str, default='', help='start method of the data loader workers [fork | spawn | forkserver]; the platform default if empty')
         parser.add_argument('--batch_size', type=int, default=1, help='input batch size')
         parser.add_argument('--load_size', type=int, default=286, help='scale images to this size')
         parser.add_argument('--crop_size', type=int, default=256, help='then crop to this size')
         parser.add_argument('--max_dataset_size', type=int, default=float("inf"), help='Maximum number of samples allowed per dataset. If the dataset directory contains more than max_dataset_size, only a subset is loaded.')
         parser.add_argument('--preprocess', type=str, default='resize_and_crop', help='scaling and cropping of images at load time [resize_and_crop | crop | scale_width | scale_width_and_crop | none]')
         parser.add_argument('--no_flip', action='store_true', help='if specified, do not flip the images for data augmentation')
+        parser.add_argument('--dataset_cache', type=str, default='', help='directory of the resized image caches built by cache_dataset.py; if set, the dataset reads <phase>A/<phase>B from there instead of decoding and resizing the images')
+        parser.add_argument('--image_index_dir', type=str, default='', help='directory where the image listings of the dataset folders are saved and reused until a folder changes; the folders are scanned at every start if empty')
+        parser.add_argument('--resize_cache', type=str, default='', help='directory of a content-addressed cache of resized images shared across runs and preprocess options; disabled if empty')
+        parser.add_argument('--resize_cache_size', type=float, default=2048, help='maximum size of --resize_cache in MB; the least recently used images are evicted')
+        parser.add_argument('--batch_augment', action='store_true', help='if specified, the data loader workers return uint8 images, and the crop, flip and normalization run once per batch')
         parser.add_argument('--display_winsize', type=int, default=256, help='display window size for both visdom and HTML')
         # additional parameters
         parser.add_argument('--epoch', type=str, default='latest', help='which epoch to load? set to latest to use latest cached model')
@@ -0,0 +1,18 @@
+from .test_options import TestOptions
+
+
+class ExportOptions(TestOptions):
+    """This class includes options for exporting a generator as a self-contained TorchScript file.
+
+    It also includes shared options defined in BaseOptions and TestOptions.
+    """
+
+    requires_dataroot = False  # the export does not read a dataset
+
+    def initialize(self, parser):
+        parser = TestOptions.initialize(self, parser)  # define shared options
+        parser.add_argument('--export_path', type=str, default='', help='path of the exported file; by default [checkpoints_dir]/[name]/[epoch]_net_G[model_suffix].torchscript.pt')
+        parser.add_argument('--export_size', type=int, default=256, help='height and width of the example input used for tracing; the exported graph is meant for inputs of this size')
+        parser.add_argument('--export_batch', type=int, default=1, help='batch size of the example input used for tracing')
+        parser.add_argument('--no_freeze', action='store_true', help='if specified, keep the weights as module parameters instead of freezing them into the graph')
+        return parser
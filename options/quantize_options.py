@@ -0,0 +1,16 @@
+from .test_options import TestOptions
+
+
+class QuantizeOptions(TestOptions):
+    """This class includes options for the post-training int8 quantization of a generator.
+
+    It also includes shared options defined in BaseOptions and TestOptions.
+    '--dataroot' is the folder of calibration images, e.g. testA.
+    """
+
+    def initialize(self, parser):
+        parser = TestOptions.initialize(self, parser)  # define shared options
+        parser.add_argument('--calib_images', type=int, default=32, help='number of images used to calibrate the activation ranges')
+        parser.add_argument('--report_images', type=int, default=16, help='number of further images used to compare the int8 and float generators')
+        parser.add_argument('--n_iters', type=int, default=5, help='number of timed generator calls per latency measurement')
+        return parser
@@ -0,0 +1,18 @@
+from .test_options import TestOptions
+
+
+class ServeOptions(TestOptions):
+    """This class includes options for the desmoking inference server.
+
+    It also includes shared options defined in BaseOptions and TestOptions.
+    """
+
+    requires_dataroot = False  # the server does not read a dataset
+
+    def initialize(self, parser):
+        parser = TestOptions.initialize(self, parser)  # define shared options
+        parser.add_argument('--host', type=str, default='127.0.0.1', help='address the server listens on')
+        parser.add_argument('--port', type=int, default=8000, help='port the server listens on')
+        parser.add_argument('--max_batch', type=int, default=8, help='maximum number of requests run as one micro-batch')
+        parser.add_argument('--max_wait_ms', type=float, default=5.0, help='maximum time (ms) a request waits for other requests to join its micro-batch')
+        return parser
@@ -15,6 +15,20 @@ class TestOptions(BaseOptions):
         # Dropout and Batchnorm has different behavioir during training and test.
         parser.add_argument('--eval', action='store_true', help='use eval mode during test time.')
         parser.add_argument('--num_test', type=int, default=50, help='how many test images to run')
+        parser.add_argument('--visuals', type=str, default='', help='comma-separated names of the images to compute and save, e.g. fake_B. If empty, all the images of the model are saved')
+        # tiled inference for full-resolution frames, e.g. with '--preprocess none'
+        parser.add_argument('--tile_size', type=int, default=0, help='if positive, run the generators on overlapping tiles of this size (a multiple of 4) and blend them')
+        parser.add_argument('--tile_overlap', type=int, default=32, help='number of pixels shared by neighbouring tiles')
+        parser.add_argument('--tile_batch', type=int, default=4, help='number of tiles per generator call')
+        # guided filter refinement of the output
+        parser.add_argument('--guided_radius', type=int, default=0, help='if positive, refine the generator output with a guided filter of this (odd) window size, using the input as guide')
+        parser.add_argument('--guided_eps', type=float, default=1e-3, help='regularization of the guided filter; larger values smooth more')
+        # optimized inference variant of the generators, built from the loaded checkpoint
+        parser.add_argument('--fuse_generator', action='store_true', help='run an inference-only copy of the generators with BatchNorm folded into the convolutions and fused pointwise ops (implies eval mode for the generators)')
+        parser.add_argument('--no_channels_last', action='store_true', help='with --fuse_generator, keep the default (N, C, H, W) memory layout instead of channels_last')
+        # int8 generators saved by quantize.py
+        parser.add_argument('--int8', action='store_true', help='replace the generators by their int8 versions [epoch]_net_G[model_suffix]_int8.pth saved by quantize.py (CPU only)')
+        parser.add_argument('--quant_backend', type=str, default='', help='quantized engine [fbgemm | x86 | qnnpack]; the torch default if empty')
         # rewrite devalue values
         parser.set_defaults(model='test')
         # To avoid cropping, the load_size should be the same as crop_size
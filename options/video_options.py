@@ -0,0 +1,18 @@
+from .test_options import TestOptions
+
+
+class VideoOptions(TestOptions):
+    """This class includes options for desmoking video files.
+
+    It also includes shared options defined in BaseOptions and TestOptions.
+    '--dataroot' is the path of the input video.
+    """
+
+    def initialize(self, parser):
+        parser = TestOptions.initialize(self, parser)  # define shared options
+        parser.add_argument('--output', type=str, default='', help='path of the output video; by default [results_dir]/[name]/[video name]_desmoked.mp4')
+        parser.add_argument('--fourcc', type=str, default='mp4v', help='four character code of the output video codec')
+        parser.add_argument('--queue_size', type=int, default=4, help='maximum number of batches buffered between the decoding, generator and encoding stages')
+        parser.add_argument('--max_frames', type=int, default=0, help='if positive, stop after this many frames')
+        parser.add_argument('--report_freq', type=int, default=100, help='frequency (in frames) of printing the throughput')
+        return parser
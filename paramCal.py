@@ -1,13 +1,18 @@
+import sys
+import zipfile
 import torch
+from util.runtime import load_meta
 
-# 加载模型（假设模型文件名为model.pth）
-model_path = "checkpoints/vit2_new_200epoch_vgg/latest_net_G.pth"  # 这里改为实际的文件路径
-model = torch.load(model_path)
+# 模型文件：checkpoint（state_dict，如 latest_net_G.pth）或 export.py 导出的 TorchScript 文件
+model_path = sys.argv[1] if len(sys.argv) > 1 else "checkpoints/vit2_new_200epoch_vgg/latest_net_G.pth"  # 这里改为实际的文件路径
 
-# 如果模型是保存的state_dict，则加载state_dict
-# model = MyModel()  # 如果有需要的话，可以先实例化模型
-# model.load_state_dict(torch.load(model_path))
+try:
+    # export.py 导出的文件中记录了参数量
+    total_params = load_meta(model_path)['num_params']
+except (zipfile.BadZipFile, StopIteration):
+    # checkpoint 保存的是 state_dict（参数名 -> 张量），而不是模型本身
+    state_dict = torch.load(model_path, map_location='cpu')
+    total_params = sum(v.numel() for k, v in state_dict.items() if not k.endswith(('running_mean', 'running_var', 'num_batches_tracked')))
 
 # 计算模型的参数量
-total_params = sum(p.numel() for p in model.parameters())
 print(f"Total parameters: {total_params}")
@@ -0,0 +1,87 @@
+"""Post-training static int8 quantization of a generator for CPU inference.
+
+The script loads a generator like test-new-eva.py ('--model test', <BaseModel.load_networks>), calibrates the
+activation ranges on '--calib_images' images of '--dataroot' (e.g. testA, read by SingleDataset) and saves the
+quantized generator to [checkpoints_dir]/[name]/[epoch]_net_G[model_suffix]_int8.pth. The saved file is reloaded like
+with '--int8' and must give identical outputs.
+The convolutions and linear layers run in int8; the final conv + Tanh and the attention layers stay in float
+(see models/quantization.py).
+
+It then reports, on the next '--report_images' images, the latency and the size of the float and int8 generators and
+the PSNR/SSIM of the int8 output against the float output.
+
+Example:
+    python quantize.py --dataroot datasets/hazy2clear_0206/testA --name vit_512_100epoch_vgg --model test --netG vit --no_dropout --gpu_ids -1
+    python test-new-eva.py --dataroot datasets/hazy2clear_0206/testA --name vit_512_100epoch_vgg --model test --netG vit --no_dropout --gpu_ids -1 --int8
+"""
+import io
+import os
+import time
+import torch
+from options.quantize_options import QuantizeOptions
+from data import create_dataset
+from models import create_model
+from models.quantization import quantize_generator
+from util.metrics import psnr, ssim
+
+
+def state_dict_size(net):
+    """Return the size (in MB) of the serialized state_dict of <net>."""
+    buffer = io.BytesIO()
+    torch.save(net.state_dict(), buffer)
+    return buffer.tell() / 2 ** 20
+
+
+def latency(net, x, n_iters):
+    """Return the mean time (in seconds) of net(x) over <n_iters> calls, after one warm-up call."""
+    with torch.no_grad():
+        net(x)
+        start = time.perf_counter()
+        for _ in range(n_iters):
+            net(x)
+    return (time.perf_counter() - start) / n_iters
+
+
+if __name__ == '__main__':
+    opt = QuantizeOptions().parse()  # get quantization options
+    assert opt.model == 'test', 'quantize.py quantizes a single generator; please use --model test'
+    assert not opt.gpu_ids, 'int8 generators run on CPU; please use --gpu_ids -1'
+    opt.serial_batches = True  # the same calibration images in every run
+    opt.no_flip = True
+    opt.max_dataset_size = opt.calib_images + opt.report_images
+    dataset = create_dataset(opt)  # create a dataset given opt.dataset_mode and other options
+    model = create_model(opt)      # create a model given opt.model and other options
+    model.setup(opt)               # load the float generator
+    model.eval()
+    netG = model.netG.module if isinstance(model.netG, torch.nn.DataParallel) else model.netG
+
+    images = torch.cat([data['A'] for data in dataset]).float()
+    calib, report = images[:opt.calib_images], images[opt.calib_images:]
+    if len(report) == 0:
+        print('no images left after calibration; reporting on the calibration images')
+        report = calib
+    calib_batches = calib.split(opt.batch_size)
+
+    start = time.time()
+    qnetG = quantize_generator(netG, calib_batches, opt.quant_backend)
+    print('calibrated on %d images in %.1f s (%s engine)' % (len(calib), time.time() - start, torch.backends.quantized.engine))
+    save_path = os.path.join(model.save_dir, '%s_net_G%s_int8.pth' % (opt.epoch, opt.model_suffix))
+    torch.save(qnetG.state_dict(), save_path)
+    print('saved the int8 generator to %s' % save_path)
+    # reload the file the way '--int8' does (<BaseModel.load_quantized_networks>) and check that it gives the same outputs
+    reloaded = quantize_generator(netG, (), opt.quant_backend)
+    reloaded.load_state_dict(torch.load(save_path, map_location='cpu'))
+    with torch.no_grad():
+        assert all(torch.equal(qnetG(x), reloaded(x)) for x in report.split(opt.batch_size)), 'the saved int8 generator does not reload identically'
+    print('the saved int8 generator reloads with identical outputs')
+
+    with torch.no_grad():
+        fake, qfake = torch.cat([netG(x) for x in report.split(opt.batch_size)]), torch.cat([qnetG(x) for x in report.split(opt.batch_size)])
+    x = report[:opt.batch_size]
+    t_float, t_int8 = latency(netG, x, opt.n_iters), latency(qnetG, x, opt.n_iters)
+    size_float, size_int8 = state_dict_size(netG), state_dict_size(qnetG)
+    print('%-6s %14s %10s' % ('', 'latency (ms)', 'size (MB)'))
+    print('%-6s %14.1f %10.1f' % ('float', t_float * 1000, size_float))
+    print('%-6s %14.1f %10.1f' % ('int8', t_int8 * 1000, size_int8))
+    print('speedup %.2fx, %.1fx smaller; int8 vs float on %d images: PSNR %.2f dB, SSIM %.4f (batch %d x %d x %d x %d)'
+          % (t_float / t_int8, size_float / size_int8, len(report), psnr(qfake, fake).mean().item(), ssim(qfake, fake).mean().item(), *x.shape))
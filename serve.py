@@ -0,0 +1,96 @@
+"""Local HTTP inference server for frame-by-frame desmoking.
+
+It loads a generator once with '--model test' (through <BaseModel.load_networks>, see test-new-eva.py) and serves it over HTTP:
+    POST /desmoke  -- the body is an encoded image (PNG/JPEG); the response is the desmoked image as PNG
+    GET  /stats    -- JSON with the number of requests and batches, p50/p99 latency (ms) and throughput (requests / sec)
+
+Concurrent requests are gathered into micro-batches of at most '--max_batch' images; a request waits at most
+'--max_wait_ms' for others to join. The generator runs under torch.inference_mode().
+Decoding, resizing and encoding run in the request threads, so only the generator itself is serialized.
+
+Example:
+    python serve.py --name vit_512_100epoch_vgg --model test --netG vit --no_dropout --gpu_ids -1 --port 8000
+    curl --data-binary @frame.png http://127.0.0.1:8000/desmoke -o desmoked.png
+Use 'python -m benchmarks.bench_server' to send a synthetic load.
+"""
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import cv2
+import numpy as np
+import torch
+from options.serve_options import ServeOptions
+from models import create_model
+from util import util
+from util.inference_server import MicroBatcher
+
+
+def make_server(netG, opt, device=torch.device('cpu')):
+    """Create an HTTP server around a loaded generator
+
+    Parameters:
+        netG (network)     -- the generator
+        opt (Option class) -- server options (host, port, max_batch, max_wait_ms, preprocess, load_size)
+        device             -- the device of the generator
+
+    Returns the server and its <MicroBatcher>; call server.serve_forever() to start serving.
+    """
+    def run_generator(real):
+        with torch.inference_mode():
+            return netG(real.to(device)).cpu()
+
+    batcher = MicroBatcher(run_generator, opt.max_batch, opt.max_wait_ms / 1000.0)
+
+    class Handler(BaseHTTPRequestHandler):
+        def send(self, code, body, content_type):
+            self.send_response(code)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path != '/stats':
+                return self.send(404, b'not found', 'text/plain')
+            self.send(200, json.dumps(batcher.stats.summary()).encode(), 'application/json')
+
+        def do_POST(self):
+            if self.path != '/desmoke':
+                return self.send(404, b'not found', 'text/plain')
+            length = self.headers.get('Content-Length')
+            if length is None:  # e.g. a chunked upload
+                return self.send(411, b'Content-Length required', 'text/plain')
+            try:
+                length = int(length)
+            except ValueError:
+                length = -1
+            if length < 0:
+                return self.send(400, b'malformed Content-Length', 'text/plain')
+            data = self.rfile.read(length)
+            image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+            if image is None:
+                return self.send(400, b'cannot decode image', 'text/plain')
+            height, width = image.shape[:2]
+            image = cv2.cvtColor(cv2.resize(image, util.inference_size(opt, width, height), interpolation=cv2.INTER_CUBIC), cv2.COLOR_BGR2RGB)
+            real = torch.from_numpy(image).permute(2, 0, 1).float().div_(127.5).sub_(1.0)  # [-1, 1], as the Normalize in <get_transform>
+            fake = util.tensor2im_batch(batcher.submit(real)[None])[0]
+            fake = cv2.resize(cv2.cvtColor(fake, cv2.COLOR_RGB2BGR), (width, height), interpolation=cv2.INTER_CUBIC)
+            self.send(200, cv2.imencode('.png', fake)[1].tobytes(), 'image/png')
+
+        def log_message(self, format, *args):  # do not log every request
+            pass
+
+    return ThreadingHTTPServer((opt.host, opt.port), Handler), batcher
+
+
+if __name__ == '__main__':
+    opt = ServeOptions().parse()  # get server options
+    assert opt.model == 'test', 'serve.py serves a single generator; please use --model test'
+    model = create_model(opt)     # create a model given opt.model and other options
+    model.setup(opt)              # load the generator once
+    model.eval()
+    server, batcher = make_server(model.netG, opt, model.device)
+    print('serving %s on http://%s:%d (POST /desmoke, GET /stats)' % (opt.name, opt.host, opt.port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(json.dumps(batcher.stats.summary()))
@@ -5,6 +5,8 @@ It will load a saved model from '--checkpoints_dir' and save the results to '--r
 
 It first creates model and dataset given the option. It will hard-code some parameters.
 It then runs inference for '--num_test' images and save results to an HTML file.
+Images are decoded by '--num_threads' data loader workers and run through the model in batches of '--batch_size'.
+With '--model cycle_gan', '--visuals fake_B' (or '--dataset_mode single' on a testA folder) only loads and runs G_A and saves the desmoked images.
 
 Example (You need to train models first or download pre-trained models from our website):
     Test a CycleGAN model (both sides):
@@ -47,8 +49,6 @@ if __name__ == '__main__':
     # else:
     #     opt.results_dir = os.path.join(opt.results_dir, opt.name)
 
-    opt.num_threads = 0   # test code only supports num_threads = 0
-    opt.batch_size = 1    # test code only supports batch_size = 1
     opt.serial_batches = True  # disable data shuffling; comment this line if results on randomly chosen images are needed.
     opt.no_flip = True    # no flip; comment this line if results on flipped images are needed.
     opt.display_id = -1   # no visdom display; the test code saves the results to a HTML file.
@@ -68,14 +68,17 @@ if __name__ == '__main__':
         model.eval()
 
     for i, data in enumerate(dataset):
-        if i >= opt.num_test:  # only apply our model to opt.num_test images.
+        if i * opt.batch_size >= opt.num_test:  # only apply our model to opt.num_test images.
             break
+        remaining = opt.num_test - i * opt.batch_size
+        if remaining < opt.batch_size:  # trim the last batch to opt.num_test images
+            data = {key: value[:remaining] for key, value in data.items()}
         model.set_input(data)  # unpack data from data loader
         model.test()           # run inference
         visuals = model.get_current_visuals()  # get image results
         img_path = model.get_image_paths()     # get image paths
         if i % 5 == 0:  # save images to an HTML file
-            print('processing (%04d)-th image... %s' % (i, img_path))
+            print('processing (%04d)-th batch... %s' % (i, img_path))
         save_images(webpage, visuals, img_path, aspect_ratio=opt.aspect_ratio, width=opt.display_winsize)
     webpage.save()  # save the HTML
 
@@ -74,4 +74,8 @@ if __name__ == '__main__':
             model.save_networks('latest')
             model.save_networks(epoch)
 
-        print('End of epoch %d / %d \t Time Taken: %d sec' % (epoch, opt.n_epochs + opt.n_epochs_decay, time.time() - epoch_start_time))
+        epoch_time = time.time() - epoch_start_time
+        print('End of epoch %d / %d \t Time Taken: %d sec \t Throughput: %.2f images/sec' % (epoch, opt.n_epochs + opt.n_epochs_decay, epoch_time, epoch_iter / epoch_time))
+        print(dataset.timing_summary())       # how long the training loop waited for data
+        if dataset.dataset.resize_cache is not None:
+            print(dataset.dataset.resize_cache)   # hit rate and size of --resize_cache
@@ -1,4 +1,3 @@
-import random
 import torch
 
 
@@ -7,18 +6,28 @@ class ImagePool():
 
     This buffer enables us to update discriminators using a history of generated images
     rather than the ones produced by the latest generators.
+
+    The images are kept as a list of 1xCxHxW views of the generated batches (no copy), like the original
+    implementation; the random choices of a whole batch are drawn at once from the pool's own generator, and the
+    returned batch is assembled with a single torch.cat.
     """
 
-    def __init__(self, pool_size):
+    def __init__(self, pool_size, seed=None):
         """Initialize the ImagePool class
 
         Parameters:
             pool_size (int) -- the size of image buffer, if pool_size=0, no buffer will be created
+            seed (int)      -- the seed of the random choices of the pool; a random seed if None
         """
         self.pool_size = pool_size
         if self.pool_size > 0:  # create an empty pool
             self.num_imgs = 0
             self.images = []
+            self.generator = torch.Generator()
+            if seed is None:
+                self.generator.seed()
+            else:
+                self.generator.manual_seed(seed)
 
     def query(self, images):
         """Return an image from the pool.
@@ -31,24 +40,27 @@ class ImagePool():
         By 50/100, the buffer will return input images.
         By 50/100, the buffer will return images previously stored in the buffer,
         and insert the current images to the buffer.
+
+        The result is the same as handling the images one after the other: if two images of the batch
+        pick the same buffer slot, the second one gets (and replaces) the first one.
         """
         if self.pool_size == 0:  # if the buffer size is 0, do nothing
             return images
-        return_images = []
-        for image in images:
-            image = torch.unsqueeze(image.data, 0)
-            if self.num_imgs < self.pool_size:   # if the buffer is not full; keep inserting current images to the buffer
-                self.num_imgs = self.num_imgs + 1
-                self.images.append(image)
-                return_images.append(image)
-            else:
-                p = random.uniform(0, 1)
-                if p > 0.5:  # by 50% chance, the buffer will return a previously stored image, and insert the current image into the buffer
-                    random_id = random.randint(0, self.pool_size - 1)  # randint is inclusive
-                    tmp = self.images[random_id].clone()
-                    self.images[random_id] = image
-                    return_images.append(tmp)
-                else:       # by another 50% chance, the buffer will return the current image
-                    return_images.append(image)
-        return_images = torch.cat(return_images, 0)   # collect all the images and return
-        return return_images
+        images = images.detach()
+        n = images.size(0)
+        rows = list(images.split(1))
+
+        # if the buffer is not full; keep inserting current images to the buffer
+        n_fill = min(n, self.pool_size - self.num_imgs)
+        self.images.extend(rows[:n_fill])
+        self.num_imgs += n_fill
+        if n_fill == n:
+            return images
+
+        # by 50% chance, the buffer will return a previously stored image, and insert the current image into the buffer
+        swap = (torch.rand(n, generator=self.generator) > 0.5).tolist()
+        slots = torch.randint(0, self.pool_size, (n,), generator=self.generator).tolist()
+        for i in range(n_fill, n):  # only swaps references; the images are copied once, by torch.cat
+            if swap[i]:
+                rows[i], self.images[slots[i]] = self.images[slots[i]], rows[i]
+        return torch.cat(rows, 0)
@@ -0,0 +1,117 @@
+"""This module implements the micro-batching and latency accounting used by serve.py."""
+import queue
+import threading
+import time
+from collections import deque
+import numpy as np
+import torch
+
+
+class LatencyStats():
+    """This class keeps request latencies and throughput counters of an inference service."""
+
+    def __init__(self, window=10000):
+        """Initialize the LatencyStats class
+
+        Parameters:
+            window (int) -- the number of most recent requests used for the latency percentiles
+        """
+        self.lock = threading.Lock()
+        self.latencies = deque(maxlen=window)
+        self.n_requests = 0
+        self.n_batches = 0
+        self.start_time = time.perf_counter()
+
+    def add_batch(self, latencies):
+        """Record the latencies (in seconds) of the requests served by one batch"""
+        with self.lock:
+            self.latencies.extend(latencies)
+            self.n_requests += len(latencies)
+            self.n_batches += 1
+
+    def summary(self):
+        """Return a dictionary with p50/p99 latency (ms), throughput (requests / sec) and the mean batch size"""
+        with self.lock:
+            latencies = np.array(self.latencies) * 1000.0
+            elapsed = time.perf_counter() - self.start_time
+            return {
+                'requests': self.n_requests,
+                'batches': self.n_batches,
+                'mean_batch_size': self.n_requests / max(self.n_batches, 1),
+                'p50_ms': float(np.percentile(latencies, 50)) if len(latencies) else 0.0,
+                'p99_ms': float(np.percentile(latencies, 99)) if len(latencies) else 0.0,
+                'throughput': self.n_requests / elapsed,
+            }
+
+
+class _Request():
+    def __init__(self, image):
+        self.image = image
+        self.start_time = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class MicroBatcher():
+    """This class gathers concurrent requests into micro-batches for a model.
+
+    Requests are collected until <max_batch> requests are waiting or the first one has waited <max_wait> seconds.
+    The batch is then split by image size, and every group of equally sized images goes through <fn> as one batch.
+    A single worker thread runs the model, so <fn> does not need to be thread-safe.
+    """
+
+    def __init__(self, fn, max_batch=8, max_wait=0.005):
+        """Initialize the MicroBatcher class
+
+        Parameters:
+            fn (function)      -- maps a (N, C, H, W) tensor to a (N, C', H', W') tensor
+            max_batch (int)    -- the maximum number of requests in a batch
+            max_wait (float)   -- the maximum time (in seconds) a request waits for other requests to join its batch
+        """
+        self.fn = fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.stats = LatencyStats()
+        self.requests = queue.Queue()
+        self.worker = threading.Thread(target=self._run, daemon=True)
+        self.worker.start()
+
+    def submit(self, image):
+        """Run the model on a single (C, H, W) image; blocks until the result is ready and returns a (C', H', W') tensor"""
+        request = _Request(image)
+        self.requests.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def _collect(self):
+        batch = [self.requests.get()]
+        deadline = batch[0].start_time + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self.requests.get(timeout=remaining) if remaining > 0 else self.requests.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            groups = {}
+            for request in batch:
+                groups.setdefault(tuple(request.image.shape), []).append(request)
+            for group in groups.values():
+                try:
+                    results = self.fn(torch.stack([request.image for request in group]))
+                    for request, result in zip(group, results):
+                        request.result = result
+                except Exception as error:  # report the error to the waiting requests instead of killing the worker
+                    for request in group:
+                        request.error = error
+                end_time = time.perf_counter()
+                for request in group:
+                    request.done.set()
+                self.stats.add_batch([end_time - request.start_time for request in group])
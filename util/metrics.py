@@ -0,0 +1,33 @@
+"""Full-reference image quality metrics for comparing generator outputs, e.g. an optimized generator against the original one."""
+import torch
+import torch.nn.functional as F
+
+
+def psnr(x, y, data_range=2.0):
+    """Return the PSNR (dB) of each image of the batch <x> against <y>; both are (N, C, H, W) tensors, in [-1, 1] by default."""
+    mse = (x.float() - y.float()).pow(2).flatten(1).mean(1)
+    return 10 * torch.log10(data_range ** 2 / mse.clamp_min(1e-12))
+
+
+def ssim(x, y, data_range=2.0, window_size=11, sigma=1.5):
+    """Return the SSIM of each image of the batch <x> against <y>, averaged over pixels and channels
+
+    The local statistics use a Gaussian window (<window_size>, <sigma>) as in Wang et al. 2004.
+    """
+    x, y = x.float(), y.float()
+    channels = x.size(1)
+    coords = torch.arange(window_size, dtype=torch.float32, device=x.device) - (window_size - 1) / 2
+    g = torch.exp(-coords ** 2 / (2 * sigma ** 2))
+    g = (g / g.sum()).view(1, 1, 1, -1).repeat(channels, 1, 1, 1)
+
+    def blur(t):  # separable Gaussian filter, applied to each channel
+        t = F.conv2d(t, g, groups=channels)
+        return F.conv2d(t, g.transpose(2, 3), groups=channels)
+
+    c1, c2 = (0.01 * data_range) ** 2, (0.03 * data_range) ** 2
+    mu_x, mu_y = blur(x), blur(y)
+    var_x = blur(x * x) - mu_x ** 2
+    var_y = blur(y * y) - mu_y ** 2
+    cov = blur(x * y) - mu_x * mu_y
+    ssim_map = ((2 * mu_x * mu_y + c1) * (2 * cov + c2)) / ((mu_x ** 2 + mu_y ** 2 + c1) * (var_x + var_y + c2))
+    return ssim_map.flatten(1).mean(1)
@@ -0,0 +1,53 @@
+"""Lightweight runtime for the generators exported by export.py.
+
+This module only depends on torch: it does not import the models, options or data packages, so a deployment can
+ship the exported file and this module alone.
+
+Example:
+    from util.runtime import ExportedGenerator
+    netG = ExportedGenerator('checkpoints/vit_512_100epoch_vgg/latest_net_G.torchscript.pt')
+    print(netG.meta['netG'], netG.meta['norm'])
+    fake = netG(real)  # real: (N, C, H, W) tensor in [-1, 1], H x W = netG.meta['input_size']
+"""
+import json
+import zipfile
+import torch
+
+META_FILE = 'meta.json'  # name of the metadata file stored in the exported archive
+
+
+def load_meta(path):
+    """Return the metadata (a dict) embedded in the exported file <path>, without loading the graph."""
+    with zipfile.ZipFile(path) as archive:  # TorchScript files are zip archives with the extra files in <archive>/extra/
+        name = next(name for name in archive.namelist() if name.endswith('/extra/' + META_FILE))
+        return json.loads(archive.read(name))
+
+
+class ExportedGenerator():
+    """Run an exported generator; the architecture and preprocessing metadata are available as <meta>.
+
+    <meta> holds the options the generator was built with (netG, norm, ngf, input_nc, output_nc, ...),
+    the traced input size (input_size), the value range of the inputs and outputs (value_range) and
+    the number of parameters (num_params).
+    """
+
+    def __init__(self, path, device='cpu'):
+        """Load the exported file <path> on <device> (e.g. 'cpu' or 'cuda:0')."""
+        extra_files = {META_FILE: ''}
+        self.device = torch.device(device)
+        self.module = torch.jit.load(path, map_location=self.device, _extra_files=extra_files)
+        self.module.eval()
+        self.meta = json.loads(extra_files[META_FILE])
+
+    def __call__(self, input):
+        """Desmoke a batch of images: a (N, input_nc, H, W) tensor in [-1, 1], returned on the same device as <input>.
+
+        H x W must be the traced input size (meta['input_size']): the sizes computed in Python while tracing (the window
+        padding of vit_window, the chunks of the self-attention, the tiles of '--tile_size') are constants of the graph,
+        so other sizes would give wrong outputs or fail deep inside the graph.
+        """
+        if list(input.shape[-2:]) != list(self.meta['input_size']):
+            raise ValueError('the generator was exported for %d x %d inputs, got %d x %d; export it again with --export_size'
+                             % (tuple(self.meta['input_size']) + tuple(input.shape[-2:])))
+        with torch.inference_mode():
+            return self.module(input.to(self.device)).to(input.device)
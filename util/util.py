@@ -10,23 +10,50 @@ def tensor2im(input_image, imtype=np.uint8):
     """"Converts a Tensor array into a numpy image array.
 
     Parameters:
-        input_image (tensor) --  the input image tensor array
+        input_image (tensor) --  the input image tensor array; for a batch, only the first image is converted
         imtype (type)        --  the desired type of the converted numpy array
     """
     if not isinstance(input_image, np.ndarray):
         if isinstance(input_image, torch.Tensor):  # get the data from a variable
-            image_tensor = input_image.data
+            return tensor2im_batch(input_image[:1], imtype)[0]
         else:
             return input_image
-        image_numpy = image_tensor[0].cpu().float().numpy()  # convert it into a numpy array
-        if image_numpy.shape[0] == 1:  # grayscale to RGB
-            image_numpy = np.tile(image_numpy, (3, 1, 1))
-        image_numpy = (np.transpose(image_numpy, (1, 2, 0)) + 1) / 2.0 * 255.0  # post-processing: tranpose and scaling
     else:  # if it is a numpy array, do nothing
         image_numpy = input_image
     return image_numpy.astype(imtype)
 
 
+def tensor2im_batch(input_images, imtype=np.uint8):
+    """"Converts a batch of images (N x C x H x W tensor) into a N x H x W x 3 numpy array.
+
+    Parameters:
+        input_images (tensor) --  the input image tensor array
+        imtype (type)         --  the desired type of the converted numpy array
+
+    The scaling runs on the whole batch at once, on the device of the tensor, before a single copy to the host.
+    """
+    if isinstance(input_images, np.ndarray):  # if it is a numpy array, do nothing
+        return input_images.astype(imtype)
+    images = input_images.detach()
+    if images.size(1) == 1:  # grayscale to RGB
+        images = images.expand(-1, 3, -1, -1)
+    images = (images.permute(0, 2, 3, 1).float() + 1) / 2.0 * 255.0  # post-processing: tranpose and scaling
+    return images.cpu().numpy().astype(imtype)
+
+
+def inference_size(opt, width, height):
+    """Return the (width, height) at which a generator processes an image of the given size at inference time
+
+    Parameters:
+        opt (Option class) -- test options; with '--preprocess none' the size is only rounded to a multiple of 4, otherwise images are resized to '--load_size'
+        width (int)        -- the width of the image
+        height (int)       -- the height of the image
+    """
+    if opt.preprocess == 'none':
+        return int(round(width / 4) * 4), int(round(height / 4) * 4)
+    return opt.load_size, opt.load_size
+
+
 def diagnose_network(net, name='network'):
     """Calculate and print the mean of average absolute(gradients)
 
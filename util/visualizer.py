@@ -3,6 +3,7 @@ import os
 import sys
 import ntpath
 import time
+from collections import OrderedDict
 from . import util, html
 from subprocess import Popen, PIPE
 
@@ -19,28 +20,31 @@ def save_images(webpage, visuals, image_path, aspect_ratio=1.0, width=256):
     Parameters:
         webpage (the HTML class) -- the HTML webpage class that stores these imaegs (see html.py for more details)
         visuals (OrderedDict)    -- an ordered dictionary that stores (name, images (either tensor or numpy) ) pairs
-        image_path (str)         -- the string is used to create image paths
+        image_path (str list)    -- the paths of the images in the batch; used to create image paths
         aspect_ratio (float)     -- the aspect ratio of saved images
         width (int)              -- the images will be resized to width x width
 
     This function will save images stored in 'visuals' to the HTML file specified by 'webpage'.
+    Every image of the batch gets its own row in the HTML file.
     """
     image_dir = webpage.get_image_dir()
-    short_path = ntpath.basename(image_path[0])
-    name = os.path.splitext(short_path)[0]
-
-    webpage.add_header(name)
-    ims, txts, links = [], [], []
-
-    for label, im_data in visuals.items():
-        im = util.tensor2im(im_data)
-        image_name = '%s_%s.png' % (name, label)
-        save_path = os.path.join(image_dir, image_name)
-        util.save_image(im, save_path, aspect_ratio=aspect_ratio)
-        ims.append(image_name)
-        txts.append(label)
-        links.append(image_name)
-    webpage.add_images(ims, txts, links, width=width)
+    batch = OrderedDict((label, util.tensor2im_batch(im_data)) for label, im_data in visuals.items())
+
+    for i, path in enumerate(image_path):
+        short_path = ntpath.basename(path)
+        name = os.path.splitext(short_path)[0]
+
+        webpage.add_header(name)
+        ims, txts, links = [], [], []
+
+        for label, im_batch in batch.items():
+            image_name = '%s_%s.png' % (name, label)
+            save_path = os.path.join(image_dir, image_name)
+            util.save_image(im_batch[i], save_path, aspect_ratio=aspect_ratio)
+            ims.append(image_name)
+            txts.append(label)
+            links.append(image_name)
+        webpage.add_images(ims, txts, links, width=width)
 
 
 class Visualizer():